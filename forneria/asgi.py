@@ -2,6 +2,8 @@
 ASGI config for forneria project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+The live sales dashboard (/pos/tablero/eventos/) streams Server-Sent Events
+and should be served from here, e.g. ``uvicorn forneria.asgi:application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
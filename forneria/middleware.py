@@ -0,0 +1,229 @@
+import gzip
+import json
+import mimetypes
+import os
+import posixpath
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError
+from django.http import FileResponse, HttpResponseNotModified, JsonResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+from pos import perfilado, sucursales
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional; sin él las respuestas solo se comprimen con gzip
+    brotli = None
+
+# Un año: los nombres con hash cambian en cada release, así que nunca se revalidan
+CACHE_INMUTABLE = 'public, max-age=31536000, immutable'
+# Archivos sin hash (p. ej. referenciados a mano): revalidar con Last-Modified
+CACHE_SIN_HASH = 'public, max-age=300'
+
+
+def codificaciones_aceptadas(request):
+    """Conjunto de codificaciones de Accept-Encoding, sin las marcadas con q=0."""
+    aceptadas = set()
+    for parte in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        nombre, _, params = parte.strip().partition(';')
+        if nombre and params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            aceptadas.add(nombre.lower())
+    return aceptadas
+
+
+class EstaticosMiddleware:
+    """Sirve STATIC_ROOT con variantes precomprimidas y cabeceras de cache largas.
+
+    El índice de archivos se arma una sola vez por proceso recorriendo
+    STATIC_ROOT (generado por ``collectstatic``), así que servir un estático no
+    hace ningún stat ni consulta a disco más allá de abrir el archivo elegido.
+    Cada terminal descarga los assets una vez por release: los nombres con hash
+    se marcan como ``immutable``.
+    """
+
+    def __init__(self, get_response):
+        prefijo = settings.STATIC_URL or ''
+        if not settings.STATIC_ROOT or '://' in prefijo:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.prefijo = '/' + prefijo.lstrip('/')
+        self.raiz = os.path.abspath(settings.STATIC_ROOT)
+        self._indice = None
+
+    def __call__(self, request):
+        if request.method in ('GET', 'HEAD') and request.path_info.startswith(self.prefijo):
+            entrada = self.indice.get(request.path_info[len(self.prefijo):])
+            if entrada is not None:
+                return self.servir(request, entrada)
+        return self.get_response(request)
+
+    @property
+    def indice(self):
+        if self._indice is None:
+            self._indice = self._construir_indice()
+        return self._indice
+
+    def _construir_indice(self):
+        con_hash = set()
+        manifiesto = os.path.join(self.raiz, 'staticfiles.json')
+        if os.path.isfile(manifiesto):
+            with open(manifiesto, encoding='utf-8') as f:
+                con_hash = set(json.load(f).get('paths', {}).values())
+
+        indice = {}
+        for carpeta, _, archivos in os.walk(self.raiz):
+            disponibles = set(archivos)
+            for archivo in archivos:
+                if archivo.endswith(('.gz', '.br')) and archivo[:-3] in disponibles:
+                    continue
+                ruta = os.path.join(carpeta, archivo)
+                nombre = posixpath.join(*os.path.relpath(ruta, self.raiz).split(os.sep))
+                tipo, _ = mimetypes.guess_type(archivo)
+                indice[nombre] = {
+                    'ruta': ruta,
+                    'tipo': tipo or 'application/octet-stream',
+                    'mtime': os.stat(ruta).st_mtime,
+                    'inmutable': nombre in con_hash,
+                    'variantes': [(cod, ruta + ext) for cod, ext in (('br', '.br'), ('gzip', '.gz'))
+                                  if archivo + ext in disponibles],
+                }
+        return indice
+
+    def servir(self, request, entrada):
+        if not entrada['inmutable'] and not was_modified_since(
+            request.META.get('HTTP_IF_MODIFIED_SINCE'), entrada['mtime']
+        ):
+            return HttpResponseNotModified()
+
+        aceptadas = codificaciones_aceptadas(request)
+        ruta, codificacion = entrada['ruta'], None
+        for cod, ruta_variante in entrada['variantes']:
+            if cod in aceptadas:
+                ruta, codificacion = ruta_variante, cod
+                break
+
+        response = FileResponse(open(ruta, 'rb'), content_type=entrada['tipo'])
+        # FileResponse lo deduce del archivo abierto (p. ej. "pos.js.br")
+        del response['Content-Disposition']
+        if codificacion:
+            response['Content-Encoding'] = codificacion
+        if entrada['variantes']:
+            response['Vary'] = 'Accept-Encoding'
+        response['Cache-Control'] = CACHE_INMUTABLE if entrada['inmutable'] else CACHE_SIN_HASH
+        response['Last-Modified'] = http_date(entrada['mtime'])
+        return response
+
+
+class SucursalMiddleware:
+    """Fija la sucursal de la petición desde ``X-Sucursal`` o la cookie ``sucursal``.
+
+    Sin ninguna de las dos la petición queda en la sucursal predeterminada
+    (ver ``pos.sucursales``). Un código desconocido responde 400 en vez de
+    leer o escribir datos de otra sucursal, y uno que no es el del empleado
+    de la sesión, 403. Las peticiones con JWT las revisa el permiso
+    ``SucursalAsignada`` de DRF, ya con el usuario autenticado. Con la base
+    caída se usa el último id conocido del código, o se deja pasar sin validar.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        codigo = request.headers.get('X-Sucursal') or request.COOKIES.get('sucursal')
+        if not codigo:
+            return self.get_response(request)
+        try:
+            sucursal_id = sucursales.id_por_codigo(codigo)
+        except DatabaseError:
+            # Base caída y código nunca visto en este proceso: no hay cómo validarlo.
+            # La vista decide (inicio, por ejemplo, sirve el último catálogo).
+            with sucursales.usar(codigo):
+                return self.get_response(request)
+        if sucursal_id is None:
+            return JsonResponse({'detail': f'Sucursal desconocida: {codigo}'}, status=400)
+        if not sucursales.permitida(getattr(request, 'user', None), sucursal_id):
+            return JsonResponse({'detail': f'El usuario no está asignado a la sucursal {codigo}'}, status=403)
+        with sucursales.usar(codigo):
+            return self.get_response(request)
+
+
+class CompresionMiddleware:
+    """Comprime con brotli o gzip las respuestas de la API según ``Accept-Encoding``.
+
+    Solo toca respuestas JSON o MessagePack de al menos
+    ``POS_COMPRESION_MINIMO`` bytes; las páginas HTML (que llevan el token
+    CSRF) y los estáticos, ya precomprimidos, pasan tal cual. Los niveles son
+    los de compresión en línea: brotli 5 y gzip 6 ahorran casi lo mismo que
+    los máximos por una fracción del tiempo.
+    """
+
+    TIPOS = ('application/json', 'application/msgpack')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.minimo = getattr(settings, 'POS_COMPRESION_MINIMO', 1024)
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            response.streaming
+            or response.has_header('Content-Encoding')
+            or not response.get('Content-Type', '').startswith(self.TIPOS)
+        ):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if len(response.content) < self.minimo:
+            return response
+
+        aceptadas = codificaciones_aceptadas(request)
+        if brotli is not None and 'br' in aceptadas:
+            contenido, codificacion = brotli.compress(response.content, quality=5), 'br'
+        elif 'gzip' in aceptadas:
+            contenido, codificacion = gzip.compress(response.content, compresslevel=6, mtime=0), 'gzip'
+        else:
+            return response
+        if len(contenido) >= len(response.content):
+            return response
+
+        response.content = contenido
+        response['Content-Length'] = str(len(contenido))
+        response['Content-Encoding'] = codificacion
+        # Un ETag fuerte identifica los bytes sin comprimir (igual que GZipMiddleware)
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
+
+
+class PerfilMiddleware:
+    """Perfila la petición si trae ``X-Perfil`` firmada o ``?perfilar=1`` de un staff.
+
+    Sin ninguna de las dos solo se revisa la cabecera y la query string (ver
+    ``pos.perfilado``). Va después de AuthenticationMiddleware para conocer
+    al usuario de la sesión. ``POS_PERFIL_ACTIVO = False`` lo quita del todo.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'POS_PERFIL_ACTIVO', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        firma = request.META.get('HTTP_X_PERFIL')
+        if firma is None and 'perfilar=' not in request.META.get('QUERY_STRING', ''):
+            return self.get_response(request)
+
+        if firma is not None:
+            disparador = 'firma' if perfilado.firma_valida(firma) else None
+        elif request.GET.get('perfilar') == '1' and request.user.is_staff:
+            disparador = f'staff:{request.user.get_username()}'
+        else:
+            disparador = None
+        if disparador is None:
+            return self.get_response(request)
+        return perfilado.perfilar(request, self.get_response, disparador)
@@ -0,0 +1,67 @@
+"""Renderers de la API.
+
+``JSONRapidoRenderer`` es el renderer por defecto: serializa con orjson, que
+arma el JSON en C (claves y strings se escriben directamente en el buffer de
+salida, sin pasar por ``json.JSONEncoder``). Los ``Decimal`` que lleguen sin
+formatear (p. ej. desde ``values()`` en una vista) salen como string, igual
+que los que entrega ``DecimalField`` con ``COERCE_DECIMAL_TO_STRING``; el
+resto de los tipos especiales cae en el encoder de DRF, así la salida es la
+misma que con ``JSONRenderer``.
+
+``MessagePackRenderer`` responde ``application/msgpack`` a quien lo pida en
+``Accept``: mismos datos, menos bytes y más rápido de decodificar en las
+terminales.
+
+orjson y msgpack son opcionales: sin orjson se usa el renderer de DRF, y sin
+msgpack settings no registra ese formato.
+"""
+from decimal import Decimal
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional; sin él se usa el JSONRenderer de DRF
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+_encoder = JSONEncoder()
+
+
+def _por_defecto(obj):
+    """Tipos que orjson y msgpack no conocen: Decimal directo, lo demás como DRF."""
+    if type(obj) is Decimal:
+        return str(obj) if api_settings.COERCE_DECIMAL_TO_STRING else float(obj)
+    return _encoder.default(obj)
+
+
+class JSONRapidoRenderer(JSONRenderer):
+
+    # Las fechas pasan por el encoder de DRF (milisegundos y "Z" en UTC), como con JSONRenderer
+    OPCIONES = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Con indentación (API navegable, "; indent=4") se conserva el formato de DRF
+        if self.get_indent(accepted_media_type or '', renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return orjson.dumps(data, default=_por_defecto, option=self.OPCIONES)
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_por_defecto, use_bin_type=True, datetime=False)
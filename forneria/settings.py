@@ -1,4 +1,5 @@
 from pathlib import Path
+import importlib.util
 import os
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -35,10 +36,16 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Comprime las respuestas de la API; va antes que todo lo que arma el cuerpo
+    'forneria.middleware.CompresionMiddleware',
+    'forneria.middleware.EstaticosMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # Perfilado a pedido (pos/perfilado.py): necesita request.user
+    'forneria.middleware.PerfilMiddleware',
+    'forneria.middleware.SucursalMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -50,8 +57,14 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Plantillas compiladas una vez por proceso y reutilizadas en cada request
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
@@ -83,6 +96,88 @@ DATABASES = {
 }
 
 
+# Cache
+# En producción con varios procesos conviene un backend compartido
+# (Memcached o Redis) para que todos vean las mismas versiones de catálogo.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'forneria',
+    }
+}
+
+# Tiempo de vida de las tarjetas de producto cacheadas en pos.html. La clave
+# incluye la versión del producto, así que un cambio invalida la tarjeta antes.
+POS_TARJETAS_CACHE_SEGUNDOS = 60 * 60 * 24
+
+# Antigüedad tras la cual inicio refresca en segundo plano el snapshot del catálogo
+# que sirve si la base de datos no responde.
+POS_SNAPSHOT_CATALOGO_SEGUNDOS = 60
+
+# LRU de escaneo por proceso. Las señales invalidan en el proceso que hizo el
+# cambio; el TTL acota cuánto puede quedar obsoleto el stock en los demás.
+POS_ESCANEO_CACHE_MAX = 20000
+POS_ESCANEO_CACHE_SEGUNDOS = 30
+
+# LRU RUT→cliente por proceso. Un RUT no cambia de cliente salvo edición manual,
+# así que el TTL puede ser más largo que el del escaneo.
+POS_CLIENTES_CACHE_MAX = 50000
+POS_CLIENTES_CACHE_SEGUNDOS = 300
+
+# Reportes en segundo plano: procesos del worker procesar_reportes, espacio máximo
+# de resultados cacheados (períodos cerrados) y minutos tras los que un reporte
+# en proceso se considera abandonado y vuelve a la cola.
+POS_REPORTES_PROCESOS = 2
+POS_REPORTES_CACHE_BYTES = 200 * 1024 * 1024
+POS_REPORTES_MINUTOS_ABANDONO = 60
+
+# Comprobante de venta (pos/boleta.py): columnas del papel (42 en 80 mm, 32 en 58 mm)
+# y datos del emisor. Se leen al iniciar el proceso.
+POS_BOLETA_ANCHO = 42
+POS_BOLETA_EMISOR = 'Forneria'
+POS_BOLETA_RUT = ''
+POS_BOLETA_DIRECCION = ''
+POS_BOLETA_PIE = 'Gracias por su compra'
+
+# Sucursales (pos/sucursales.py): la que se usa cuando la petición no indica una,
+# y alias de DATABASES para sucursales movidas a su propia base, p. ej.
+# {'providencia': 'providencia'}. Vacío: todas en 'default'.
+POS_SUCURSAL_PREDETERMINADA = 'principal'
+POS_SUCURSALES_BD = {}
+DATABASE_ROUTERS = ['pos.sucursales.RouterSucursales']
+
+# Vuelo único de los listados de productos y categorías (pos/vuelo_unico.py):
+# vida del resultado compartido (su clave cambia con el catálogo) y cuánto
+# espera un proceso el cálculo que otro proceso tiene en curso.
+POS_VUELO_UNICO_SEGUNDOS = 60
+POS_VUELO_UNICO_BLOQUEO_SEGUNDOS = 30
+
+# Tablero en vivo (pos/tablero.py, /pos/tablero/): cada cuánto revisa cambios
+# cada conexión SSE, latido para los proxies, reconexión bajo WSGI y umbral de
+# stock bajo para lotes sin stock_minimo.
+POS_TABLERO_INTERVALO = 1.0
+POS_TABLERO_LATIDO = 15.0
+POS_TABLERO_RETRY_MS = 5000
+POS_TABLERO_STOCK_BAJO = 5
+
+# Depuración diaria de lotes (pos/lotes.py, comando depurar_lotes): horas sin
+# cambios para dar de baja un lote agotado y días de baja antes de archivarlo.
+POS_LOTES_AGOTADO_HORAS = 24
+POS_LOTES_ARCHIVO_DIAS = 30
+# MySQL no crea el índice parcial de lotes vivos (lote_vivo_fefo_idx); ahí el
+# conjunto de trabajo lo acota el archivo de lotes, así que el aviso sobra.
+SILENCED_SYSTEM_CHECKS = ['models.W037']
+
+# Perfilado a pedido (pos/perfilado.py, /pos/perfiles/): vigencia de la firma de
+# X-Perfil, perfiles que se conservan y ramas mínimas del flame graph (fracción
+# del total).
+POS_PERFIL_ACTIVO = True
+POS_PERFIL_FIRMA_SEGUNDOS = 3600
+POS_PERFIL_MAXIMO = 200
+POS_PERFIL_UMBRAL = 0.002
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -119,6 +214,23 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+
+# collectstatic genera nombres con hash y variantes .gz/.br; EstaticosMiddleware
+# las sirve con cache inmutable, así que cada terminal baja los assets una vez por release.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'forneria.storage.ComprimidoManifestStaticFilesStorage',
+    },
+}
+
+# Archivos generados (reportes); se descargan a través de la API, no de MEDIA_URL
+MEDIA_URL = 'media/'
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -126,12 +238,35 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.SessionAuthentication',   
-        'dj_rest_auth.jwt_auth.JWTCookieAuthentication',        
+        'rest_framework.authentication.SessionAuthentication',
+        # JWTCookieAuthentication con el usuario desde el cache (pos/autenticacion.py)
+        'pos.autenticacion.JWTCacheadoAuthentication',
     ],
+    # Quien no es staff solo opera en la sucursal de su empleado (pos/sucursales.py)
+    'DEFAULT_PERMISSION_CLASSES': ['pos.sucursales.SucursalAsignada'],
+    # JSON con orjson (forneria/renderers.py); MessagePack si la terminal lo pide en Accept
+    'DEFAULT_RENDERER_CLASSES': [
+        'forneria.renderers.JSONRapidoRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ] + (['forneria.renderers.MessagePackRenderer'] if importlib.util.find_spec('msgpack') else []),
 }
+# Tamaño mínimo (bytes) de una respuesta de la API para comprimirla
+POS_COMPRESION_MINIMO = 1024
 
 
+# request.user de las sesiones también sale del cache; ModelBackend queda para
+# las sesiones iniciadas antes de este cambio
+AUTHENTICATION_BACKENDS = [
+    'pos.autenticacion.BackendCacheado',
+    'django.contrib.auth.backends.ModelBackend',
+]
+# Vida del usuario cacheado (con empleado y permisos); las señales lo invalidan antes
+POS_AUTH_CACHE_SEGUNDOS = 60
+# Con un cache compartido entre procesos (Redis, Memcached) las sesiones se leen
+# de él; con locmem un logout no llegaría a los demás procesos, así que quedan en la base.
+if CACHES['default']['BACKEND'] != 'django.core.cache.backends.locmem.LocMemCache':
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
 REST_AUTH = {
     'USE_JWT': True,
     'TOKEN_MODEL': None,  
@@ -23,4 +23,12 @@ DATABASES = {
 DEBUG = False
 ALLOWED_HOSTS = ["127.0.0.1", "localhost"]
 
+# Sin collectstatic en desarrollo: nombres de estáticos sin hash ni manifiesto
+STORAGES = {
+    **STORAGES,
+    "staticfiles": {
+        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
+    },
+}
+
 # Evitar sobrescribir secretos de producción aquí. Usa este archivo solo en desarrollo local.
\ No newline at end of file
@@ -0,0 +1,51 @@
+"""Storage de archivos estáticos para producción.
+
+Extiende ``ManifestStaticFilesStorage`` (nombres con hash de contenido) para que
+``collectstatic`` deje además variantes precomprimidas ``.gz`` y ``.br`` de cada
+archivo de texto. ``forneria.middleware.EstaticosMiddleware`` sirve luego esos
+bytes directamente, sin comprimir en cada request.
+"""
+import gzip
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional; sin él solo se generan variantes gzip
+    brotli = None
+
+EXTENSIONES_COMPRIMIBLES = ('.css', '.js', '.map', '.svg', '.json', '.txt', '.html', '.xml', '.ico')
+
+
+def comprimir(contenido):
+    """Retorna {sufijo: bytes} con las variantes que realmente ahorran espacio."""
+    variantes = {'.gz': gzip.compress(contenido, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variantes['.br'] = brotli.compress(contenido, quality=11)
+    return {sufijo: datos for sufijo, datos in variantes.items() if len(datos) < len(contenido)}
+
+
+class ComprimidoManifestStaticFilesStorage(ManifestStaticFilesStorage):
+
+    def post_process(self, paths, dry_run=False, **options):
+        procesados = set()
+        for nombre, nombre_hash, procesado in super().post_process(paths, dry_run, **options):
+            if nombre_hash and not isinstance(procesado, Exception):
+                procesados.add(nombre_hash)
+            yield nombre, nombre_hash, procesado
+
+        if dry_run:
+            return
+        # Los archivos con hash son los que referencia {% static %}; se comprimen
+        # al final, cuando ya no van a cambiar por el reemplazo de URLs en CSS.
+        for nombre_hash in sorted(procesados):
+            if nombre_hash.lower().endswith(EXTENSIONES_COMPRIMIBLES):
+                self._guardar_variantes(nombre_hash)
+
+    def _guardar_variantes(self, nombre):
+        with self.open(nombre) as archivo:
+            contenido = archivo.read()
+        for sufijo, datos in comprimir(contenido).items():
+            ruta = self.path(nombre + sufijo)
+            with open(ruta, 'wb') as destino:
+                destino.write(datos)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Proveedor, Ubicacion, Insumo, OrdenCompra, OrdenCompraItem
+from .models import Proveedor, Ubicacion, Insumo, OrdenCompra, OrdenCompraItem, Receta
 
 
 @admin.register(Proveedor)
@@ -27,3 +27,10 @@ class OrdenCompraItemInline(admin.TabularInline):
 class OrdenCompraAdmin(admin.ModelAdmin):
 	list_display = ('id', 'proveedor', 'fecha', 'estado', 'total')
 	inlines = [OrdenCompraItemInline]
+
+
+@admin.register(Receta)
+class RecetaAdmin(admin.ModelAdmin):
+	list_display = ('producto', 'insumo', 'cantidad')
+	list_select_related = ('producto', 'insumo')
+	raw_id_fields = ('producto',)
@@ -0,0 +1,38 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from inventario.models import Insumo
+from inventario.recetas import consumir_ventas, requerimientos_plan
+from pos.pronostico import plan_produccion
+
+
+class Command(BaseCommand):
+    help = (
+        "Descuenta los insumos consumidos por las ventas de un período (por defecto ayer), "
+        "o muestra los insumos que requiere el plan de producción de una fecha."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', type=date.fromisoformat)
+        parser.add_argument('--hasta', type=date.fromisoformat, help="Exclusivo")
+        parser.add_argument('--plan', type=date.fromisoformat, metavar='FECHA',
+                            help="Solo calcula requerimientos del plan de producción de FECHA")
+
+    def handle(self, *args, **options):
+        if options['plan']:
+            requerimientos = requerimientos_plan(plan_produccion(options['plan']))
+            nombres = dict(Insumo.objects.filter(id__in=list(requerimientos)).values_list('id', 'nombre'))
+            for iid, cantidad in sorted(requerimientos.items(), key=lambda r: nombres.get(r[0], '')):
+                self.stdout.write(f"{nombres.get(iid, iid)}: {cantidad}")
+            return
+
+        hoy = timezone.localdate()
+        desde = options['desde'] or hoy - timedelta(days=1)
+        hasta = options['hasta'] or desde + timedelta(days=1)
+        if hasta <= desde:
+            raise CommandError("--hasta debe ser posterior a --desde")
+
+        registrados = consumir_ventas(desde, hasta)
+        self.stdout.write(self.style.SUCCESS(f"{registrados} insumos descontados para ventas {desde} – {hasta}"))
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from inventario.reposicion import calcular_reposicion, generar_ordenes
+
+
+class Command(BaseCommand):
+    help = "Genera órdenes de compra en borrador para los insumos bajo su punto de reorden."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias-historia', type=int, default=28)
+        parser.add_argument('--dias-cobertura', type=int, default=7)
+        parser.add_argument('--dias-seguridad', type=int, default=2)
+        parser.add_argument('--simular', action='store_true', help="Solo muestra las sugerencias")
+
+    def handle(self, *args, **options):
+        t0 = time.perf_counter()
+        sugerencias = calcular_reposicion(
+            dias_historia=options['dias_historia'],
+            dias_cobertura=options['dias_cobertura'],
+            dias_seguridad=options['dias_seguridad'],
+        )
+        if options['simular']:
+            for s in sugerencias:
+                self.stdout.write(f"{s['nombre']}: pedir {s['cantidad']} (reorden {s['punto_reorden']})")
+            plan = None
+        else:
+            plan = generar_ordenes(sugerencias)
+
+        proveedores = len({s['proveedor_id'] for s in sugerencias})
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(sugerencias)} insumos a reponer en {proveedores} proveedores "
+            f"(plan {plan or '-'}) en {time.perf_counter() - t0:.2f} s"
+        ))
@@ -0,0 +1,102 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:13
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Insumo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=150)),
+                ('unidad_medida', models.CharField(choices=[('kg', 'Kilogramo'), ('g', 'Gramo'), ('l', 'Litro'), ('ml', 'Mililitro'), ('un', 'Unidad')], max_length=2)),
+                ('stock_actual', models.DecimalField(decimal_places=3, default=0, max_digits=12)),
+                ('stock_minimo', models.DecimalField(decimal_places=3, default=0, max_digits=12)),
+                ('costo_unitario', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('lote_compra', models.DecimalField(blank=True, decimal_places=3, help_text='Múltiplo en que vende el proveedor (p. ej. sacos de 25 kg)', max_digits=12, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='OrdenCompra',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now)),
+                ('estado', models.CharField(choices=[('borrador', 'Borrador'), ('enviada', 'Enviada'), ('recibida', 'Recibida'), ('cancelada', 'Cancelada')], default='borrador', max_length=10)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('plan', models.CharField(blank=True, db_index=True, max_length=32, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Proveedor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=150)),
+                ('contacto', models.CharField(blank=True, max_length=100, null=True)),
+                ('correo', models.EmailField(blank=True, max_length=100, null=True)),
+                ('telefono', models.CharField(blank=True, max_length=20, null=True)),
+                ('dias_entrega', models.PositiveIntegerField(default=2, help_text='Días entre el pedido y la recepción')),
+            ],
+            options={
+                'verbose_name_plural': 'proveedores',
+            },
+        ),
+        migrations.CreateModel(
+            name='Ubicacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=100)),
+                ('descripcion', models.CharField(blank=True, max_length=200, null=True)),
+            ],
+            options={
+                'verbose_name_plural': 'ubicaciones',
+            },
+        ),
+        migrations.CreateModel(
+            name='OrdenCompraItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cantidad', models.DecimalField(decimal_places=3, max_digits=12)),
+                ('precio_unitario', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('insumo', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='items_compra', to='inventario.insumo')),
+                ('orden', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='inventario.ordencompra')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='ordencompra',
+            name='proveedor',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='ordenes', to='inventario.proveedor'),
+        ),
+        migrations.AddField(
+            model_name='insumo',
+            name='proveedor',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='insumos', to='inventario.proveedor'),
+        ),
+        migrations.AddField(
+            model_name='insumo',
+            name='ubicacion',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='insumos', to='inventario.ubicacion'),
+        ),
+        migrations.CreateModel(
+            name='MovimientoInsumo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo_movimiento', models.CharField(choices=[('entrada', 'Entrada'), ('salida', 'Salida')], max_length=10)),
+                ('cantidad', models.DecimalField(decimal_places=3, max_digits=12)),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now)),
+                ('referencia', models.CharField(blank=True, max_length=100, null=True)),
+                ('insumo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movimientos', to='inventario.insumo')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['tipo_movimiento', 'fecha', 'insumo'], name='movinsumo_tipo_fecha_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0001_initial'),
+        ('pos', '0005_codigo_barra_texto'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='movimientoinsumo',
+            name='referencia',
+            field=models.CharField(blank=True, db_index=True, max_length=100, null=True),
+        ),
+        migrations.CreateModel(
+            name='Receta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cantidad', models.DecimalField(decimal_places=4, max_digits=12)),
+                ('insumo', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='recetas', to='inventario.insumo')),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='receta', to='pos.producto')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('producto', 'insumo'), name='receta_producto_insumo_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:22
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0002_recetas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VentaConsumida',
+            fields=[
+                ('venta_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
@@ -1 +1,128 @@
+from django.db import models
+from django.utils import timezone
 
+
+class Proveedor(models.Model):
+    nombre = models.CharField(max_length=150)
+    contacto = models.CharField(max_length=100, null=True, blank=True)
+    correo = models.EmailField(max_length=100, null=True, blank=True)
+    telefono = models.CharField(max_length=20, null=True, blank=True)
+    dias_entrega = models.PositiveIntegerField(default=2, help_text="Días entre el pedido y la recepción")
+
+    class Meta:
+        verbose_name_plural = "proveedores"
+
+    def __str__(self):
+        return self.nombre
+
+
+class Ubicacion(models.Model):
+    nombre = models.CharField(max_length=100)
+    descripcion = models.CharField(max_length=200, null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = "ubicaciones"
+
+    def __str__(self):
+        return self.nombre
+
+
+# Materia prima (harina, levadura, mantequilla...)
+class Insumo(models.Model):
+    UNIDAD_CHOICES = [
+        ('kg', 'Kilogramo'),
+        ('g', 'Gramo'),
+        ('l', 'Litro'),
+        ('ml', 'Mililitro'),
+        ('un', 'Unidad'),
+    ]
+    nombre = models.CharField(max_length=150)
+    unidad_medida = models.CharField(max_length=2, choices=UNIDAD_CHOICES)
+    stock_actual = models.DecimalField(max_digits=12, decimal_places=3, default=0)
+    stock_minimo = models.DecimalField(max_digits=12, decimal_places=3, default=0)
+    costo_unitario = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    lote_compra = models.DecimalField(
+        max_digits=12, decimal_places=3, null=True, blank=True,
+        help_text="Múltiplo en que vende el proveedor (p. ej. sacos de 25 kg)",
+    )
+    proveedor = models.ForeignKey(Proveedor, on_delete=models.SET_NULL, null=True, blank=True, related_name='insumos')
+    ubicacion = models.ForeignKey(Ubicacion, on_delete=models.SET_NULL, null=True, blank=True, related_name='insumos')
+
+    def __str__(self):
+        return f"{self.nombre} ({self.unidad_medida})"
+
+
+# Receta (BOM): cantidad de cada insumo que consume una unidad del producto
+class Receta(models.Model):
+    producto = models.ForeignKey('pos.Producto', on_delete=models.CASCADE, related_name='receta')
+    insumo = models.ForeignKey(Insumo, on_delete=models.PROTECT, related_name='recetas')
+    cantidad = models.DecimalField(max_digits=12, decimal_places=4)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['producto', 'insumo'], name='receta_producto_insumo_unico'),
+        ]
+
+    def __str__(self):
+        return f"{self.producto}: {self.cantidad} {self.insumo.unidad_medida} de {self.insumo.nombre}"
+
+
+class MovimientoInsumo(models.Model):
+    TIPO_MOVIMIENTO_CHOICES = [
+        ('entrada', 'Entrada'),
+        ('salida', 'Salida'),
+    ]
+    insumo = models.ForeignKey(Insumo, on_delete=models.CASCADE, related_name='movimientos')
+    tipo_movimiento = models.CharField(max_length=10, choices=TIPO_MOVIMIENTO_CHOICES)
+    cantidad = models.DecimalField(max_digits=12, decimal_places=3)
+    fecha = models.DateTimeField(default=timezone.now)
+    referencia = models.CharField(max_length=100, null=True, blank=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # El motor de reposición agrega salidas por insumo en una ventana de fechas
+            models.Index(fields=['tipo_movimiento', 'fecha', 'insumo'], name='movinsumo_tipo_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_movimiento_display()} {self.cantidad} {self.insumo}"
+
+
+# Ventas cuyos insumos ya se descontaron (inventario.recetas.consumir_ventas).
+# Guarda el id y no una FK: las ventas pueden vivir en la base de su sucursal.
+class VentaConsumida(models.Model):
+    venta_id = models.BigIntegerField(primary_key=True)
+    fecha = models.DateTimeField(default=timezone.now)
+
+
+class OrdenCompra(models.Model):
+    ESTADO_CHOICES = [
+        ('borrador', 'Borrador'),
+        ('enviada', 'Enviada'),
+        ('recibida', 'Recibida'),
+        ('cancelada', 'Cancelada'),
+    ]
+    ESTADOS_PENDIENTES = ('borrador', 'enviada')
+
+    proveedor = models.ForeignKey(Proveedor, on_delete=models.PROTECT, related_name='ordenes')
+    fecha = models.DateTimeField(default=timezone.now)
+    estado = models.CharField(max_length=10, choices=ESTADO_CHOICES, default='borrador')
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    # Identifica las órdenes creadas por una misma corrida del motor de reposición
+    plan = models.CharField(max_length=32, null=True, blank=True, db_index=True)
+
+    def __str__(self):
+        return f"OC {self.id} - {self.proveedor}"
+
+
+class OrdenCompraItem(models.Model):
+    orden = models.ForeignKey(OrdenCompra, on_delete=models.CASCADE, related_name='items')
+    insumo = models.ForeignKey(Insumo, on_delete=models.PROTECT, related_name='items_compra')
+    cantidad = models.DecimalField(max_digits=12, decimal_places=3)
+    precio_unitario = models.DecimalField(max_digits=10, decimal_places=2)
+
+    def subtotal(self):
+        return self.cantidad * self.precio_unitario
+
+    def __str__(self):
+        return f"{self.cantidad} x {self.insumo}"
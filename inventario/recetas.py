@@ -0,0 +1,143 @@
+"""Explosión de recetas (BOM): de ventas o plan de producción a consumo de insumos.
+
+Las recetas se cargan como una matriz dispersa productos × insumos en formato
+CSR (arrays ``indptr``/``indices``/``datos`` de NumPy). Los requerimientos de un
+vector de unidades por producto son ``Rᵀ · q``, calculado en una pasada con
+``np.bincount`` sin recorrer producto por producto. El consumo se registra con
+una inserción masiva de movimientos y una sola actualización de stock; las
+ventas ya descontadas quedan anotadas en ``VentaConsumida``.
+"""
+from datetime import datetime, time
+from decimal import Decimal
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, Sum, Value, When
+from django.utils import timezone
+
+from pos.models import DetalleVenta, Venta
+
+from .models import Insumo, MovimientoInsumo, Receta, VentaConsumida
+
+CANTIDAD = Decimal('0.001')
+
+
+class MatrizRecetas:
+    """Recetas de todos los productos como matriz CSR productos × insumos."""
+
+    def __init__(self):
+        filas = list(
+            Receta.objects.order_by('producto_id', 'insumo_id')
+            .values_list('producto_id', 'insumo_id', 'cantidad')
+        )
+        productos = np.fromiter((f[0] for f in filas), dtype=np.int64, count=len(filas))
+        insumos = np.fromiter((f[1] for f in filas), dtype=np.int64, count=len(filas))
+
+        self.producto_ids, filas_idx = np.unique(productos, return_inverse=True)
+        self.insumo_ids, self.indices = np.unique(insumos, return_inverse=True)
+        self.datos = np.fromiter((float(f[2]) for f in filas), dtype=float, count=len(filas))
+        # Las filas vienen ordenadas por producto: indptr marca dónde empieza cada una
+        self.indptr = np.concatenate(([0], np.cumsum(np.bincount(filas_idx, minlength=len(self.producto_ids)))))
+
+    def explotar(self, unidades):
+        """Requerimientos {insumo_id: Decimal} para {producto_id: unidades}.
+
+        Los productos sin receta se ignoran.
+        """
+        if not unidades or not len(self.producto_ids):
+            return {}
+        pids = np.fromiter(unidades.keys(), dtype=np.int64, count=len(unidades))
+        cant = np.fromiter(unidades.values(), dtype=float, count=len(unidades))
+
+        q = np.zeros(len(self.producto_ids))
+        pos = np.searchsorted(self.producto_ids, pids)
+        con_receta = (pos < len(self.producto_ids)) & (self.producto_ids[np.minimum(pos, len(self.producto_ids) - 1)] == pids)
+        np.add.at(q, pos[con_receta], cant[con_receta])
+
+        # Rᵀ·q: cada elemento no nulo aporta datos[k] * q[fila(k)] a su columna
+        por_elemento = self.datos * np.repeat(q, np.diff(self.indptr))
+        total = np.bincount(self.indices, weights=por_elemento, minlength=len(self.insumo_ids))
+        return {
+            int(iid): Decimal(float(valor)).quantize(CANTIDAD)
+            for iid, valor in zip(self.insumo_ids, total) if valor > 0
+        }
+
+
+def _inicio_del_dia(dia):
+    return timezone.make_aware(datetime.combine(dia, time.min))
+
+
+def unidades_vendidas(desde, hasta):
+    """{producto_id: unidades} vendidas en [desde, hasta), en una consulta agrupada."""
+    return dict(
+        DetalleVenta.objects
+        .filter(venta__fecha__gte=_inicio_del_dia(desde), venta__fecha__lt=_inicio_del_dia(hasta))
+        .values('producto_id').annotate(total=Sum('cantidad'))
+        .values_list('producto_id', 'total')
+    )
+
+
+def requerimientos_ventas(desde, hasta):
+    return MatrizRecetas().explotar(unidades_vendidas(desde, hasta))
+
+
+def requerimientos_plan(plan):
+    """Requerimientos para un plan de ``pos.pronostico.plan_produccion``."""
+    return MatrizRecetas().explotar({p['producto_id']: p['producir'] for p in plan if p['producir'] > 0})
+
+
+@transaction.atomic
+def registrar_consumo(requerimientos, referencia, fecha=None):
+    """Descuenta los insumos y registra las salidas, todo en bloque.
+
+    ``referencia`` identifica el período o lote consumido; si ya existen
+    movimientos con esa referencia no se vuelve a descontar (retorna 0).
+    """
+    if not requerimientos or MovimientoInsumo.objects.filter(referencia=referencia).exists():
+        return 0
+    return _descontar(requerimientos, referencia, fecha)
+
+
+def _descontar(requerimientos, referencia, fecha=None):
+    fecha = fecha or timezone.now()
+    MovimientoInsumo.objects.bulk_create([
+        MovimientoInsumo(insumo_id=iid, tipo_movimiento='salida', cantidad=cantidad, fecha=fecha, referencia=referencia)
+        for iid, cantidad in requerimientos.items()
+    ], batch_size=1000)
+    Insumo.objects.filter(id__in=list(requerimientos)).update(
+        stock_actual=F('stock_actual') - Case(
+            *(When(id=iid, then=Value(cantidad)) for iid, cantidad in requerimientos.items()),
+            output_field=DecimalField(max_digits=12, decimal_places=3),
+        )
+    )
+    return len(requerimientos)
+
+
+@transaction.atomic
+def consumir_ventas(desde, hasta):
+    """Explota las ventas de [desde, hasta) aún no consumidas y descuenta sus insumos.
+
+    Cada venta se descuenta una sola vez aunque las ventanas se repitan o se
+    traslapen: sus ids quedan en ``VentaConsumida``. Las ventas pendientes se
+    bloquean con ``select_for_update`` y, si dos corridas igual llegaran a las
+    mismas, la clave primaria hace fallar (y revertir) la segunda.
+    """
+    pendientes = list(
+        Venta.objects.select_for_update()
+        .filter(fecha__gte=_inicio_del_dia(desde), fecha__lt=_inicio_del_dia(hasta))
+        .exclude(id__in=VentaConsumida.objects.values('venta_id'))
+        .values_list('id', flat=True)
+    )
+    if not pendientes:
+        return 0
+    VentaConsumida.objects.bulk_create([VentaConsumida(venta_id=venta_id) for venta_id in pendientes], batch_size=1000)
+
+    unidades = dict(
+        DetalleVenta.objects.filter(venta_id__in=pendientes)
+        .values('producto_id').annotate(total=Sum('cantidad'))
+        .values_list('producto_id', 'total')
+    )
+    requerimientos = MatrizRecetas().explotar(unidades)
+    if not requerimientos:
+        return 0
+    return _descontar(requerimientos, referencia=f"ventas:{desde}:{hasta}")
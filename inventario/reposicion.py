@@ -0,0 +1,131 @@
+"""Motor de reposición de insumos.
+
+Calcula para todos los insumos, con unas pocas consultas agregadas, la velocidad
+de consumo, el punto de reorden y la cantidad a pedir, y genera órdenes de
+compra en borrador agrupadas por proveedor usando inserciones masivas.
+
+    punto_reorden = velocidad * dias_entrega + stock_seguridad
+    stock_seguridad = max(stock_minimo, velocidad * dias_seguridad)
+
+Se pide cuando el stock proyectado (actual + órdenes pendientes) no supera el
+punto de reorden, lo suficiente para cubrir además ``dias_cobertura`` días.
+"""
+import math
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import Insumo, MovimientoInsumo, OrdenCompra, OrdenCompraItem
+
+CANTIDAD = Decimal('0.001')
+MONTO = Decimal('0.01')
+
+
+def _redondear_a_lote(cantidad, lote):
+    if not lote:
+        return cantidad.quantize(CANTIDAD)
+    return (Decimal(math.ceil(cantidad / lote)) * lote).quantize(CANTIDAD)
+
+
+def calcular_reposicion(dias_historia=28, dias_cobertura=7, dias_seguridad=2, ahora=None):
+    """Sugerencias de compra para los insumos bajo su punto de reorden.
+
+    Usa tres consultas sin importar cuántos insumos haya: consumo agregado por
+    insumo, cantidades pendientes en órdenes abiertas y datos de los insumos.
+    Retorna una lista de dicts ordenada por proveedor.
+    """
+    ahora = ahora or timezone.now()
+    desde = ahora - timedelta(days=dias_historia)
+
+    consumo = dict(
+        MovimientoInsumo.objects.filter(tipo_movimiento='salida', fecha__gte=desde, fecha__lt=ahora)
+        .values('insumo_id').annotate(total=Sum('cantidad')).values_list('insumo_id', 'total')
+    )
+    pendiente = dict(
+        OrdenCompraItem.objects.filter(orden__estado__in=OrdenCompra.ESTADOS_PENDIENTES)
+        .values('insumo_id').annotate(total=Sum('cantidad')).values_list('insumo_id', 'total')
+    )
+    insumos = Insumo.objects.filter(proveedor__isnull=False).values(
+        'id', 'nombre', 'stock_actual', 'stock_minimo', 'costo_unitario',
+        'lote_compra', 'proveedor_id', 'proveedor__dias_entrega',
+    )
+
+    historia = Decimal(dias_historia)
+    sugerencias = []
+    for insumo in insumos:
+        velocidad = (consumo.get(insumo['id']) or Decimal('0')) / historia
+        seguridad = max(insumo['stock_minimo'], velocidad * dias_seguridad)
+        punto_reorden = velocidad * insumo['proveedor__dias_entrega'] + seguridad
+        proyectado = insumo['stock_actual'] + (pendiente.get(insumo['id']) or Decimal('0'))
+        if proyectado > punto_reorden:
+            continue
+
+        cantidad = punto_reorden + velocidad * dias_cobertura - proyectado
+        if cantidad <= 0:
+            continue
+        cantidad = _redondear_a_lote(cantidad, insumo['lote_compra'])
+        sugerencias.append({
+            'insumo_id': insumo['id'],
+            'nombre': insumo['nombre'],
+            'proveedor_id': insumo['proveedor_id'],
+            'velocidad_diaria': velocidad.quantize(CANTIDAD),
+            'punto_reorden': punto_reorden.quantize(CANTIDAD),
+            'stock_proyectado': proyectado,
+            'cantidad': cantidad,
+            'precio_unitario': insumo['costo_unitario'],
+        })
+
+    sugerencias.sort(key=lambda s: (s['proveedor_id'], s['insumo_id']))
+    return sugerencias
+
+
+@transaction.atomic
+def generar_ordenes(sugerencias):
+    """Crea una OrdenCompra en borrador por proveedor con sus items, en bloque.
+
+    Las órdenes se insertan con un ``bulk_create`` y se releen por ``plan``
+    (MySQL no devuelve los ids de una inserción masiva); los items van en otro
+    ``bulk_create``. Retorna el identificador del plan.
+    """
+    if not sugerencias:
+        return None
+
+    por_proveedor = defaultdict(list)
+    for s in sugerencias:
+        por_proveedor[s['proveedor_id']].append(s)
+
+    plan = uuid.uuid4().hex
+    ahora = timezone.now()
+    OrdenCompra.objects.bulk_create([
+        OrdenCompra(
+            proveedor_id=proveedor_id,
+            fecha=ahora,
+            estado='borrador',
+            plan=plan,
+            total=sum((s['cantidad'] * s['precio_unitario'] for s in items), Decimal('0')).quantize(MONTO),
+        )
+        for proveedor_id, items in por_proveedor.items()
+    ])
+    orden_por_proveedor = dict(OrdenCompra.objects.filter(plan=plan).values_list('proveedor_id', 'id'))
+
+    OrdenCompraItem.objects.bulk_create([
+        OrdenCompraItem(
+            orden_id=orden_por_proveedor[s['proveedor_id']],
+            insumo_id=s['insumo_id'],
+            cantidad=s['cantidad'],
+            precio_unitario=s['precio_unitario'],
+        )
+        for s in sugerencias
+    ], batch_size=1000)
+    return plan
+
+
+def planificar_compras(**opciones):
+    """Calcula la reposición y genera las órdenes; retorna (plan, sugerencias)."""
+    sugerencias = calcular_reposicion(**opciones)
+    return generar_ordenes(sugerencias), sugerencias
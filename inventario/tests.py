@@ -1,3 +1,139 @@
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
 from django.test import TestCase
+from django.utils import timezone
+
+from pos.models import Categoria, DetalleVenta, Producto, Venta
+
+from .models import Insumo, MovimientoInsumo, OrdenCompra, OrdenCompraItem, Proveedor, Receta
+from .recetas import MatrizRecetas, consumir_ventas
+from .reposicion import calcular_reposicion, planificar_compras
+
+
+class ReposicionTests(TestCase):
+
+    def setUp(self):
+        self.molino = Proveedor.objects.create(nombre='Molino', dias_entrega=3)
+        self.lacteos = Proveedor.objects.create(nombre='Lácteos', dias_entrega=1)
+        self.harina = Insumo.objects.create(
+            nombre='Harina', unidad_medida='kg', stock_actual=20, costo_unitario=900,
+            lote_compra=25, proveedor=self.molino,
+        )
+        self.levadura = Insumo.objects.create(
+            nombre='Levadura', unidad_medida='kg', stock_actual=1, stock_minimo=2,
+            costo_unitario=4000, proveedor=self.molino,
+        )
+        self.mantequilla = Insumo.objects.create(
+            nombre='Mantequilla', unidad_medida='kg', stock_actual=100, costo_unitario=7000,
+            proveedor=self.lacteos,
+        )
+        hace_medio_dia = timezone.now() - timedelta(hours=12)
+        # 280 kg de harina en 28 días: 10 kg/día
+        MovimientoInsumo.objects.bulk_create([
+            MovimientoInsumo(
+                insumo=self.harina, tipo_movimiento='salida', cantidad=10,
+                fecha=hace_medio_dia - timedelta(days=d),
+            )
+            for d in range(28)
+        ])
+        MovimientoInsumo.objects.create(
+            insumo=self.mantequilla, tipo_movimiento='salida', cantidad=28, fecha=hace_medio_dia,
+        )
+
+    def test_calcula_punto_de_reorden_y_cantidad(self):
+        sugerencias = {s['insumo_id']: s for s in calcular_reposicion()}
+
+        harina = sugerencias[self.harina.id]
+        self.assertEqual(harina['velocidad_diaria'], Decimal('10.000'))
+        # 10 kg/día * 3 días de entrega + 20 kg de seguridad
+        self.assertEqual(harina['punto_reorden'], Decimal('50.000'))
+        # 50 + 70 de cobertura - 20 en stock = 100 -> 4 sacos de 25 kg
+        self.assertEqual(harina['cantidad'], Decimal('100.000'))
+
+        self.assertEqual(sugerencias[self.levadura.id]['cantidad'], Decimal('1.000'))
+        self.assertNotIn(self.mantequilla.id, sugerencias)
+
+    def test_considera_ordenes_pendientes(self):
+        orden = OrdenCompra.objects.create(proveedor=self.molino, estado='enviada')
+        OrdenCompraItem.objects.create(orden=orden, insumo=self.harina, cantidad=100, precio_unitario=900)
+
+        ids = {s['insumo_id'] for s in calcular_reposicion()}
+        self.assertNotIn(self.harina.id, ids)
+
+    def test_genera_una_orden_por_proveedor_en_bloque(self):
+        for i in range(50):
+            Insumo.objects.create(nombre=f'Insumo {i}', unidad_medida='un', stock_minimo=5, proveedor=self.lacteos)
+
+        # 3 lecturas agregadas + 2 inserciones masivas + relectura de órdenes + savepoint
+        with self.assertNumQueries(8):
+            plan, sugerencias = planificar_compras()
+
+        ordenes = OrdenCompra.objects.filter(plan=plan)
+        self.assertEqual(ordenes.count(), 2)
+        self.assertEqual(OrdenCompraItem.objects.filter(orden__plan=plan).count(), len(sugerencias))
+        orden_molino = ordenes.get(proveedor=self.molino)
+        self.assertEqual(orden_molino.estado, 'borrador')
+        self.assertEqual(orden_molino.total, Decimal('94000.00'))
+
+
+class RecetasTests(TestCase):
+
+    def setUp(self):
+        categoria = Categoria.objects.create(nombre='Panes')
+        self.marraqueta = Producto.objects.create(nombre='Marraqueta', precio=150, categoria=categoria)
+        self.hallulla = Producto.objects.create(nombre='Hallulla', precio=120, categoria=categoria)
+        self.bebida = Producto.objects.create(nombre='Bebida', precio=900, categoria=categoria)
+        self.harina = Insumo.objects.create(nombre='Harina', unidad_medida='kg', stock_actual=100)
+        self.manteca = Insumo.objects.create(nombre='Manteca', unidad_medida='kg', stock_actual=10)
+        Receta.objects.create(producto=self.marraqueta, insumo=self.harina, cantidad=Decimal('0.0600'))
+        Receta.objects.create(producto=self.hallulla, insumo=self.harina, cantidad=Decimal('0.0500'))
+        Receta.objects.create(producto=self.hallulla, insumo=self.manteca, cantidad=Decimal('0.0080'))
+
+    def test_explota_unidades_en_insumos(self):
+        requerimientos = MatrizRecetas().explotar({self.marraqueta.id: 100, self.hallulla.id: 50, self.bebida.id: 7})
+
+        self.assertEqual(requerimientos, {
+            self.harina.id: Decimal('8.500'),
+            self.manteca.id: Decimal('0.400'),
+        })
+
+    def test_consume_ventas_del_periodo_una_sola_vez(self):
+        dia = date(2026, 3, 10)
+        venta = Venta.objects.create(
+            fecha=timezone.make_aware(datetime.combine(dia, time(11))),
+            total_sin_iva=0, total_iva=0, descuento=0, total_con_iva=0, canal_venta='presencial',
+        )
+        DetalleVenta.objects.create(venta=venta, producto=self.marraqueta, cantidad=10, precio_unitario=150)
+        DetalleVenta.objects.create(venta=venta, producto=self.hallulla, cantidad=20, precio_unitario=120)
+
+        self.assertEqual(consumir_ventas(dia, dia + timedelta(days=1)), 2)
+        self.assertEqual(consumir_ventas(dia, dia + timedelta(days=1)), 0)
+
+        self.harina.refresh_from_db()
+        self.manteca.refresh_from_db()
+        self.assertEqual(self.harina.stock_actual, Decimal('98.400'))
+        self.assertEqual(self.manteca.stock_actual, Decimal('9.840'))
+        self.assertEqual(MovimientoInsumo.objects.filter(tipo_movimiento='salida').count(), 2)
+
+    def test_ventanas_traslapadas_no_descuentan_dos_veces(self):
+        dia = date(2026, 3, 10)
+
+        def vender(cantidad):
+            venta = Venta.objects.create(
+                fecha=timezone.make_aware(datetime.combine(dia, time(11))),
+                total_sin_iva=0, total_iva=0, descuento=0, total_con_iva=0, canal_venta='presencial',
+            )
+            DetalleVenta.objects.create(venta=venta, producto=self.marraqueta, cantidad=cantidad, precio_unitario=150)
+
+        vender(10)
+        self.assertEqual(consumir_ventas(dia, dia + timedelta(days=1)), 1)
+        # Otra ventana que incluye el mismo día no repite la venta ya consumida
+        self.assertEqual(consumir_ventas(dia - timedelta(days=1), dia + timedelta(days=2)), 0)
+
+        # Una venta registrada después sí se consume en la misma ventana
+        vender(5)
+        self.assertEqual(consumir_ventas(dia, dia + timedelta(days=1)), 1)
 
-# Create your tests here.
+        self.harina.refresh_from_db()
+        self.assertEqual(self.harina.stock_actual, Decimal('99.100'))
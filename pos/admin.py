@@ -1,14 +1,206 @@
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
 from .models import *
-# Register your models here.
-admin.site.register(Categoria)
-admin.site.register(Nutricional)
-admin.site.register(Lote)
-admin.site.register(Producto)
-admin.site.register(Alerta)
-admin.site.register(Cliente)
-admin.site.register(Venta)
-admin.site.register(DetalleVenta)
-admin.site.register(MovimientoInventario)
-admin.site.register(Empleado)
-admin.site.register(Turno)
\ No newline at end of file
+
+
+def estimar_filas(modelo, alias='default'):
+    """Filas de la tabla según las estadísticas del motor, sin recorrerla; None si no hay."""
+    tabla = modelo._meta.db_table
+    conexion = connections[alias]
+    if conexion.vendor == 'mysql':
+        sql = ("SELECT TABLE_ROWS FROM information_schema.TABLES "
+               "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s")
+    elif conexion.vendor == 'postgresql':
+        sql = "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass"
+    else:
+        return None
+    with conexion.cursor() as cursor:
+        cursor.execute(sql, [tabla])
+        fila = cursor.fetchone()
+    return fila[0] if fila and fila[0] is not None and fila[0] >= 0 else None
+
+
+class ConteoEstimadoPaginator(Paginator):
+    """Paginador que, sin filtros, usa el conteo estimado en tablas grandes.
+
+    El COUNT(*) exacto de InnoDB recorre un índice completo: con millones de
+    ventas es lo más lento del changelist. Con filtros o búsqueda el conteo
+    sigue siendo exacto (y acotado por los índices del filtro).
+    """
+    umbral = 100000
+
+    @cached_property
+    def count(self):
+        consulta = self.object_list
+        if not consulta.query.where:
+            estimado = estimar_filas(consulta.model, consulta.db)
+            if estimado is not None and estimado > self.umbral:
+                return estimado
+        return super().count
+
+
+class TablaGrandeAdmin(admin.ModelAdmin):
+    paginator = ConteoEstimadoPaginator
+    # Evita el segundo COUNT(*) sobre toda la tabla al filtrar
+    show_full_result_count = False
+
+
+@admin.register(Sucursal)
+class SucursalAdmin(admin.ModelAdmin):
+    list_display = ('codigo', 'nombre', 'direccion', 'activa')
+    search_fields = ('codigo', 'nombre')
+
+
+@admin.register(Categoria)
+class CategoriaAdmin(admin.ModelAdmin):
+    list_display = ('nombre', 'descripcion', 'modificado')
+    search_fields = ('nombre',)
+
+
+@admin.register(Nutricional)
+class NutricionalAdmin(admin.ModelAdmin):
+    list_display = ('producto', 'calorias', 'proteinas', 'grasas', 'carbohidratos')
+    list_select_related = ('producto',)
+    autocomplete_fields = ('producto',)
+
+
+@admin.register(Producto)
+class ProductoAdmin(admin.ModelAdmin):
+    list_display = ('nombre', 'codigo_barra', 'marca', 'precio', 'categoria', 'modificado')
+    list_select_related = ('categoria',)
+    list_filter = ('categoria',)
+    search_fields = ('nombre', '=codigo_barra')
+    autocomplete_fields = ('categoria',)
+
+
+@admin.register(Lote)
+class LoteAdmin(TablaGrandeAdmin):
+    list_display = ('__str__', 'producto', 'sucursal', 'fecha_caducidad', 'stock_actual', 'eliminado')
+    # Lote.__str__ usa producto.nombre
+    list_select_related = ('producto', 'sucursal')
+    list_filter = ('sucursal', ('eliminado', admin.EmptyFieldListFilter))
+    search_fields = ('numero_lote', 'producto__nombre')
+    autocomplete_fields = ('producto',)
+
+    def get_queryset(self, request):
+        # También los dados de baja, para revisarlos o restaurarlos
+        consulta = Lote.todos.get_queryset()
+        ordering = self.get_ordering(request)
+        return consulta.order_by(*ordering) if ordering else consulta
+
+
+@admin.register(LoteArchivado)
+class LoteArchivadoAdmin(TablaGrandeAdmin):
+    list_display = ('__str__', 'producto', 'sucursal', 'fecha_caducidad', 'stock_actual', 'eliminado', 'archivado')
+    list_select_related = ('producto', 'sucursal')
+    list_filter = ('sucursal',)
+    search_fields = ('numero_lote', 'producto__nombre')
+    raw_id_fields = ('producto',)
+
+
+@admin.register(Alerta)
+class AlertaAdmin(TablaGrandeAdmin):
+    list_display = ('producto', 'tipo_alerta', 'estado', 'fecha_generada', 'mensaje')
+    list_select_related = ('producto',)
+    list_filter = ('tipo_alerta', 'estado')
+    autocomplete_fields = ('producto',)
+
+
+@admin.register(Cliente)
+class ClienteAdmin(TablaGrandeAdmin):
+    list_display = ('rut', 'nombre', 'visitas', 'ultima_compra', 'gasto_total', 'segmento_rfm')
+    list_filter = ('segmento_rfm',)
+    search_fields = ('=rut', 'nombre')
+    readonly_fields = ('visitas', 'ultima_compra', 'gasto_total', 'segmento_rfm')
+
+
+class DetalleVentaInline(admin.TabularInline):
+    model = DetalleVenta
+    extra = 0
+    autocomplete_fields = ('producto',)
+
+
+class PagoInline(admin.TabularInline):
+    model = Pago
+    extra = 0
+
+
+@admin.register(Venta)
+class VentaAdmin(TablaGrandeAdmin):
+    list_display = ('id', 'folio', 'fecha', 'sucursal', 'canal_venta', 'total_con_iva', 'total_pagado', 'cliente',
+                    'empleado')
+    list_select_related = ('cliente', 'empleado', 'sucursal')
+    list_filter = ('sucursal', 'canal_venta')
+    date_hierarchy = 'fecha'
+    search_fields = ('=folio', '=cliente__rut')
+    autocomplete_fields = ('cliente', 'empleado')
+    raw_id_fields = ('sesion_caja',)
+    readonly_fields = ('total_pagado',)
+    inlines = [DetalleVentaInline, PagoInline]
+
+
+@admin.register(DetalleVenta)
+class DetalleVentaAdmin(TablaGrandeAdmin):
+    list_display = ('id', 'venta', 'producto', 'cantidad', 'precio_unitario', 'descuento_pct')
+    list_select_related = ('venta', 'producto')
+    raw_id_fields = ('venta',)
+    autocomplete_fields = ('producto',)
+
+
+@admin.register(Pago)
+class PagoAdmin(TablaGrandeAdmin):
+    list_display = ('id', 'venta', 'metodo', 'monto', 'referencia', 'fecha')
+    list_filter = ('metodo',)
+    raw_id_fields = ('venta',)
+
+
+@admin.register(MovimientoInventario)
+class MovimientoInventarioAdmin(TablaGrandeAdmin):
+    list_display = ('id', 'producto', 'sucursal', 'tipo_movimiento', 'cantidad', 'fecha')
+    list_select_related = ('producto', 'sucursal')
+    list_filter = ('sucursal', 'tipo_movimiento')
+    autocomplete_fields = ('producto',)
+
+
+@admin.register(Empleado)
+class EmpleadoAdmin(admin.ModelAdmin):
+    list_display = ('nombres', 'apellido_paterno', 'run', 'cargo', 'sucursal', 'usuario')
+    list_select_related = ('usuario', 'sucursal')
+    list_filter = ('sucursal',)
+    search_fields = ('nombres', 'apellido_paterno', '=run')
+    raw_id_fields = ('usuario',)
+
+
+@admin.register(SesionCaja)
+class SesionCajaAdmin(admin.ModelAdmin):
+    list_display = ('id', 'sucursal', 'terminal', 'empleado', 'abierta', 'cerrada', 'cantidad_ventas',
+                    'total_efectivo', 'efectivo_contado', 'diferencia')
+    list_select_related = ('empleado', 'sucursal')
+    list_filter = ('sucursal',)
+    date_hierarchy = 'abierta'
+    autocomplete_fields = ('empleado',)
+    readonly_fields = ('cantidad_ventas', 'total_efectivo', 'total_debito', 'total_credito', 'diferencia')
+
+
+@admin.register(Turno)
+class TurnoAdmin(TablaGrandeAdmin):
+    list_display = ('empleado', 'fecha', 'hora_entrada', 'hora_salida')
+    list_select_related = ('empleado',)
+    autocomplete_fields = ('empleado',)
+
+
+@admin.register(EventoSalida)
+class EventoSalidaAdmin(TablaGrandeAdmin):
+    list_display = ('id', 'tipo', 'objeto_id', 'creado', 'procesado', 'intentos')
+    list_filter = ('tipo',)
+    readonly_fields = ('creado',)
+
+
+@admin.register(TrabajoReporte)
+class TrabajoReporteAdmin(admin.ModelAdmin):
+    list_display = ('id', 'tipo', 'estado', 'cacheable', 'tamano', 'creado', 'terminado', 'ultimo_acceso')
+    list_filter = ('estado', 'tipo')
+    raw_id_fields = ('solicitado_por',)
@@ -0,0 +1,154 @@
+"""Analítica de dotación: ventas, tickets y unidades por hora trabajada.
+
+Se leen los turnos y las ventas del período con dos consultas y se relacionan
+con un barrido ordenado de intervalos, sin consultar turno por turno:
+
+* por hora del día: horas trabajadas (los turnos se reparten entre las horas
+  que cubren) contra lo vendido en esa hora;
+* por empleado: sus horas de turno contra sus ventas, marcando las ventas que
+  registró fuera de cualquiera de sus turnos;
+* por dotación: cuánto tiempo hubo k personas en turno y cuánto se vendió con
+  esa dotación.
+"""
+import bisect
+import itertools
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db.models import Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Empleado, Turno, Venta
+
+
+def _intervalo_turno(fecha, entrada, salida):
+    inicio = timezone.make_aware(datetime.combine(fecha, entrada))
+    fin = timezone.make_aware(datetime.combine(fecha, salida))
+    if fin <= inicio:  # turno que cruza la medianoche
+        fin += timedelta(days=1)
+    return inicio.timestamp(), fin.timestamp()
+
+
+def _repartir_por_hora(inicio, fin, horas):
+    """Suma a ``horas[h]`` las horas del intervalo [inicio, fin) en cada hora local."""
+    zona = timezone.get_current_timezone()
+    actual = datetime.fromtimestamp(inicio, tz=zona)
+    fin_dt = datetime.fromtimestamp(fin, tz=zona)
+    while actual < fin_dt:
+        siguiente = (actual + timedelta(hours=1)).replace(minute=0, second=0, microsecond=0)
+        tramo = min(siguiente, fin_dt)
+        horas[actual.hour] += (tramo - actual).total_seconds() / 3600
+        actual = tramo
+
+
+def _tasas(fila, horas):
+    for campo in ('ventas', 'tickets', 'unidades'):
+        fila[f'{campo}_por_hora'] = round(fila[campo] / horas, 2) if horas else None
+    return fila
+
+
+def productividad_personal(desde, hasta):
+    """Métricas por hora del día, empleado y dotación para turnos en [desde, hasta)."""
+    inicio_periodo = timezone.make_aware(datetime.combine(desde, time.min))
+    fin_periodo = timezone.make_aware(datetime.combine(hasta, time.min))
+
+    turnos = [
+        (empleado_id, *_intervalo_turno(fecha, entrada, salida))
+        for empleado_id, fecha, entrada, salida in Turno.objects.filter(fecha__gte=desde, fecha__lt=hasta)
+        .values_list('empleado_id', 'fecha', 'hora_entrada', 'hora_salida')
+    ]
+    ventas = sorted(
+        (v['fecha'].timestamp(), v['empleado_id'], float(v['total_con_iva']), v['unidades'], v['fecha'])
+        for v in Venta.objects.filter(fecha__gte=inicio_periodo, fecha__lt=fin_periodo)
+        # con el id: dos ventas iguales (empleado, instante y total) no se agrupan en una
+        .values('id', 'empleado_id', 'fecha', 'total_con_iva')
+        .annotate(unidades=Coalesce(Sum('detalles__cantidad'), 0))
+    )
+
+    # Horas trabajadas por hora del día y por empleado
+    horas_por_hora = defaultdict(float)
+    horas_por_empleado = defaultdict(float)
+    turnos_por_empleado = defaultdict(list)
+    for empleado_id, inicio, fin in turnos:
+        _repartir_por_hora(inicio, fin, horas_por_hora)
+        horas_por_empleado[empleado_id] += (fin - inicio) / 3600
+        turnos_por_empleado[empleado_id].append((inicio, fin))
+
+    por_hora = {h: {'hora': h, 'ventas': 0.0, 'tickets': 0, 'unidades': 0} for h in range(24)}
+    por_empleado = defaultdict(lambda: {'ventas': 0.0, 'tickets': 0, 'unidades': 0, 'ventas_fuera_de_turno': 0})
+    ventas_por_empleado = defaultdict(list)
+    for t, empleado_id, total, unidades, fecha in ventas:
+        for fila in (por_hora[timezone.localtime(fecha).hour], por_empleado[empleado_id] if empleado_id else None):
+            if fila is not None:
+                fila['ventas'] += total
+                fila['tickets'] += 1
+                fila['unidades'] += unidades
+        if empleado_id is not None:
+            ventas_por_empleado[empleado_id].append(t)
+
+    # Ventas de cada empleado fuera de sus turnos: turnos ordenados por inicio,
+    # máximo acumulado de los fines y búsqueda binaria por venta.
+    for empleado_id, instantes in ventas_por_empleado.items():
+        intervalos = sorted(turnos_por_empleado.get(empleado_id, []))
+        inicios = [inicio for inicio, _ in intervalos]
+        fines_max = list(itertools.accumulate((fin for _, fin in intervalos), max))
+        for t in instantes:
+            k = bisect.bisect_right(inicios, t) - 1
+            if k < 0 or fines_max[k] <= t:
+                por_empleado[empleado_id]['ventas_fuera_de_turno'] += 1
+
+    por_dotacion = _barrido_dotacion(turnos, ventas)
+
+    nombres = {
+        e['id']: f"{e['nombres']} {e['apellido_paterno']}"
+        for e in Empleado.objects.filter(id__in=set(horas_por_empleado) | set(por_empleado))
+        .values('id', 'nombres', 'apellido_paterno')
+    }
+    empleados = []
+    for empleado_id in sorted(set(horas_por_empleado) | set(por_empleado)):
+        horas = horas_por_empleado.get(empleado_id, 0.0)
+        fila = dict(por_empleado[empleado_id], empleado_id=empleado_id, nombre=nombres.get(empleado_id),
+                    horas_trabajadas=round(horas, 2), turnos=len(turnos_por_empleado.get(empleado_id, [])))
+        empleados.append(_tasas(fila, horas))
+
+    return {
+        'por_hora': [
+            _tasas(dict(fila, horas_trabajadas=round(horas_por_hora[h], 2)), horas_por_hora[h])
+            for h, fila in por_hora.items()
+        ],
+        'por_empleado': empleados,
+        'por_dotacion': por_dotacion,
+    }
+
+
+def _barrido_dotacion(turnos, ventas):
+    """Barre entradas, salidas y ventas en orden temporal llevando cuántos hay en turno."""
+    eventos = sorted([(inicio, 1) for _, inicio, _ in turnos] + [(fin, -1) for _, _, fin in turnos])
+    niveles = defaultdict(lambda: {'segundos': 0.0, 'ventas': 0.0, 'tickets': 0, 'unidades': 0})
+    en_turno = 0
+    anterior = eventos[0][0] if eventos else None
+    i = 0
+    for t, _, total, unidades, _ in ventas:
+        while i < len(eventos) and eventos[i][0] <= t:
+            niveles[en_turno]['segundos'] += eventos[i][0] - anterior
+            anterior = eventos[i][0]
+            en_turno += eventos[i][1]
+            i += 1
+        nivel = niveles[en_turno]
+        nivel['ventas'] += total
+        nivel['tickets'] += 1
+        nivel['unidades'] += unidades
+    while i < len(eventos):
+        niveles[en_turno]['segundos'] += eventos[i][0] - anterior
+        anterior = eventos[i][0]
+        en_turno += eventos[i][1]
+        i += 1
+
+    resultado = []
+    for personas in sorted(niveles):
+        nivel = niveles[personas]
+        horas_persona = nivel.pop('segundos') / 3600 * personas
+        fila = dict(nivel, personas=personas, horas_trabajadas=round(horas_persona, 2))
+        resultado.append(_tasas(fila, horas_persona))
+    return resultado
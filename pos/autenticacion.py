@@ -0,0 +1,82 @@
+"""Autenticación sin consultas en el camino caliente.
+
+El usuario autenticado (con su ``Empleado`` y sus permisos ya cargados) se
+guarda en el cache compartido por ``POS_AUTH_CACHE_SEGUNDOS``. Lo usan:
+
+- ``JWTCacheadoAuthentication``: valida el JWT sin estado (firma y
+  expiración) y toma el usuario del cache en vez de leerlo de la base;
+- ``BackendCacheado``: backend de Django para las sesiones, así
+  ``request.user`` de una terminal con sesión tampoco consulta la base (la
+  sesión misma se lee del cache si este es compartido, ver settings).
+
+Las señales de ``pos.signals`` borran la entrada al cambiar el usuario, su
+empleado, sus grupos o los permisos de sus grupos; el TTL acota lo que pueda
+escaparse (p. ej. un ``update()`` masivo).
+"""
+from asgiref.sync import sync_to_async
+from dj_rest_auth.jwt_auth import JWTCookieAuthentication
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+CLAVE_USUARIO = 'pos:auth:usuario:{}'
+_NO_EXISTE = 'no-existe'
+
+
+def usuario(user_id):
+    """Usuario activo o no, con empleado y permisos precargados; None si no existe."""
+    clave = CLAVE_USUARIO.format(user_id)
+    user = cache.get(clave)
+    if user is None:
+        user = get_user_model().objects.select_related('empleado').filter(pk=user_id).first()
+        if user is not None:
+            # ModelBackend deja los permisos en atributos del objeto, que viajan al cache con él
+            ModelBackend().get_all_permissions(user)
+        cache.set(clave, user if user is not None else _NO_EXISTE, getattr(settings, 'POS_AUTH_CACHE_SEGUNDOS', 60))
+    return None if isinstance(user, str) else user
+
+
+def invalidar(*user_ids):
+    cache.delete_many([CLAVE_USUARIO.format(user_id) for user_id in user_ids])
+
+
+def empleado_de(user):
+    """Empleado del usuario (ya precargado si vino de ``usuario``); None si no tiene."""
+    if user is None or not user.is_authenticated:
+        return None
+    return getattr(user, 'empleado', None)
+
+
+class BackendCacheado(ModelBackend):
+    def get_user(self, user_id):
+        user = usuario(user_id)
+        return user if user is not None and self.user_can_authenticate(user) else None
+
+    async def aget_user(self, user_id):
+        # ModelBackend.aget_user consulta la base directamente; las vistas async (tablero) usan el cache
+        return await sync_to_async(self.get_user)(user_id)
+
+
+class JWTCacheadoAuthentication(JWTCookieAuthentication):
+    """JWTCookieAuthentication con el usuario servido desde el cache."""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        user = usuario(user_id)
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        return user
@@ -0,0 +1,271 @@
+"""Comprobante de venta en ESC/POS (impresora térmica) y en HTML.
+
+El diseño (``DISENO``) se compila una sola vez al importar el módulo: los datos
+del emisor se resuelven en ese momento, las partes fijas quedan ya codificadas
+y solo lo que depende de la venta se formatea en cada render. El ESC/POS se
+escribe en un ``bytearray`` por hilo que se reutiliza entre comprobantes.
+
+Ambos formatos usan las mismas líneas de texto de ``ancho`` columnas, así que
+la versión HTML (``<pre>``) se ve igual que el papel.
+"""
+import html
+import threading
+from datetime import datetime
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import DetalleVenta, Pago, Venta
+from .templatetags.currency_extras import clp
+
+ANCHO = getattr(settings, 'POS_BOLETA_ANCHO', 42)
+EMISOR = {
+    'emisor': getattr(settings, 'POS_BOLETA_EMISOR', 'Forneria'),
+    'emisor_rut': getattr(settings, 'POS_BOLETA_RUT', ''),
+    'emisor_direccion': getattr(settings, 'POS_BOLETA_DIRECCION', ''),
+    'pie': getattr(settings, 'POS_BOLETA_PIE', 'Gracias por su compra'),
+}
+METODOS = dict(Pago.METODO_CHOICES)
+
+# Cada paso: (tipo, *argumentos). Las plantillas usan str.format con los datos
+# de armar_datos(); un "par" con el valor vacío no se imprime.
+DISENO = (
+    ('centro',),
+    ('doble', '{emisor}'),
+    ('texto', '{emisor_rut}'),
+    ('texto', '{emisor_direccion}'),
+    ('texto', 'Comprobante de venta'),
+    ('izquierda',),
+    ('separador',),
+    ('par', 'Folio', '{folio}'),
+    ('par', 'Fecha', '{fecha}'),
+    ('par', 'Cliente', '{cliente}'),
+    ('par', 'Cajero', '{cajero}'),
+    ('separador',),
+    ('items',),
+    ('separador',),
+    ('par', 'Neto', '{neto}'),
+    ('par', 'IVA 19%', '{iva}'),
+    ('total', 'TOTAL', '{total}'),
+    ('separador',),
+    ('pagos',),
+    ('par', 'Vuelto', '{vuelto}'),
+    ('centro',),
+    ('texto', ''),
+    ('texto', '{pie}'),
+    ('corte',),
+)
+
+
+def _par(izquierda, derecha, ancho):
+    espacio = ancho - len(izquierda) - len(derecha)
+    if espacio < 1:
+        izquierda = izquierda[:max(ancho - len(derecha) - 1, 0)]
+        espacio = 1
+    return f"{izquierda}{' ' * espacio}{derecha}"
+
+
+class _Pendiente(dict):
+    """Deja intactos los campos de la venta al resolver los del emisor."""
+    def __missing__(self, clave):
+        return '{' + clave + '}'
+
+
+class EscPos:
+    ESC, GS = b'\x1b', b'\x1d'
+    inicio = ESC + b'@' + ESC + b't\x13'  # reiniciar y tabla de caracteres CP858 (tildes, ñ)
+    fin = b''
+    centro = ESC + b'a\x01'
+    izquierda = ESC + b'a\x00'
+    corte = ESC + b'd\x04' + GS + b'V\x42\x00'  # avanzar 4 líneas y corte parcial
+
+    def __init__(self, ancho):
+        self.ancho = ancho
+
+    def linea(self, texto):
+        return texto[:self.ancho].encode('cp858', 'replace') + b'\n'
+
+    def doble(self, texto):
+        # doble ancho y alto: caben la mitad de columnas
+        return self.GS + b'!\x11' + texto[:self.ancho // 2].encode('cp858', 'replace') + b'\n' + self.GS + b'!\x00'
+
+    def negrita(self, texto):
+        return self.ESC + b'E\x01' + self.linea(texto) + self.ESC + b'E\x00'
+
+
+class Html:
+    inicio = '<pre class="boleta" style="font-family:monospace;width:{}ch;margin:0 auto">'
+    fin = '</pre>'
+    centro = izquierda = ''
+    corte = ''
+
+    def __init__(self, ancho):
+        self.ancho = ancho
+        self.inicio = self.inicio.format(ancho)
+
+    def linea(self, texto):
+        return html.escape(texto[:self.ancho]) + '\n'
+
+    def doble(self, texto):
+        return '<b style="font-size:1.6em">' + html.escape(texto[:self.ancho // 2]) + '</b>\n'
+
+    def negrita(self, texto):
+        return '<b>' + self.linea(texto).rstrip('\n') + '</b>\n'
+
+
+class Diseno:
+    """Diseño compilado para un formato: lista de partes fijas y funciones por venta."""
+
+    def __init__(self, diseno, formato, constantes):
+        self.formato = formato
+        self.partes = []
+        self._agregar(formato.inicio)
+        for paso in diseno:
+            self._compilar(paso, constantes)
+        self._agregar(formato.fin)
+
+    def _agregar(self, parte):
+        # Las partes fijas consecutivas se unen en una sola
+        if self.partes and not callable(parte) and not callable(self.partes[-1]):
+            self.partes[-1] = self.partes[-1] + parte
+        elif parte:
+            self.partes.append(parte)
+
+    def _compilar(self, paso, constantes):
+        f, ancho = self.formato, self.formato.ancho
+        tipo, *args = paso
+        args = [a.format_map(constantes) for a in args]
+        dinamico = any('{' in a for a in args)
+
+        if tipo in ('centro', 'izquierda', 'corte'):
+            self._agregar(getattr(f, tipo))
+        elif tipo == 'separador':
+            self._agregar(f.linea('-' * ancho))
+        elif tipo in ('texto', 'doble'):
+            dibujar = f.linea if tipo == 'texto' else f.doble
+            if not dinamico:
+                # un dato del emisor vacío no deja línea; ('texto', '') sí (espaciado)
+                if args[0] or not paso[1]:
+                    self._agregar(dibujar(args[0]))
+            else:
+                plantilla = args[0]
+                self._agregar(lambda datos, salida: salida.append(dibujar(plantilla.format_map(datos))))
+        elif tipo in ('par', 'total'):
+            izquierda, derecha = args
+            dibujar = f.linea if tipo == 'par' else f.negrita
+
+            def par(datos, salida):
+                valor = derecha.format_map(datos)
+                if valor:
+                    salida.append(dibujar(_par(izquierda, valor, ancho)))
+            self._agregar(par)
+        elif tipo == 'items':
+            def items(datos, salida):
+                for item in datos['items']:
+                    salida.append(f.linea(_par(f"{item['cantidad']} x {item['nombre']}", item['total'], ancho)))
+                    if item['descuento']:
+                        salida.append(f.linea(_par(f"  Descuento {item['descuento_pct']}%", item['descuento'], ancho)))
+            self._agregar(items)
+        elif tipo == 'pagos':
+            def pagos(datos, salida):
+                for metodo, monto in datos['pagos']:
+                    salida.append(f.linea(_par(metodo, monto, ancho)))
+            self._agregar(pagos)
+        else:
+            raise ValueError(f'Paso de diseño desconocido: {tipo}')
+
+    def render(self, datos, salida):
+        for parte in self.partes:
+            if callable(parte):
+                parte(datos, salida)
+            else:
+                salida.append(parte)
+
+
+ESCPOS = Diseno(DISENO, EscPos(ANCHO), _Pendiente(EMISOR))
+HTML = Diseno(DISENO, Html(ANCHO), _Pendiente(EMISOR))
+
+_local = threading.local()
+
+
+class _Buffer:
+    """bytearray por hilo con la interfaz append que usa Diseno.render."""
+    def __init__(self):
+        self.datos = bytearray()
+
+    def append(self, parte):
+        self.datos += parte
+
+
+def _numero(valor):
+    return f"{float(valor):g}"
+
+
+def armar_datos(venta, detalles, pagos, cliente_rut=None):
+    """Datos del comprobante.
+
+    ``detalles``: tuplas (cantidad, nombre, precio_unitario, descuento_pct).
+    ``pagos``: tuplas (metodo, monto). ``cliente_rut`` evita leer venta.cliente
+    cuando quien llama ya lo tiene (checkout).
+    """
+    items = []
+    for cantidad, nombre, precio, descuento_pct in detalles:
+        bruto = float(precio) * cantidad
+        descuento = bruto * float(descuento_pct or 0) / 100
+        items.append({
+            'cantidad': cantidad, 'nombre': nombre, 'total': clp(bruto),
+            'descuento_pct': _numero(descuento_pct or 0), 'descuento': f"-{clp(descuento)}" if descuento else '',
+        })
+    fecha = venta.fecha
+    if isinstance(fecha, datetime) and timezone.is_aware(fecha):
+        fecha = timezone.localtime(fecha)
+    return {
+        'folio': venta.folio or f"V{venta.id:06d}",
+        'fecha': fecha.strftime('%d-%m-%Y %H:%M'),
+        'cliente': cliente_rut or (venta.cliente.rut if venta.cliente_id else ''),
+        'cajero': str(venta.empleado) if venta.empleado_id else '',
+        'items': items,
+        'neto': clp(venta.total_sin_iva),
+        'iva': clp(venta.total_iva),
+        'total': clp(venta.total_con_iva),
+        'pagos': [(METODOS.get(metodo, metodo), clp(monto)) for metodo, monto in pagos],
+        'vuelto': clp(venta.vuelto) if venta.vuelto else '',
+    }
+
+
+def datos_venta(venta_id, sucursal_id=None):
+    """Lee venta, cliente, cajero, detalles y productos en una consulta; los pagos en otra.
+
+    Con ``sucursal_id``, una venta de otra sucursal lanza ``Venta.DoesNotExist``.
+    """
+    detalles = DetalleVenta.objects.filter(venta_id=venta_id)
+    ventas = Venta.objects.filter(pk=venta_id)
+    if sucursal_id is not None:
+        detalles = detalles.filter(venta__sucursal_id=sucursal_id)
+        ventas = ventas.filter(sucursal_id=sucursal_id)
+    detalles = list(detalles.select_related('venta__cliente', 'venta__empleado', 'producto').order_by('id'))
+    if detalles:
+        venta = detalles[0].venta
+    else:
+        venta = ventas.select_related('cliente', 'empleado').get()
+    pagos = Pago.objects.filter(venta_id=venta_id).order_by('id').values_list('metodo', 'monto')
+    return armar_datos(
+        venta,
+        [(d.cantidad, d.producto.nombre, d.precio_unitario, d.descuento_pct) for d in detalles],
+        list(pagos),
+    )
+
+
+def escpos(datos):
+    buffer = getattr(_local, 'buffer', None)
+    if buffer is None:
+        buffer = _local.buffer = _Buffer()
+    del buffer.datos[:]
+    ESCPOS.render(datos, buffer)
+    return bytes(buffer.datos)
+
+
+def html_boleta(datos):
+    partes = []
+    HTML.render(datos, partes)
+    return ''.join(partes)
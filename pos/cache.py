@@ -0,0 +1,137 @@
+"""Caches del POS: versiones del catálogo y un LRU en memoria del proceso.
+
+Las versiones del catálogo se usan como parte de las claves de cache. Cada
+producto tiene una versión propia que se renueva cuando cambia el producto
+o alguno de sus lotes (ver ``pos.signals``). Además existe una versión global
+del catálogo que se renueva en operaciones masivas, que no disparan señales por
+fila. Una tarjeta o lectura cacheada queda obsoleta apenas cambia cualquiera de
+las dos, sin necesidad de borrar entradas del cache.
+
+Los listados completos de la API (productos, categorías) usan además una
+versión de listados, que se renueva con cualquier cambio del catálogo.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import cache
+
+CLAVE_CATALOGO = 'pos:catalogo:v'
+CLAVE_PRODUCTO = 'pos:producto:{}:v'
+CLAVE_LISTADOS = 'pos:listados:v'
+
+
+def _nueva_version():
+    return time.time_ns()
+
+
+def version_catalogo():
+    """Versión global del catálogo (se inicializa si el cache no la tiene)."""
+    version = cache.get(CLAVE_CATALOGO)
+    if version is None:
+        version = _nueva_version()
+        cache.add(CLAVE_CATALOGO, version, timeout=None)
+        version = cache.get(CLAVE_CATALOGO, version)
+    return version
+
+
+def renovar_catalogo():
+    """Invalida de una vez todo lo cacheado con la versión global."""
+    cache.set(CLAVE_CATALOGO, _nueva_version(), timeout=None)
+
+
+def renovar_producto(producto_id):
+    """Invalida lo cacheado para un producto (precio, nombre o stock) y los listados que lo incluyen."""
+    version = _nueva_version()
+    cache.set_many({CLAVE_PRODUCTO.format(producto_id): version, CLAVE_LISTADOS: version}, timeout=None)
+
+
+def renovar_listados():
+    cache.set(CLAVE_LISTADOS, _nueva_version(), timeout=None)
+
+
+def version_listados():
+    """Versión "global.listados": cambia con cualquier cambio del catálogo, masivo o por fila."""
+    encontrados = cache.get_many([CLAVE_CATALOGO, CLAVE_LISTADOS])
+    global_v = encontrados.get(CLAVE_CATALOGO) or version_catalogo()
+    listados_v = encontrados.get(CLAVE_LISTADOS)
+    if listados_v is None:
+        listados_v = _nueva_version()
+        cache.add(CLAVE_LISTADOS, listados_v, timeout=None)
+        listados_v = cache.get(CLAVE_LISTADOS, listados_v)
+    return f"{global_v}.{listados_v}"
+
+
+def versiones_productos(ids):
+    """Retorna {producto_id: "global.producto"} con una sola lectura al cache.
+
+    Las versiones que falten (producto nunca versionado o entrada expulsada del
+    cache) se inicializan con un valor nuevo, de modo que nunca se reutiliza un
+    fragmento renderizado con una versión anterior.
+    """
+    claves = {CLAVE_PRODUCTO.format(pid): pid for pid in ids}
+    encontrados = cache.get_many([CLAVE_CATALOGO, *claves])
+
+    global_v = encontrados.get(CLAVE_CATALOGO)
+    if global_v is None:
+        global_v = version_catalogo()
+
+    faltantes = {clave: _nueva_version() for clave in claves if clave not in encontrados}
+    if faltantes:
+        cache.set_many(faltantes, timeout=None)
+        encontrados.update(faltantes)
+
+    return {pid: f"{global_v}.{encontrados[clave]}" for clave, pid in claves.items()}
+
+
+class LRUCache:
+    """Cache LRU en memoria del proceso, con expiración opcional por entrada.
+
+    Pensado para lecturas muy calientes (escaneo de códigos, RUT→cliente) donde
+    incluso un viaje al cache compartido es demasiado. Cada proceso tiene su
+    propia copia: la invalidación por señales solo alcanza al proceso que hizo
+    el cambio, por eso ``ttl`` acota cuánto puede quedar obsoleta en los demás.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, clave, default=None):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return default
+            expira, valor = entrada
+            if expira is not None and expira < time.monotonic():
+                del self._datos[clave]
+                return default
+            self._datos.move_to_end(clave)
+            return valor
+
+    def set(self, clave, valor):
+        expira = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._datos[clave] = (expira, valor)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.maxsize:
+                self._datos.popitem(last=False)
+
+    def delete(self, clave):
+        with self._lock:
+            self._datos.pop(clave, None)
+
+    def clear(self):
+        with self._lock:
+            self._datos.clear()
+
+    def __len__(self):
+        return len(self._datos)
+
+    def __contains__(self, clave):
+        return self.get(clave, _FALTA) is not _FALTA
+
+
+_FALTA = object()
@@ -0,0 +1,118 @@
+"""Sesiones de caja por terminal y empleado.
+
+Cada venta con ``sesion_caja`` suma sus pagos a los contadores de la sesión en
+un solo UPDATE con F(), dentro de la transacción de la venta. El cierre solo
+lee y escribe la fila de la sesión: cerrar veinte cajas a la vez no recorre
+la tabla de ventas. ``recalcular`` reconstruye los contadores desde los pagos
+cuando hay que auditar una sesión.
+"""
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q, Sum
+from django.utils import timezone
+
+from . import sucursales
+from .models import Pago, SesionCaja, Venta
+
+# Medio de pago -> contador de la sesión
+CONTADORES = {'EFE': 'total_efectivo', 'DEB': 'total_debito', 'CRE': 'total_credito'}
+
+
+def abrir(terminal, empleado, fondo_inicial=0, sucursal_id=None):
+    """Abre una sesión en ``terminal``. ValueError si ya hay una abierta allí."""
+    terminal = (terminal or '').strip()
+    if not terminal:
+        raise ValueError('Indique la terminal')
+    fondo = Decimal(str(fondo_inicial or 0))
+    if fondo < 0:
+        raise ValueError('El fondo inicial no puede ser negativo')
+    sucursal_id = sucursal_id or sucursales.actual_id()
+    try:
+        with transaction.atomic():
+            return SesionCaja.objects.create(
+                sucursal_id=sucursal_id, terminal=terminal, terminal_abierta=terminal, empleado=empleado,
+                fondo_inicial=fondo,
+            )
+    except IntegrityError:
+        raise ValueError(f'La terminal {terminal} ya tiene una caja abierta')
+
+
+def registrar_venta(sesion_id, pagos, sucursal_id):
+    """Suma una venta a la sesión; llamar dentro de la transacción de la venta.
+
+    ``pagos`` son dicts con metodo y monto (lo aplicado a la venta). Lanza
+    ValueError si la sesión no existe, es de otra sucursal o ya está cerrada.
+    """
+    totales = {}
+    for pago in pagos:
+        campo = CONTADORES[pago['metodo']]
+        totales[campo] = totales.get(campo, Decimal('0')) + Decimal(str(pago['monto']))
+    actualizados = SesionCaja.objects.filter(pk=sesion_id, sucursal_id=sucursal_id, cerrada__isnull=True).update(
+        cantidad_ventas=F('cantidad_ventas') + 1,
+        **{campo: F(campo) + monto for campo, monto in totales.items()},
+    )
+    if not actualizados:
+        raise ValueError('La sesión de caja no existe o está cerrada')
+
+
+def cerrar(sesion_id, efectivo_contado, observacion='', sucursal_id=None):
+    """Cierra la sesión con el efectivo contado y calcula la diferencia."""
+    contado = Decimal(str(efectivo_contado))
+    if contado < 0:
+        raise ValueError('El efectivo contado no puede ser negativo')
+    with transaction.atomic():
+        # el bloqueo espera a una venta en curso de la misma caja
+        sesion = SesionCaja.objects.select_for_update().get(pk=sesion_id, sucursal_id=sucursal_id or sucursales.actual_id())
+        if sesion.cerrada is not None:
+            raise ValueError('La sesión de caja ya está cerrada')
+        sesion.cerrada = timezone.now()
+        sesion.terminal_abierta = None
+        sesion.efectivo_contado = contado
+        sesion.diferencia = contado - sesion.efectivo_esperado
+        sesion.observacion = observacion[:200]
+        sesion.save(update_fields=['cerrada', 'terminal_abierta', 'efectivo_contado', 'diferencia', 'observacion'])
+    return sesion
+
+
+def resumen(sesion):
+    return {
+        'id': sesion.id,
+        'terminal': sesion.terminal,
+        'empleado_id': sesion.empleado_id,
+        'empleado': str(sesion.empleado),
+        'abierta': sesion.abierta,
+        'cerrada': sesion.cerrada,
+        'cantidad_ventas': sesion.cantidad_ventas,
+        'fondo_inicial': str(sesion.fondo_inicial),
+        'totales': {metodo: str(getattr(sesion, campo)) for metodo, campo in CONTADORES.items()},
+        'efectivo_esperado': str(sesion.efectivo_esperado),
+        'efectivo_contado': None if sesion.efectivo_contado is None else str(sesion.efectivo_contado),
+        'diferencia': None if sesion.diferencia is None else str(sesion.diferencia),
+        'observacion': sesion.observacion,
+    }
+
+
+def cuadratura(desde, hasta, sucursal_id):
+    """Sesiones de la sucursal cerradas en [desde, hasta), de mayor faltante a mayor sobrante."""
+    sesiones = list(
+        SesionCaja.objects.filter(sucursal_id=sucursal_id, cerrada__gte=desde, cerrada__lt=hasta).select_related('empleado')
+        .order_by('diferencia', 'id')
+    )
+    diferencias = [s.diferencia for s in sesiones]
+    return {
+        'sesiones': [resumen(s) for s in sesiones],
+        'descuadradas': sum(1 for d in diferencias if d != 0),
+        'faltante': str(sum((d for d in diferencias if d < 0), Decimal('0'))),
+        'sobrante': str(sum((d for d in diferencias if d > 0), Decimal('0'))),
+    }
+
+
+def recalcular(sesion_id):
+    """Contadores de la sesión calculados desde sus pagos (auditoría; sí lee las ventas)."""
+    totales = Pago.objects.filter(venta__sesion_caja_id=sesion_id).aggregate(
+        **{campo: Sum('monto', filter=Q(metodo=metodo)) for metodo, campo in CONTADORES.items()}
+    )
+    totales = {campo: valor if valor is not None else Decimal('0') for campo, valor in totales.items()}
+    totales['cantidad_ventas'] = Venta.objects.filter(sesion_caja_id=sesion_id).count()
+    return totales
@@ -0,0 +1,201 @@
+"""Catálogo de venta: consulta para ``inicio``, snapshot de respaldo y feed de cambios.
+
+Si la base de datos falla, ``inicio`` sirve ``snapshot``: la última copia buena
+del catálogo de cada sucursal en memoria del proceso, refrescada en segundo plano.
+El stock que se muestra es siempre el de los lotes de la sucursal.
+
+Las terminales guardan una copia local del catálogo (IndexedDB en ``pos.js``) y
+la mantienen al día pidiendo solo lo que cambió desde su último cursor. El
+cursor es el instante del servidor en que se armó la respuesta anterior.
+"""
+import contextvars
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Prefetch, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import sucursales
+from .models import Categoria, EliminacionCatalogo, Lote, Producto
+
+logger = logging.getLogger(__name__)
+
+# Margen para no perder filas cuya transacción fijó `modificado` antes del
+# cursor pero confirmó después. Reenviar una fila es inocuo (el cliente hace upsert).
+MARGEN_CURSOR = timedelta(seconds=5)
+
+
+def productos_para_venta(buscar='', categoria='', sucursal_id=None):
+    """Productos (dicts con los campos que usa pos.html) y categorías, vía ORM.
+
+    El stock es el de la sucursal ``sucursal_id`` (por defecto, la de la petición).
+    """
+    if sucursal_id is None:
+        sucursal_id = sucursales.actual_id()
+    # Solo lo que está en la estantería (índice parcial lote_vivo_fefo_idx)
+    lotes = Lote.objects.filter(sucursal_id=sucursal_id, stock_actual__gt=0)
+    productos_qs = Producto.objects.select_related('categoria').prefetch_related(Prefetch('lotes', queryset=lotes))
+    if buscar:
+        productos_qs = productos_qs.filter(Q(nombre__icontains=buscar) | Q(codigo_barra__startswith=buscar))
+    if categoria:
+        productos_qs = productos_qs.filter(categoria__id=categoria)
+
+    productos = []
+    for p in productos_qs:
+        productos.append({
+            'id': p.id,
+            'nombre': p.nombre,
+            'codigo_barra': p.codigo_barra,
+            'precio': float(p.precio) if p.precio is not None else 0,
+            'stock_total': p.stock_total(),
+            'categoria': p.categoria_id,
+        })
+    categorias = [{'id': c.id, 'nombre': c.nombre} for c in Categoria.objects.all()]
+    return productos, categorias
+
+
+def filtrar_productos(productos, buscar='', categoria=''):
+    """Mismos filtros que ``productos_para_venta`` pero en memoria (para el snapshot)."""
+    if buscar:
+        texto = buscar.lower()
+        productos = [
+            p for p in productos
+            if texto in p['nombre'].lower() or str(p['codigo_barra'] or '').startswith(buscar)
+        ]
+    if categoria:
+        productos = [p for p in productos if str(p['categoria']) == str(categoria)]
+    return productos
+
+
+class SnapshotCatalogo:
+    """Última copia buena del catálogo completo por sucursal, servida aunque esté vencida.
+
+    ``refrescar_en_segundo_plano`` lanza a lo más un hilo a la vez por
+    sucursal, así ningún request espera la recarga (stale-while-revalidate).
+    Los métodos sin ``sucursal`` usan la de la petición en curso.
+    """
+
+    def __init__(self, segundos):
+        self.segundos = segundos
+        # código de sucursal -> (productos, categorias, guardado)
+        self._copias = {}
+        self._lock = threading.Lock()
+        self._refrescando = set()
+
+    def guardar(self, productos, categorias, sucursal=None):
+        with self._lock:
+            self._copias[sucursal or sucursales.actual()] = (productos, categorias, time.monotonic())
+
+    def obtener(self, sucursal=None):
+        """(productos, categorias); listas vacías si nunca se cargó."""
+        with self._lock:
+            productos, categorias, _ = self._copias.get(sucursal or sucursales.actual(), ([], [], None))
+            return productos, categorias
+
+    def vencido(self, sucursal=None):
+        guardado = self._copias.get(sucursal or sucursales.actual(), (None, None, None))[2]
+        return guardado is None or time.monotonic() - guardado > self.segundos
+
+    def refrescar_en_segundo_plano(self, sucursal=None):
+        sucursal = sucursal or sucursales.actual()
+        with self._lock:
+            if sucursal in self._refrescando:
+                return
+            self._refrescando.add(sucursal)
+        # el hilo hereda el contexto (sucursal actual) para que el router elija la misma base
+        contexto = contextvars.copy_context()
+        threading.Thread(target=contexto.run, args=(self.refrescar, sucursal),
+                         name='snapshot-catalogo', daemon=True).start()
+
+    def refrescar(self, sucursal=None):
+        sucursal = sucursal or sucursales.actual()
+        try:
+            self.guardar(*productos_para_venta(sucursal_id=sucursales.id_por_codigo(sucursal)), sucursal=sucursal)
+        except Exception:
+            logger.warning("No se pudo refrescar el snapshot del catálogo", exc_info=True)
+        finally:
+            with self._lock:
+                self._refrescando.discard(sucursal)
+            # La conexión del hilo no la cierra el ciclo request/response de Django
+            connection.close()
+
+
+snapshot = SnapshotCatalogo(getattr(settings, 'POS_SNAPSHOT_CATALOGO_SEGUNDOS', 60))
+
+
+CAMPOS_CATEGORIA = ('id', 'nombre', 'descripcion')
+CAMPOS_PRODUCTO = (
+    'id', 'codigo_barra', 'nombre', 'descripcion', 'marca', 'precio',
+    'tipo', 'presentacion', 'formato', 'categoria_id',
+)
+CAMPOS_LOTE = ('id', 'producto_id', 'numero_lote', 'fecha_caducidad', 'stock_actual', 'eliminado')
+
+
+def leer_cursor(valor):
+    """Convierte el parámetro ``desde`` en datetime; None si viene vacío."""
+    if not valor:
+        return None
+    # Un "+" del offset sin codificar en la URL llega como espacio
+    desde = parse_datetime(valor.replace(' ', '+'))
+    if desde is None:
+        raise ValueError("Cursor inválido")
+    if timezone.is_naive(desde):
+        desde = timezone.make_aware(desde)
+    return desde
+
+
+def cambios_desde(desde=None, sucursal_id=None):
+    """Categorías, productos, lotes y eliminaciones modificados después de ``desde``.
+
+    Sin cursor se entrega el catálogo completo (``completo=True``) y el cliente
+    debe reemplazar su copia local. Los lotes son solo los de la sucursal
+    ``sucursal_id`` (por defecto, la de la petición).
+    """
+    if sucursal_id is None:
+        sucursal_id = sucursales.actual_id()
+    hasta = timezone.now()
+    filtro = {}
+    if desde is not None:
+        filtro['modificado__gt'] = desde - MARGEN_CURSOR
+
+    categorias = list(Categoria.objects.filter(**filtro).values(*CAMPOS_CATEGORIA))
+    productos = list(Producto.objects.filter(**filtro).values(*CAMPOS_PRODUCTO))
+    for p in productos:
+        p['precio'] = str(p['precio'])
+
+    lotes = []
+    eliminados = []
+    if desde is None:
+        # Catálogo completo: solo los lotes con stock; el cliente reemplaza su copia
+        consulta = Lote.objects.filter(sucursal_id=sucursal_id, stock_actual__gt=0)
+    else:
+        # Incremental: también los dados de baja, que el cliente debe borrar
+        consulta = Lote.todos.filter(sucursal_id=sucursal_id, **filtro)
+    for lote in consulta.values(*CAMPOS_LOTE):
+        # Un lote dado de baja lógicamente se replica como eliminación
+        if lote.pop('eliminado') is not None:
+            eliminados.append({'modelo': 'lote', 'id': lote['id']})
+        else:
+            lotes.append(lote)
+
+    if desde is not None:
+        eliminados.extend(
+            {'modelo': modelo, 'id': objeto_id}
+            for modelo, objeto_id in EliminacionCatalogo.objects.filter(
+                fecha__gt=desde - MARGEN_CURSOR
+            ).values_list('modelo', 'objeto_id')
+        )
+
+    return {
+        'cursor': hasta.isoformat(),
+        'completo': desde is None,
+        'categorias': categorias,
+        'productos': productos,
+        'lotes': lotes,
+        'eliminados': eliminados,
+    }
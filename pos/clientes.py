@@ -0,0 +1,148 @@
+"""Resolución RUT→cliente y métricas de fidelización por cliente.
+
+Cada venta con RUT necesita el id del cliente: se guarda en un LRU del proceso
+(``pos.cache.LRUCache``) con el RUT ya normalizado como clave, de modo que el
+mostrador solo consulta la base la primera vez que ve a un cliente.
+
+Las métricas (visitas, última compra, gasto total) se actualizan con un UPDATE
+por venta en ``registrar_compra``. El segmento RFM depende de cómo se ubica cada
+cliente frente al resto, así que se recalcula en bloque con ``segmentar`` (el
+comando ``segmentar_clientes``) leyendo solo esas columnas, sin el historial.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, F, Max, Sum, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .cache import LRUCache
+from .models import Cliente, Venta, normalizar_rut, rut_valido
+
+_cache = LRUCache(
+    maxsize=getattr(settings, 'POS_CLIENTES_CACHE_MAX', 50000),
+    ttl=getattr(settings, 'POS_CLIENTES_CACHE_SEGUNDOS', 300),
+)
+
+LOTE_UPDATE = 2000
+
+
+def resolver_cliente_id(rut):
+    """Id del cliente con ese RUT, creándolo si no existe. ValueError si el RUT no es válido."""
+    rut = normalizar_rut(rut)
+    if not rut_valido(rut):
+        raise ValueError(f'RUT inválido: {rut}')
+    cliente_id = _cache.get(rut, None)
+    if cliente_id is not None:
+        return cliente_id
+
+    cliente, creado = Cliente.objects.get_or_create(rut=rut)
+    if creado:
+        # Si la transacción se revierte el cliente no existe: no cachear antes del commit
+        transaction.on_commit(lambda: _cache.set(rut, cliente.pk))
+    else:
+        _cache.set(rut, cliente.pk)
+    return cliente.pk
+
+
+def registrar_compra(cliente_id, total, fecha=None):
+    """Suma una venta a las métricas del cliente con un solo UPDATE."""
+    fecha = fecha or timezone.now()
+    total = Decimal(str(total)).quantize(Decimal('0.01'))
+    Cliente.objects.filter(pk=cliente_id).update(
+        visitas=F('visitas') + 1,
+        gasto_total=F('gasto_total') + total,
+        ultima_compra=Greatest(Coalesce('ultima_compra', Value(fecha)), Value(fecha)),
+        segmento_rfm=Case(When(segmento_rfm='', then=Value('nuevo')), default=F('segmento_rfm')),
+    )
+
+
+def recalcular_metricas():
+    """Reconstruye visitas, última compra y gasto desde el historial de ventas.
+
+    Solo para reparar desajustes (cargas masivas, ventas editadas a mano): el
+    camino normal es ``registrar_compra`` en cada venta.
+    """
+    metricas = {
+        fila['cliente_id']: fila
+        for fila in Venta.objects.filter(cliente__isnull=False).values('cliente_id').annotate(
+            n=Count('id'), ultima=Max('fecha'), gasto=Sum('total_con_iva'),
+        )
+    }
+    actualizados = []
+    for cliente in Cliente.objects.only('id', 'segmento_rfm'):
+        fila = metricas.get(cliente.id)
+        cliente.visitas = fila['n'] if fila else 0
+        cliente.ultima_compra = fila['ultima'] if fila else None
+        cliente.gasto_total = (fila['gasto'] or 0) if fila else 0
+        if fila and not cliente.segmento_rfm:
+            cliente.segmento_rfm = 'nuevo'
+        actualizados.append(cliente)
+    Cliente.objects.bulk_update(
+        actualizados, ['visitas', 'ultima_compra', 'gasto_total', 'segmento_rfm'], batch_size=LOTE_UPDATE,
+    )
+    return len(actualizados)
+
+
+def invalidar():
+    """Vacía el LRU; ediciones y borrados de clientes son raros frente a las ventas."""
+    _cache.clear()
+
+
+def _quintiles(valores):
+    """Puntaje 1-5 de cada valor según los quintiles de la columna.
+
+    Un valor sube de quintil solo si supera el corte: con muchos empates (p. ej.
+    la mayoría con una sola visita) los empatados quedan abajo.
+    """
+    cortes = np.quantile(valores, [0.2, 0.4, 0.6, 0.8])
+    return np.searchsorted(cortes, valores, side='left') + 1
+
+
+def _segmento(r, f, m):
+    if r >= 4 and f >= 4 and m >= 4:
+        return 'campeon'
+    if r <= 2 and f >= 3:
+        return 'en_riesgo'
+    if f >= 4:
+        return 'leal'
+    if r >= 4 and f <= 2:
+        return 'nuevo'
+    if r <= 2:
+        return 'perdido'
+    return 'ocasional'
+
+
+def segmentar(ahora=None):
+    """Recalcula ``segmento_rfm`` de los clientes con compras; un UPDATE por segmento
+    (en tramos de ``LOTE_UPDATE`` ids). Devuelve cuántos clientes quedaron en cada uno."""
+    ahora = ahora or timezone.now()
+    filas = list(
+        Cliente.objects.filter(visitas__gt=0, ultima_compra__isnull=False)
+        .values_list('id', 'ultima_compra', 'visitas', 'gasto_total')
+    )
+    if not filas:
+        return {}
+
+    ids = [fila[0] for fila in filas]
+    dias = np.array([(ahora - fila[1]).total_seconds() / 86400 for fila in filas])
+    visitas = np.array([fila[2] for fila in filas], dtype=float)
+    gasto = np.array([float(fila[3]) for fila in filas])
+
+    # Recencia: menos días desde la última compra es mejor puntaje
+    r = _quintiles(-dias)
+    f = _quintiles(visitas)
+    m = _quintiles(gasto)
+
+    por_segmento = defaultdict(list)
+    for cliente_id, ri, fi, mi in zip(ids, r, f, m):
+        por_segmento[_segmento(ri, fi, mi)].append(cliente_id)
+
+    with transaction.atomic():
+        for segmento, clientes in por_segmento.items():
+            for i in range(0, len(clientes), LOTE_UPDATE):
+                Cliente.objects.filter(id__in=clientes[i:i + LOTE_UPDATE]).update(segmento_rfm=segmento)
+    return {segmento: len(clientes) for segmento, clientes in por_segmento.items()}
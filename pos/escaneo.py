@@ -0,0 +1,87 @@
+"""Búsqueda por código de barras para el escaneo en caja.
+
+Es el camino más caliente del mostrador, así que las respuestas se guardan en un
+LRU del proceso (``pos.cache.LRUCache``). Las señales de ``Producto`` y ``Lote``
+invalidan la entrada del producto afectado; un fallo de cache resuelve todo con
+una sola consulta sobre el índice único de ``codigo_barra``.
+
+La entrada guarda el stock de todas las sucursales, así que la invalidación
+sigue siendo por código y ``buscar`` entrega el de la sucursal pedida.
+"""
+from django.conf import settings
+from django.db.models import Q, Sum
+from django.db.models.functions import Coalesce
+
+from . import sucursales
+from .cache import LRUCache
+from .models import Producto
+
+NO_ENCONTRADO = object()
+
+_cache = LRUCache(
+    maxsize=getattr(settings, 'POS_ESCANEO_CACHE_MAX', 20000),
+    ttl=getattr(settings, 'POS_ESCANEO_CACHE_SEGUNDOS', 30),
+)
+# producto_id -> código cacheado, para invalidar cuando cambia un lote
+_codigo_por_producto = {}
+
+
+def normalizar_codigo(codigo):
+    return str(codigo).strip()
+
+
+def consultar(codigo):
+    """Lee producto y stock por sucursal en una consulta; None si el código no existe."""
+    filas = list(
+        Producto.objects.filter(codigo_barra=codigo)
+        .values('id', 'nombre', 'precio', 'lotes__sucursal_id')
+        .annotate(stock=Coalesce(Sum('lotes__stock_actual', filter=Q(lotes__eliminado__isnull=True)), 0))
+        .order_by()
+    )
+    if not filas:
+        return None
+    fila = filas[0]
+    return {
+        'id': fila['id'], 'nombre': fila['nombre'], 'precio': str(fila['precio']),
+        'stock_por_sucursal': {f['lotes__sucursal_id']: f['stock'] for f in filas if f['lotes__sucursal_id']},
+    }
+
+
+def buscar(codigo, sucursal_id=None):
+    """Producto para un código escaneado, desde el LRU o la base de datos.
+
+    ``stock`` es el de ``sucursal_id`` (por defecto, la de la petición).
+    """
+    codigo = normalizar_codigo(codigo)
+    datos = _cache.get(codigo, None)
+    if datos is None:
+        datos = consultar(codigo)
+        if datos is None:
+            _cache.set(codigo, NO_ENCONTRADO)
+            return None
+        _cache.set(codigo, datos)
+        _codigo_por_producto[datos['id']] = codigo
+    elif datos is NO_ENCONTRADO:
+        return None
+
+    if sucursal_id is None:
+        sucursal_id = sucursales.actual_id()
+    return {
+        'id': datos['id'], 'nombre': datos['nombre'], 'precio': datos['precio'],
+        'stock': datos['stock_por_sucursal'].get(sucursal_id, 0),
+    }
+
+
+def invalidar_producto(producto_id, codigo=None):
+    """Quita del LRU el producto (y el código nuevo, por si estaba como no encontrado)."""
+    anterior = _codigo_por_producto.pop(producto_id, None)
+    if anterior is not None:
+        _cache.delete(anterior)
+    if codigo:
+        _cache.delete(normalizar_codigo(codigo))
+
+
+def limpiar():
+    """Vacía el LRU, p. ej. tras operaciones masivas que no disparan señales."""
+    _cache.clear()
+    _codigo_por_producto.clear()
@@ -0,0 +1,95 @@
+"""Outbox transaccional para los efectos secundarios de las ventas.
+
+``publicar`` inserta un ``EventoSalida`` dentro de la transacción que registra
+la venta: si la venta se revierte, el evento también. El comando
+``procesar_eventos`` drena la tabla por lotes y ejecuta los manejadores
+registrados con ``@manejador(tipo)`` fuera de la petición.
+
+La entrega es al menos una vez: los efectos en la base de cada evento se
+confirman en la misma transacción que lo marca como procesado, pero lo que
+escapa a ella (caches, avisos externos) puede repetirse si el worker cae a
+mitad de un lote. Por eso los manejadores deben ser idempotentes.
+"""
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import EventoSalida
+
+logger = logging.getLogger(__name__)
+
+MAX_INTENTOS = 5
+
+_manejadores = defaultdict(list)
+
+
+def manejador(tipo):
+    """Registra la función decorada para los eventos ``tipo``; recibe el EventoSalida."""
+    def registrar(funcion):
+        _manejadores[tipo].append(funcion)
+        return funcion
+    return registrar
+
+
+def publicar(tipo, objeto_id, **datos):
+    """Escribe el evento; llamar dentro de la transacción del cambio que lo origina."""
+    return EventoSalida.objects.create(tipo=tipo, objeto_id=objeto_id, datos=datos)
+
+
+def publicar_venta(venta, detalles):
+    """Evento ``venta_registrada`` con lo que necesitan los manejadores, sin releer la venta.
+
+    ``detalles`` son dicts con producto_id, cantidad, precio_unitario y descuento_pct.
+    """
+    items = []
+    for d in detalles:
+        monto = Decimal(d['precio_unitario']) * d['cantidad'] * (1 - Decimal(d.get('descuento_pct') or 0) / 100)
+        items.append({'producto_id': d['producto_id'], 'cantidad': d['cantidad'], 'monto': monto.quantize(Decimal('0.01'))})
+    return publicar(
+        'venta_registrada', venta.pk,
+        fecha=venta.fecha, cliente_id=venta.cliente_id, sucursal_id=venta.sucursal_id,
+        total=Decimal(str(venta.total_con_iva)), items=items,
+    )
+
+
+def pendientes():
+    return EventoSalida.objects.filter(procesado__isnull=True, intentos__lt=MAX_INTENTOS).order_by('id')
+
+
+def procesar_lote(tamano=100):
+    """Procesa hasta ``tamano`` eventos pendientes. Retorna (procesados, fallidos).
+
+    Los eventos se bloquean con SKIP LOCKED, así que varios workers pueden
+    drenar en paralelo sin tomar los mismos. Cada evento corre sus manejadores
+    en un savepoint: si uno falla, se revierten solo sus efectos, se anota el
+    error y se reintenta en una pasada posterior (hasta ``MAX_INTENTOS``).
+    """
+    with transaction.atomic():
+        eventos = list(pendientes().select_for_update(skip_locked=True)[:tamano])
+        procesados = []
+        fallidos = 0
+        for evento in eventos:
+            try:
+                with transaction.atomic():
+                    for funcion in _manejadores.get(evento.tipo, []):
+                        funcion(evento)
+            except Exception as exc:
+                logger.exception("Falló el evento %s (%s %s)", evento.pk, evento.tipo, evento.objeto_id)
+                EventoSalida.objects.filter(pk=evento.pk).update(intentos=F('intentos') + 1, error=repr(exc)[:2000])
+                fallidos += 1
+            else:
+                procesados.append(evento.pk)
+        if procesados:
+            EventoSalida.objects.filter(pk__in=procesados).update(procesado=timezone.now())
+    return len(procesados), fallidos
+
+
+def purgar(dias=7):
+    """Borra los eventos procesados hace más de ``dias`` días."""
+    borrados, _ = EventoSalida.objects.filter(procesado__lt=timezone.now() - timedelta(days=dias)).delete()
+    return borrados
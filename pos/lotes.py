@@ -0,0 +1,76 @@
+"""Depuración de lotes: baja lógica de los agotados o vencidos y archivo posterior.
+
+``Lote.objects`` ya oculta los lotes con ``eliminado``; este módulo se encarga
+de que los que dejan la estantería salgan también del conjunto de trabajo:
+
+- ``dar_de_baja`` marca ``eliminado`` (y ``modificado``, para que el feed de
+  cambios lo replique como eliminación) en los lotes vencidos y en los
+  agotados que no se tocan hace ``POS_LOTES_AGOTADO_HORAS``;
+- ``archivar`` mueve a ``LoteArchivado`` los dados de baja hace más de
+  ``POS_LOTES_ARCHIVO_DIAS`` días, por tandas y con su lápida en
+  ``EliminacionCatalogo`` para las terminales que sincronicen tarde.
+
+Los corre el comando ``depurar_lotes`` (una vez al día) sucursal por sucursal,
+así cada una se depura en su propia base si tiene una (ver pos.sucursales).
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import escaneo
+from .cache import renovar_catalogo
+from .models import EliminacionCatalogo, Lote, LoteArchivado
+
+CAMPOS_ARCHIVO = (
+    'id', 'producto_id', 'numero_lote', 'fecha_elaboracion', 'fecha_caducidad', 'stock_actual',
+    'stock_minimo', 'stock_maximo', 'creado', 'eliminado', 'sucursal_id',
+)
+
+
+def dar_de_baja(sucursal_id, hoy=None):
+    """Baja lógica de los lotes vencidos o agotados de la sucursal. Retorna cuántos."""
+    ahora = timezone.now()
+    hoy = hoy or timezone.localdate()
+    horas = getattr(settings, 'POS_LOTES_AGOTADO_HORAS', 24)
+    with transaction.atomic():
+        # Un lote recién creado en cero (a la espera de stock) no cuenta como agotado
+        dados_de_baja = Lote.objects.filter(sucursal_id=sucursal_id).filter(
+            Q(fecha_caducidad__lt=hoy) | Q(stock_actual__lte=0, modificado__lt=ahora - timedelta(hours=horas))
+        ).update(eliminado=ahora, modificado=ahora)
+        if dados_de_baja:
+            # update() no dispara señales: el stock visible cambió en todo el catálogo
+            transaction.on_commit(renovar_catalogo)
+            transaction.on_commit(escaneo.limpiar)
+    return dados_de_baja
+
+
+def archivar(sucursal_id, dias=None, tamano=1000):
+    """Mueve a LoteArchivado los lotes dados de baja hace más de ``dias``. Retorna cuántos."""
+    dias = getattr(settings, 'POS_LOTES_ARCHIVO_DIAS', 30) if dias is None else dias
+    limite = timezone.now() - timedelta(days=dias)
+    total = 0
+    while True:
+        # Una transacción por tanda: no se bloquea la tabla mientras se archiva el historial
+        with transaction.atomic():
+            filas = list(
+                Lote.todos.filter(sucursal_id=sucursal_id, eliminado__lt=limite)
+                .order_by('id').values(*CAMPOS_ARCHIVO)[:tamano]
+            )
+            if not filas:
+                return total
+            ids = [fila['id'] for fila in filas]
+            LoteArchivado.objects.bulk_create([LoteArchivado(**fila) for fila in filas])
+            EliminacionCatalogo.objects.bulk_create([EliminacionCatalogo(modelo='lote', objeto_id=i) for i in ids])
+            # _raw_delete (API privada de Django) a propósito: delete() enviaría
+            # post_delete por fila, y registrar_eliminacion haría un INSERT de
+            # lápida por lote (ya escritas arriba en bloque), además de renovar
+            # caches y avisar al tablero por lotes que llevan días ocultos. Sin
+            # cascada que resolver, porque ningún modelo apunta a Lote: un DELETE.
+            consulta = Lote.todos.filter(pk__in=ids)
+            consulta._raw_delete(consulta.db)
+        total += len(ids)
+        if len(ids) < tamano:
+            return total
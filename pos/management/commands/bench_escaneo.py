@@ -0,0 +1,67 @@
+import statistics
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from pos import escaneo
+from pos.models import Categoria, Lote, Producto
+
+
+class Command(BaseCommand):
+    help = "Mide la búsqueda por código de barras con aciertos y fallos del LRU."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--productos', type=int, default=5000)
+        parser.add_argument('--iteraciones', type=int, default=20000)
+
+    def handle(self, *args, **options):
+        n = options['productos']
+        with transaction.atomic():
+            self._crear_datos(n)
+            codigos = [f'780{i:010d}' for i in range(n)]
+
+            escaneo.limpiar()
+            fallos = []
+            with CaptureQueriesContext(connection) as consultas:
+                for codigo in codigos[:min(n, 1000)]:
+                    t0 = time.perf_counter()
+                    escaneo.buscar(codigo)
+                    fallos.append((time.perf_counter() - t0) * 1000)
+            consultas_por_fallo = len(consultas) / len(fallos)
+
+            aciertos = []
+            for i in range(options['iteraciones']):
+                codigo = codigos[i % len(fallos)]
+                t0 = time.perf_counter()
+                escaneo.buscar(codigo)
+                aciertos.append((time.perf_counter() - t0) * 1000)
+
+            transaction.set_rollback(True)
+        escaneo.limpiar()
+
+        self._reportar('fallo de cache', fallos)
+        self.stdout.write(f"  consultas por fallo: {consultas_por_fallo:.2f}")
+        self._reportar('acierto de cache', aciertos)
+
+    def _crear_datos(self, n):
+        categoria = Categoria.objects.create(nombre='Bench')
+        productos = Producto.objects.bulk_create([
+            Producto(nombre=f'Producto {i}', precio=1000 + i, codigo_barra=f'780{i:010d}', categoria=categoria)
+            for i in range(n)
+        ])
+        vence = date.today() + timedelta(days=30)
+        Lote.objects.bulk_create([
+            Lote(producto=p, numero_lote=f'L{p.id}-{j}', fecha_caducidad=vence, stock_actual=10)
+            for p in productos for j in range(3)
+        ])
+
+    def _reportar(self, etiqueta, tiempos):
+        tiempos = sorted(tiempos)
+        p99 = tiempos[int(len(tiempos) * 0.99) - 1]
+        self.stdout.write(
+            f"{etiqueta}: media {statistics.mean(tiempos) * 1000:.1f} µs, "
+            f"p50 {statistics.median(tiempos) * 1000:.1f} µs, p99 {p99 * 1000:.1f} µs"
+        )
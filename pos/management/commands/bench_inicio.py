@@ -0,0 +1,64 @@
+import statistics
+import time
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory, override_settings
+
+from pos.models import Categoria, Lote, Producto
+from pos.views import inicio
+
+
+class Command(BaseCommand):
+    help = "Mide el tiempo de render de la vista inicio sin y con cache de tarjetas."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--productos', type=int, default=500)
+        parser.add_argument('--iteraciones', type=int, default=200)
+
+    def handle(self, *args, **options):
+        # Los datos de prueba se crean dentro de una transacción que se revierte al final
+        with transaction.atomic():
+            self._crear_datos(options['productos'])
+            request = RequestFactory().get('/pos/sistema/', {'page': 2})
+
+            cache.clear()
+            with override_settings(POS_TARJETAS_CACHE_SEGUNDOS=0):
+                sin_cache = self._medir(request, options['iteraciones'])
+
+            cache.clear()
+            inicio(request)  # calentar el cache de tarjetas
+            con_cache = self._medir(request, options['iteraciones'])
+
+            transaction.set_rollback(True)
+
+        self._reportar('sin cache de tarjetas', sin_cache)
+        self._reportar('con cache de tarjetas', con_cache)
+
+    def _crear_datos(self, n):
+        categoria = Categoria.objects.create(nombre='Bench')
+        productos = Producto.objects.bulk_create([
+            Producto(nombre=f'Producto {i}', precio=1000 + i, codigo_barra=str(i), categoria=categoria)
+            for i in range(n)
+        ])
+        vence = date.today() + timedelta(days=30)
+        Lote.objects.bulk_create([
+            Lote(producto=p, numero_lote=f'L{p.id}', fecha_caducidad=vence, stock_actual=10)
+            for p in productos
+        ])
+
+    def _medir(self, request, iteraciones):
+        tiempos = []
+        for _ in range(iteraciones):
+            t0 = time.perf_counter()
+            inicio(request)
+            tiempos.append((time.perf_counter() - t0) * 1000)
+        return tiempos
+
+    def _reportar(self, etiqueta, tiempos):
+        self.stdout.write(
+            f"{etiqueta}: media {statistics.mean(tiempos):.2f} ms, "
+            f"p50 {statistics.median(tiempos):.2f} ms, mín {min(tiempos):.2f} ms"
+        )
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from pos import precios
+from pos.models import Categoria, Producto
+
+
+class Command(BaseCommand):
+    help = "Mide un ajuste masivo de precios sobre una categoría completa."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--productos', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        n = options['productos']
+        # Los datos de prueba se crean dentro de una transacción que se revierte al final
+        with transaction.atomic():
+            categoria = Categoria.objects.create(nombre='Bench')
+            Producto.objects.bulk_create([
+                Producto(nombre=f'Producto {i}', precio=1000 + i, categoria=categoria) for i in range(n)
+            ])
+
+            with CaptureQueriesContext(connection) as consultas:
+                t0 = time.perf_counter()
+                resultado = precios.ajustar_precios({'categoria': categoria.id}, porcentaje=-7.5)
+                duracion = (time.perf_counter() - t0) * 1000
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(
+            f"{resultado['productos']} productos ajustados en {duracion:.1f} ms con {len(consultas)} consultas"
+        )
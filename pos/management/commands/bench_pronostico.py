@@ -0,0 +1,64 @@
+import random
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from pos import pronostico
+from pos.models import Categoria, DetalleVenta, Producto, Venta
+
+
+class Command(BaseCommand):
+    help = "Mide el plan de producción sobre ventas sintéticas (datos revertidos al final)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--productos', type=int, default=300)
+        parser.add_argument('--dias', type=int, default=730)
+        parser.add_argument('--semanas', type=int, default=104)
+        parser.add_argument('--solo-numpy', action='store_true',
+                            help="Mide solo el cálculo vectorizado con 3000 productos × --dias")
+
+    def handle(self, *args, **options):
+        hoy = timezone.localdate()
+        if options['solo_numpy']:
+            matriz = np.random.poisson(20, size=(3000, options['dias'])).astype(float)
+            t0 = time.perf_counter()
+            pronostico.pronosticar(matriz, hoy - timedelta(days=options['dias']), hoy, options['semanas'])
+            self.stdout.write(f"pronosticar 3000 × {options['dias']}: {(time.perf_counter() - t0) * 1000:.1f} ms")
+            return
+
+        with transaction.atomic():
+            t0 = time.perf_counter()
+            self._crear_ventas(options['productos'], options['dias'], hoy)
+            self.stdout.write(f"datos creados en {time.perf_counter() - t0:.1f} s")
+
+            t0 = time.perf_counter()
+            plan = pronostico.plan_produccion(hoy, semanas=options['semanas'])
+            self.stdout.write(
+                f"plan de {len(plan)} productos sobre {options['dias']} días: "
+                f"{time.perf_counter() - t0:.2f} s"
+            )
+            transaction.set_rollback(True)
+
+    def _crear_ventas(self, n_productos, dias, hoy):
+        categoria = Categoria.objects.create(nombre='Bench')
+        productos = Producto.objects.bulk_create([
+            Producto(nombre=f'Pan {i}', precio=500, categoria=categoria) for i in range(n_productos)
+        ])
+        # Una venta por día con una línea por producto
+        inicio = hoy - timedelta(days=dias)
+        ventas = Venta.objects.bulk_create([
+            Venta(
+                fecha=timezone.make_aware(datetime.combine(inicio + timedelta(days=d), datetime.min.time())) + timedelta(hours=10),
+                total_sin_iva=0, total_iva=0, descuento=0, total_con_iva=0, canal_venta='presencial',
+            )
+            for d in range(dias)
+        ])
+        DetalleVenta.objects.bulk_create((
+            DetalleVenta(venta=v, producto=p, cantidad=random.randint(1, 40), precio_unitario=Decimal('500'))
+            for v in ventas for p in productos
+        ), batch_size=5000)
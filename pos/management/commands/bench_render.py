@@ -0,0 +1,71 @@
+import gzip
+import statistics
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from forneria.middleware import brotli
+from forneria.renderers import JSONRapidoRenderer, MessagePackRenderer, msgpack, orjson
+from pos.models import Categoria, Lote, Producto
+from pos.serializer import ProductoSerializer
+
+
+class Command(BaseCommand):
+    help = "Compara los renderers de la API y la compresión sobre un listado grande de productos."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--productos', type=int, default=2000)
+        parser.add_argument('--lotes', type=int, default=3, help="Lotes por producto")
+        parser.add_argument('--repeticiones', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self._crear_datos(options['productos'], options['lotes'])
+            productos = Producto.objects.select_related('nutricional').prefetch_related('lotes')
+            datos = ProductoSerializer(productos, many=True).data
+            transaction.set_rollback(True)
+
+        renderers = [('DRF JSONRenderer', JSONRenderer())]
+        if orjson is not None:
+            renderers.append(('JSONRapidoRenderer', JSONRapidoRenderer()))
+        if msgpack is not None:
+            renderers.append(('MessagePackRenderer', MessagePackRenderer()))
+
+        self.stdout.write(f"{len(datos)} productos con {options['lotes']} lotes c/u")
+        for nombre, renderer in renderers:
+            tiempos = []
+            for _ in range(options['repeticiones']):
+                t0 = time.perf_counter()
+                cuerpo = renderer.render(datos, renderer.media_type, {})
+                tiempos.append((time.perf_counter() - t0) * 1000)
+            self.stdout.write(
+                f"{nombre:>20}: mediana {statistics.median(tiempos):7.1f} ms  "
+                f"{len(cuerpo) / 1024:8.1f} KiB"
+            )
+            self._compresion(cuerpo)
+
+    def _compresion(self, cuerpo):
+        variantes = [('gzip 6', lambda: gzip.compress(cuerpo, compresslevel=6, mtime=0))]
+        if brotli is not None:
+            variantes.append(('br 5', lambda: brotli.compress(cuerpo, quality=5)))
+        for nombre, comprimir in variantes:
+            t0 = time.perf_counter()
+            comprimido = comprimir()
+            ms = (time.perf_counter() - t0) * 1000
+            self.stdout.write(f"{nombre:>24}: {ms:7.1f} ms  {len(comprimido) / 1024:8.1f} KiB")
+
+    def _crear_datos(self, n, lotes_por_producto):
+        categoria = Categoria.objects.create(nombre='Bench')
+        productos = Producto.objects.bulk_create([
+            Producto(nombre=f'Pan amasado {i}', descripcion='Pan de la casa, horneado en el día',
+                     precio=1290 + i % 500, categoria=categoria)
+            for i in range(n)
+        ])
+        vence = date.today() + timedelta(days=5)
+        Lote.objects.bulk_create([
+            Lote(producto=p, numero_lote=f'L{p.id}-{j}', fecha_caducidad=vence, stock_actual=20)
+            for p in productos for j in range(lotes_por_producto)
+        ], batch_size=5000)
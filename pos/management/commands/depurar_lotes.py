@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from pos import lotes, sucursales
+from pos.models import Sucursal
+
+
+class Command(BaseCommand):
+    help = (
+        "Da de baja los lotes vencidos o agotados y archiva los dados de baja hace tiempo. "
+        "Pensado para correr una vez al día, fuera del horario de venta."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=None,
+                            help="Archiva los dados de baja hace más de estos días (POS_LOTES_ARCHIVO_DIAS)")
+        parser.add_argument('--tanda', type=int, default=1000, help="Lotes archivados por transacción")
+        parser.add_argument('--sin-archivar', action='store_true', help="Solo la baja lógica")
+
+    def handle(self, *args, **options):
+        for codigo, sucursal_id in Sucursal.objects.order_by('codigo').values_list('codigo', 'id'):
+            # Cada sucursal en su base, si tiene una propia
+            with sucursales.usar(codigo):
+                bajas = lotes.dar_de_baja(sucursal_id)
+                archivados = 0
+                if not options['sin_archivar']:
+                    archivados = lotes.archivar(sucursal_id, dias=options['dias'], tamano=options['tanda'])
+            self.stdout.write(f"{codigo}: {bajas} lotes dados de baja, {archivados} archivados")
+        self.stdout.write(self.style.SUCCESS("Depuración de lotes terminada"))
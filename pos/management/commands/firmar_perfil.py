@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from pos import perfilado
+
+
+class Command(BaseCommand):
+    help = (
+        "Imprime una firma para la cabecera X-Perfil: la petición que la lleve se perfila "
+        "y queda en /pos/perfiles/."
+    )
+
+    def handle(self, *args, **options):
+        vigencia = getattr(settings, 'POS_PERFIL_FIRMA_SEGUNDOS', 3600)
+        self.stdout.write(f"X-Perfil: {perfilado.firmar()}")
+        self.stdout.write(f"Vigente por {vigencia} s", self.style.NOTICE)
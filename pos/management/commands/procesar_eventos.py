@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from pos import eventos
+
+
+class Command(BaseCommand):
+    help = (
+        "Drena el outbox de ventas ejecutando los manejadores registrados. Sin --continuo "
+        "procesa lo pendiente y termina; con --continuo queda esperando eventos nuevos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=100, help="Eventos por transacción")
+        parser.add_argument('--continuo', action='store_true')
+        parser.add_argument('--espera', type=float, default=1.0,
+                            help="Segundos entre consultas cuando no hay pendientes (--continuo)")
+        parser.add_argument('--purgar-dias', type=int, default=7,
+                            help="Borra eventos procesados hace más de estos días")
+
+    def handle(self, *args, **options):
+        total = fallidos = 0
+        try:
+            while True:
+                close_old_connections()
+                procesados, con_error = eventos.procesar_lote(options['lote'])
+                total += procesados
+                fallidos += con_error
+                if procesados + con_error < options['lote']:
+                    eventos.purgar(options['purgar_dias'])
+                    if not options['continuo']:
+                        break
+                    time.sleep(options['espera'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"{total} eventos procesados, {fallidos} con error"))
@@ -0,0 +1,72 @@
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+# Este módulo se importa en cada proceso del pool antes de django.setup(), así
+# que pos.reportes (que carga modelos) se importa dentro de las funciones.
+
+
+def _iniciar_proceso():
+    # Los procesos se crean con "spawn": cada uno arranca Django y abre su propia conexión
+    django.setup()
+
+
+def _ejecutar(trabajo_id):
+    from pos import reportes
+    return reportes.ejecutar(trabajo_id)
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera los reportes pendientes en un pool de procesos. Sin --continuo procesa "
+        "la cola y termina; con --continuo queda esperando solicitudes nuevas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--procesos', type=int, default=getattr(settings, 'POS_REPORTES_PROCESOS', 2))
+        parser.add_argument('--continuo', action='store_true')
+        parser.add_argument('--espera', type=float, default=2.0,
+                            help="Segundos entre consultas a la cola")
+
+    def handle(self, *args, **options):
+        from pos import reportes
+
+        procesos = max(1, options['procesos'])
+        en_curso = set()
+        resultados = {}
+        reclamados = reportes.reclamar_abandonados()
+        if reclamados:
+            self.stdout.write(f"{reclamados} reportes abandonados vuelven a la cola")
+
+        contexto = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=procesos, mp_context=contexto, initializer=_iniciar_proceso) as pool:
+            try:
+                while True:
+                    close_old_connections()
+                    libres = procesos - len(en_curso)
+                    if libres:
+                        for trabajo_id in reportes.tomar_pendientes(libres):
+                            en_curso.add(pool.submit(_ejecutar, trabajo_id))
+                    if not en_curso:
+                        if not options['continuo']:
+                            break
+                        time.sleep(options['espera'])
+                        continue
+                    terminados, en_curso = wait(en_curso, timeout=options['espera'], return_when=FIRST_COMPLETED)
+                    for futuro in terminados:
+                        try:
+                            estado = futuro.result()
+                        except Exception as exc:  # el proceso murió o el trabajo desapareció
+                            self.stderr.write(f"Reporte fallido: {exc!r}")
+                            estado = 'error'
+                        resultados[estado] = resultados.get(estado, 0) + 1
+            except KeyboardInterrupt:
+                pass
+
+        resumen = ', '.join(f"{n} {estado}" for estado, n in sorted(resultados.items())) or 'ninguno'
+        self.stdout.write(self.style.SUCCESS(f"Reportes generados: {resumen}"))
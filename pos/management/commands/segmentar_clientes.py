@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from pos import clientes
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula el segmento RFM de los clientes a partir de sus métricas. "
+        "Pensado para correr una vez al día: la recencia cambia aunque no haya ventas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recalcular', action='store_true',
+                            help="Reconstruye antes visitas, última compra y gasto desde las ventas")
+
+    def handle(self, *args, **options):
+        if options['recalcular']:
+            n = clientes.recalcular_metricas()
+            self.stdout.write(f"Métricas recalculadas para {n} clientes")
+
+        segmentos = clientes.segmentar()
+        for segmento, cantidad in sorted(segmentos.items()):
+            self.stdout.write(f"{segmento}: {cantidad}")
+        self.stdout.write(self.style.SUCCESS(f"{sum(segmentos.values())} clientes segmentados"))
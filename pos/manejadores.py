@@ -0,0 +1,94 @@
+"""Manejadores del outbox (pos.eventos) para ``venta_registrada``.
+
+Corren en el worker ``procesar_eventos``, no en el checkout. Los efectos en la
+base se confirman junto con la marca de procesado del evento; los de cache son
+idempotentes, así que repetirlos no hace daño, y solo alcanzan a los procesos
+web si el cache es compartido (ver ``invalidar_caches``).
+"""
+from decimal import Decimal
+
+from django.db.models import F, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import clientes
+from .cache import renovar_producto
+from .eventos import manejador
+from .models import Alerta, Lote, ResumenVentaDiaria
+
+
+def _productos(evento):
+    return sorted({item['producto_id'] for item in evento.datos['items']})
+
+
+@manejador('venta_registrada')
+def metricas_cliente(evento):
+    cliente_id = evento.datos.get('cliente_id')
+    if cliente_id:
+        clientes.registrar_compra(cliente_id, Decimal(evento.datos['total']), parse_datetime(evento.datos['fecha']))
+
+
+@manejador('venta_registrada')
+def resumen_diario(evento):
+    fecha = timezone.localdate(parse_datetime(evento.datos['fecha']))
+    por_producto = {}
+    for item in evento.datos['items']:
+        unidades, monto = por_producto.get(item['producto_id'], (0, Decimal('0')))
+        por_producto[item['producto_id']] = (unidades + item['cantidad'], monto + Decimal(item['monto']))
+
+    # Suma en la base (F()): dos workers con ventas del mismo producto y día no
+    # se pisan los contadores. Si ambos crean la misma fila chocan con la
+    # restricción única: el evento falla, se revierte y al reintentar suma.
+    nuevos = []
+    for producto_id, (unidades, monto) in por_producto.items():
+        sumadas = ResumenVentaDiaria.objects.filter(fecha=fecha, producto_id=producto_id).update(
+            unidades=F('unidades') + unidades, monto=F('monto') + monto, tickets=F('tickets') + 1,
+        )
+        if not sumadas:
+            nuevos.append(ResumenVentaDiaria(fecha=fecha, producto_id=producto_id, unidades=unidades, monto=monto, tickets=1))
+    ResumenVentaDiaria.objects.bulk_create(nuevos)
+
+
+@manejador('venta_registrada')
+def alertas_stock(evento):
+    """Alerta pendiente para los productos vendidos que quedaron bajo su stock mínimo en la sucursal."""
+    productos = _productos(evento)
+    lotes = Lote.objects.filter(producto_id__in=productos, eliminado__isnull=True)
+    if evento.datos.get('sucursal_id'):
+        lotes = lotes.filter(sucursal_id=evento.datos['sucursal_id'])
+    niveles = (
+        lotes
+        .values('producto_id')
+        .annotate(stock=Sum('stock_actual'), minimo=Sum('stock_minimo'))
+    )
+    con_alerta = set(
+        Alerta.objects.filter(producto_id__in=productos, estado='pendiente').values_list('producto_id', flat=True)
+    )
+    ahora = timezone.now()
+    alertas = []
+    for nivel in niveles:
+        stock, minimo = nivel['stock'] or 0, nivel['minimo'] or 0
+        if nivel['producto_id'] in con_alerta or (stock > 0 and stock > minimo):
+            continue
+        alertas.append(Alerta(
+            producto_id=nivel['producto_id'],
+            tipo_alerta='roja' if stock <= 0 else 'amarilla',
+            mensaje='Sin stock' if stock <= 0 else f'Stock bajo: quedan {stock} (mínimo {minimo})',
+            fecha_generada=ahora,
+            estado='pendiente',
+        ))
+    Alerta.objects.bulk_create(alertas)
+
+
+@manejador('venta_registrada')
+def invalidar_caches(evento):
+    """Renueva las versiones de los productos vendidos en el cache compartido.
+
+    Ya confirmada la venta, nadie puede volver a cachear el stock anterior.
+    Solo sirve si CACHES es un backend compartido (Redis, Memcached): con
+    LocMem, o para el LRU de escaneo, que son de cada proceso, invalidar
+    desde el worker no llega a los procesos web. Ahí bastan las señales de
+    ``Lote`` (pos.signals), que corren en el proceso que vendió.
+    """
+    for producto_id in _productos(evento):
+        renovar_producto(producto_id)
@@ -0,0 +1,78 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pos', '0002_empleado_usuario_alter_venta_cliente_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='empleado',
+            name='apellido_paterno',
+            field=models.CharField(default='', max_length=45),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='empleado',
+            name='clave',
+            field=models.CharField(default='', max_length=100),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='empleado',
+            name='correo',
+            field=models.EmailField(default='', max_length=100),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='empleado',
+            name='nombres',
+            field=models.CharField(default='', max_length=100),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='venta',
+            name='monto_pagado',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='venta',
+            name='vuelto',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AlterField(
+            model_name='alerta',
+            name='producto',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, to='pos.producto'),
+        ),
+        migrations.AlterField(
+            model_name='categoria',
+            name='nombre',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.AlterField(
+            model_name='empleado',
+            name='fono',
+            field=models.IntegerField(unique=True),
+        ),
+        migrations.AlterField(
+            model_name='movimientoinventario',
+            name='producto',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, to='pos.producto'),
+        ),
+        migrations.AlterField(
+            model_name='producto',
+            name='categoria',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, to='pos.categoria'),
+        ),
+        migrations.AlterField(
+            model_name='producto',
+            name='codigo_barra',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+    ]
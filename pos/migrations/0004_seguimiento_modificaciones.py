@@ -0,0 +1,37 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pos', '0003_sincronizar_modelos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EliminacionCatalogo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modelo', models.CharField(choices=[('categoria', 'Categoría'), ('producto', 'Producto'), ('lote', 'Lote')], max_length=20)),
+                ('objeto_id', models.BigIntegerField()),
+                ('fecha', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='categoria',
+            name='modificado',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='modificado',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='lote',
+            name='modificado',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
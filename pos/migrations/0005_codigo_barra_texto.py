@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pos', '0004_seguimiento_modificaciones'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='producto',
+            name='codigo_barra',
+            field=models.CharField(blank=True, max_length=50, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:21
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Sum
+
+
+def normalizar_rut(rut):
+    # Copia de pos.models.normalizar_rut: las migraciones no importan código de la app
+    rut = str(rut).replace('.', '').replace(' ', '').replace('-', '').upper()
+    if len(rut) < 2:
+        return rut
+    return f"{rut[:-1]}-{rut[-1]}"
+
+
+def normalizar_y_agregar(apps, schema_editor):
+    Cliente = apps.get_model('pos', 'Cliente')
+    Venta = apps.get_model('pos', 'Venta')
+
+    # Unificar clientes duplicados por formato de RUT ("…-k" y "…-K"): el de menor
+    # id conserva el RUT y se queda con las ventas de los demás.
+    grupos = {}
+    for cliente_id, rut in Cliente.objects.order_by('id').values_list('id', 'rut'):
+        grupos.setdefault(normalizar_rut(rut), []).append((cliente_id, rut))
+    renombrar = []
+    for rut, clientes in grupos.items():
+        (canonico, rut_actual), duplicados = clientes[0], [c for c, _ in clientes[1:]]
+        if duplicados:
+            Venta.objects.filter(cliente_id__in=duplicados).update(cliente_id=canonico)
+            Cliente.objects.filter(id__in=duplicados).delete()
+        if rut_actual != rut:
+            renombrar.append((canonico, rut))
+    for cliente_id, rut in renombrar:
+        Cliente.objects.filter(id=cliente_id).update(rut=rut)
+
+    metricas = Venta.objects.filter(cliente__isnull=False).values('cliente_id').annotate(
+        n=Count('id'), ultima=Max('fecha'), gasto=Sum('total_con_iva'),
+    )
+    for fila in metricas:
+        Cliente.objects.filter(id=fila['cliente_id']).update(
+            visitas=fila['n'], ultima_compra=fila['ultima'], gasto_total=fila['gasto'] or 0,
+            segmento_rfm='nuevo',
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pos', '0005_codigo_barra_texto'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cliente',
+            name='gasto_total',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='segmento_rfm',
+            field=models.CharField(blank=True, choices=[('nuevo', 'Nuevo'), ('campeon', 'Campeón'), ('leal', 'Leal'), ('ocasional', 'Ocasional'), ('en_riesgo', 'En riesgo'), ('perdido', 'Perdido')], default='', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='ultima_compra',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='visitas',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(normalizar_y_agregar, migrations.RunPython.noop),
+    ]
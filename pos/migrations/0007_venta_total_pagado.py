@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:22
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def calcular_total_pagado(apps, schema_editor):
+    Pago = apps.get_model('pos', 'Pago')
+    Venta = apps.get_model('pos', 'Venta')
+    suma = Pago.objects.filter(venta_id=OuterRef('pk')).values('venta_id').annotate(total=Sum('monto')).values('total')
+    Venta.objects.filter(id__in=Pago.objects.values('venta_id')).update(
+        total_pagado=Coalesce(Subquery(suma), Value(Decimal('0')))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pos', '0006_metricas_clientes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='venta',
+            name='total_pagado',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.RunPython(calcular_total_pagado, migrations.RunPython.noop),
+    ]
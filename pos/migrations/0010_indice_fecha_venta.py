@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pos', '0009_trabajos_reporte'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='venta',
+            name='fecha',
+            field=models.DateTimeField(db_index=True),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:30
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pos', '0010_indice_fecha_venta'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HistorialPrecio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('precio_anterior', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('precio_nuevo', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now)),
+                ('operacion', models.CharField(db_index=True, max_length=32)),
+                ('motivo', models.CharField(blank=True, default='', max_length=200)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='historial_precios', to='pos.producto')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['producto', 'fecha'], name='historialprecio_prod_fecha_idx')],
+            },
+        ),
+    ]
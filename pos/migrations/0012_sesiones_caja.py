@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:36
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pos', '0011_historial_precios'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SesionCaja',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('terminal', models.CharField(max_length=40)),
+                ('terminal_abierta', models.CharField(blank=True, editable=False, max_length=40, null=True, unique=True)),
+                ('abierta', models.DateTimeField(default=django.utils.timezone.now)),
+                ('cerrada', models.DateTimeField(blank=True, null=True)),
+                ('fondo_inicial', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('cantidad_ventas', models.PositiveIntegerField(default=0)),
+                ('total_efectivo', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('total_debito', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('total_credito', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('efectivo_contado', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('diferencia', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('observacion', models.CharField(blank=True, default='', max_length=200)),
+                ('empleado', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='sesiones_caja', to='pos.empleado')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='venta',
+            name='sesion_caja',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ventas', to='pos.sesioncaja'),
+        ),
+        migrations.AddIndex(
+            model_name='sesioncaja',
+            index=models.Index(fields=['cerrada'], name='sesioncaja_cerrada_idx'),
+        ),
+    ]
@@ -0,0 +1,93 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:39
+
+import django.db.models.deletion
+import pos.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+MODELOS = (('lote', 'lotes'), ('movimientoinventario', 'movimientos'), ('sesioncaja', 'sesiones_caja'),
+           ('venta', 'ventas'))
+
+
+def crear_sucursal_predeterminada(apps, schema_editor):
+    # Las filas existentes quedan en esta sucursal; se asigna aquí, con los
+    # modelos históricos, y no con el default de los modelos actuales
+    Sucursal = apps.get_model('pos', 'Sucursal')
+    codigo = getattr(settings, 'POS_SUCURSAL_PREDETERMINADA', 'principal')
+    sucursal, _ = Sucursal.objects.get_or_create(codigo=codigo, defaults={'nombre': codigo.title()})
+    for modelo, _ in MODELOS:
+        apps.get_model('pos', modelo).objects.filter(sucursal__isnull=True).update(sucursal=sucursal)
+
+
+def _sucursal(related_name, **opciones):
+    return models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT,
+                             related_name=related_name, to='pos.sucursal', **opciones)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pos', '0012_sesiones_caja'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Sucursal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('codigo', models.SlugField(max_length=30, unique=True)),
+                ('nombre', models.CharField(max_length=100)),
+                ('direccion', models.CharField(blank=True, default='', max_length=200)),
+                ('activa', models.BooleanField(default=True)),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='sesioncaja',
+            name='sesioncaja_cerrada_idx',
+        ),
+        migrations.AlterField(
+            model_name='sesioncaja',
+            name='terminal_abierta',
+            field=models.CharField(blank=True, editable=False, max_length=40, null=True),
+        ),
+        # Nullable, se llenan y recién entonces NOT NULL. El default de los
+        # modelos (la sucursal predeterminada) se agrega al final: solo cambia
+        # el estado, así que la migración nunca lo ejecuta.
+        *(
+            migrations.AddField(model_name=modelo, name='sucursal', field=_sucursal(related_name, null=True))
+            for modelo, related_name in MODELOS
+        ),
+        migrations.RunPython(crear_sucursal_predeterminada, migrations.RunPython.noop),
+        *(
+            migrations.AlterField(model_name=modelo, name='sucursal', field=_sucursal(related_name))
+            for modelo, related_name in MODELOS
+        ),
+        *(
+            migrations.AlterField(
+                model_name=modelo, name='sucursal',
+                field=_sucursal(related_name, default=pos.models.sucursal_predeterminada_id),
+            )
+            for modelo, related_name in MODELOS
+        ),
+        migrations.AddIndex(
+            model_name='lote',
+            index=models.Index(fields=['sucursal', 'producto', 'fecha_caducidad'], name='lote_suc_prod_cad_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movimientoinventario',
+            index=models.Index(fields=['sucursal', 'producto', 'fecha'], name='movinv_suc_prod_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sesioncaja',
+            index=models.Index(fields=['sucursal', 'cerrada'], name='sesioncaja_suc_cerrada_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venta',
+            index=models.Index(fields=['sucursal', 'fecha'], name='venta_suc_fecha_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='sesioncaja',
+            constraint=models.UniqueConstraint(fields=('sucursal', 'terminal_abierta'), name='sesioncaja_terminal_abierta_uniq'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pos', '0013_sucursales'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoteArchivado',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('numero_lote', models.CharField(blank=True, max_length=50, null=True)),
+                ('fecha_elaboracion', models.DateField(blank=True, null=True)),
+                ('fecha_caducidad', models.DateField()),
+                ('stock_actual', models.IntegerField(default=0)),
+                ('stock_minimo', models.IntegerField(blank=True, null=True)),
+                ('stock_maximo', models.IntegerField(blank=True, null=True)),
+                ('creado', models.DateTimeField()),
+                ('eliminado', models.DateTimeField()),
+                ('archivado', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='lote',
+            index=models.Index(condition=models.Q(('eliminado__isnull', True), ('stock_actual__gt', 0)), fields=['sucursal', 'producto', 'fecha_caducidad'], name='lote_vivo_fefo_idx'),
+        ),
+        migrations.AddField(
+            model_name='lotearchivado',
+            name='producto',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lotes_archivados', to='pos.producto'),
+        ),
+        migrations.AddField(
+            model_name='lotearchivado',
+            name='sucursal',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='lotes_archivados', to='pos.sucursal'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pos', '0014_lotes_vigentes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PerfilPeticion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateTimeField(auto_now_add=True)),
+                ('metodo', models.CharField(max_length=10)),
+                ('ruta', models.CharField(max_length=500)),
+                ('estado', models.PositiveSmallIntegerField()),
+                ('duracion_ms', models.FloatField()),
+                ('cantidad_consultas', models.PositiveIntegerField(default=0)),
+                ('disparador', models.CharField(max_length=100)),
+                ('arbol', models.JSONField(default=dict)),
+                ('funciones', models.JSONField(default=list)),
+                ('sql', models.JSONField(default=list)),
+            ],
+            options={
+                'ordering': ['-id'],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pos', '0015_perfiles_peticion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='empleado',
+            name='sucursal',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='empleados', to='pos.sucursal'),
+        ),
+    ]
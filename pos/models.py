@@ -1,11 +1,34 @@
 from django.db import models
 from datetime import date, datetime
+from decimal import Decimal
+import uuid
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
 
+# Sucursal: el stock, las ventas, los movimientos y las cajas se particionan por ella
+class Sucursal(models.Model):
+    codigo = models.SlugField(max_length=30, unique=True)
+    nombre = models.CharField(max_length=100)
+    direccion = models.CharField(max_length=200, blank=True, default='')
+    activa = models.BooleanField(default=True)
+
+    def __str__(self):
+        return self.nombre
+
+
+def sucursal_predeterminada_id():
+    """Default de las FK a Sucursal: la sucursal POS_SUCURSAL_PREDETERMINADA."""
+    from . import sucursales
+    return sucursales.predeterminada_id()
+
+
 class Categoria(models.Model):
     nombre = models.CharField(max_length=100, null=True, blank=True)
     descripcion = models.CharField(max_length=200, null=True, blank=True)
+    modificado = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return self.nombre or f"Categoría {self.id}"
@@ -23,7 +46,8 @@ class Nutricional(models.Model):
 
 # Producto
 class Producto(models.Model):
-    codigo_barra = models.IntegerField(null=True, blank=True)
+    # Texto para soportar EAN-13/GTIN-14 y ceros a la izquierda; único, por lo que queda indexado
+    codigo_barra = models.CharField(max_length=50, unique=True, null=True, blank=True)
     nombre = models.CharField(max_length=100)
     descripcion = models.CharField(max_length=300, null=True, blank=True)
     marca = models.CharField(max_length=100, null=True, blank=True)
@@ -32,10 +56,17 @@ class Producto(models.Model):
     presentacion = models.CharField(max_length=100, null=True, blank=True)
     formato = models.CharField(max_length=100, null=True, blank=True)
     categoria = models.ForeignKey(Categoria, on_delete=models.DO_NOTHING)
-    
+    modificado = models.DateTimeField(auto_now=True, db_index=True)
+
     def __str__(self):
         return self.nombre
 
+    def save(self, *args, **kwargs):
+        # Sin código se guarda NULL: varios "" chocarían con la restricción unique
+        if self.codigo_barra is not None:
+            self.codigo_barra = str(self.codigo_barra).strip() or None
+        super().save(*args, **kwargs)
+
     # Métodos derivables del diagrama
     def stock_total(self):
         """Suma el stock_actual de todos los lotes asociados."""
@@ -57,8 +88,12 @@ class Producto(models.Model):
         descuento = float(porcentaje) / 100.0
         nuevo_precio = round(float(self.precio) * (1 - descuento), 2)
         if aplicar:
+            HistorialPrecio.objects.create(
+                producto=self, precio_anterior=self.precio, precio_nuevo=nuevo_precio,
+                operacion=uuid.uuid4().hex, motivo=f"Descuento {porcentaje}%",
+            )
             self.precio = nuevo_precio
-            self.save(update_fields=["precio"])
+            self.save(update_fields=["precio", "modificado"])
         return nuevo_precio
 
     def verificar_disponibilidad_general(self, cantidad):
@@ -79,6 +114,13 @@ class Producto(models.Model):
         )
         return mov
 
+class LotesVigentesManager(models.Manager):
+    """Lotes sin baja lógica: los que ven el FEFO, el stock, la API y ``producto.lotes``."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(eliminado__isnull=True)
+
+
 class Lote(models.Model):
     producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name="lotes")
     numero_lote = models.CharField(max_length=50, null=True, blank=True)
@@ -88,8 +130,27 @@ class Lote(models.Model):
     stock_minimo = models.IntegerField(null=True, blank=True)
     stock_maximo = models.IntegerField(null=True, blank=True)
     creado = models.DateTimeField(auto_now_add=True)
-    modificado = models.DateTimeField(auto_now=True)
+    modificado = models.DateTimeField(auto_now=True, db_index=True)
     eliminado = models.DateTimeField(null=True, blank=True)
+    # Sin índice propio: lo cubre el índice compuesto que empieza por sucursal
+    sucursal = models.ForeignKey(Sucursal, on_delete=models.PROTECT, related_name='lotes',
+                                 default=sucursal_predeterminada_id, db_index=False)
+
+    # El primero es el predeterminado (y el de producto.lotes); `todos` incluye los dados de baja
+    objects = LotesVigentesManager()
+    todos = models.Manager()
+
+    class Meta:
+        indexes = [
+            # Consumo FEFO y stock por producto dentro de una sucursal
+            models.Index(fields=['sucursal', 'producto', 'fecha_caducidad'], name='lote_suc_prod_cad_idx'),
+            # Solo lo que está en la estantería: no crece con los lotes agotados o dados de baja.
+            # MySQL no tiene índices parciales (ahí lo acota pos.lotes.archivar)
+            models.Index(
+                fields=['sucursal', 'producto', 'fecha_caducidad'], name='lote_vivo_fefo_idx',
+                condition=models.Q(eliminado__isnull=True, stock_actual__gt=0),
+            ),
+        ]
 
     def __str__(self):
         return f"Lote {self.numero_lote or self.id} - {self.producto.nombre}"
@@ -160,14 +221,52 @@ class Alerta(models.Model):
     producto = models.ForeignKey(Producto, on_delete=models.DO_NOTHING)
 
 
+def normalizar_rut(rut):
+    """Forma canónica del RUT: sin puntos ni espacios, con guion y K mayúscula.
+
+    "12.345.678-k", "12345678k" y "12345678-K" quedan como "12345678-K".
+    """
+    rut = str(rut).replace('.', '').replace(' ', '').replace('-', '').upper()
+    if len(rut) < 2:
+        return rut
+    return f"{rut[:-1]}-{rut[-1]}"
+
+
+def rut_valido(rut):
+    """True si el RUT (ya normalizado) tiene 7 u 8 dígitos y su dígito verificador (módulo 11) cuadra."""
+    cuerpo, _, dv = rut.partition('-')
+    if not (cuerpo.isdigit() and 7 <= len(cuerpo) <= 8 and len(dv) == 1):
+        return False
+    suma = sum(int(digito) * (2 + i % 6) for i, digito in enumerate(reversed(cuerpo)))
+    return dv == '0123456789K0'[11 - suma % 11]
+
+
 # Cliente
 class Cliente(models.Model):
+    SEGMENTO_CHOICES = [
+        ('nuevo', 'Nuevo'),
+        ('campeon', 'Campeón'),
+        ('leal', 'Leal'),
+        ('ocasional', 'Ocasional'),
+        ('en_riesgo', 'En riesgo'),
+        ('perdido', 'Perdido'),
+    ]
     rut = models.CharField(max_length=12, unique=True)
     nombre = models.CharField(max_length=150, null=True, blank=True)
     correo = models.CharField(max_length=100, unique=True, null=True, blank=True)
 
+    # Métricas mantenidas en cada venta (ver pos.clientes), para no recorrer el historial
+    visitas = models.PositiveIntegerField(default=0)
+    ultima_compra = models.DateTimeField(null=True, blank=True)
+    gasto_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    segmento_rfm = models.CharField(max_length=20, choices=SEGMENTO_CHOICES, blank=True, default='')
+
+    def save(self, *args, **kwargs):
+        self.rut = normalizar_rut(self.rut)
+        super().save(*args, **kwargs)
+
     def __str__(self):
-        return self.nombre
+        return self.nombre or self.rut
 
 
 # Empleado
@@ -180,11 +279,50 @@ class Empleado(models.Model):
     clave = models.CharField(max_length=100)
     direccion = models.CharField(max_length=200)
     cargo = models.CharField(max_length=45)
+    usuario = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    # Única sucursal en que puede operar si no es staff; sin asignar, la predeterminada
+    sucursal = models.ForeignKey(Sucursal, on_delete=models.SET_NULL, null=True, blank=True, related_name='empleados')
 
     def __str__(self):
         return f"{self.nombres} {self.apellido_paterno}"
 
 
+# Sesión de caja de una terminal: los totales por medio de pago se acumulan en
+# cada venta (pos.caja.registrar_venta), así el cierre no recorre las ventas
+class SesionCaja(models.Model):
+    sucursal = models.ForeignKey(Sucursal, on_delete=models.PROTECT, related_name='sesiones_caja',
+                                 default=sucursal_predeterminada_id, db_index=False)
+    terminal = models.CharField(max_length=40)
+    # Igual a terminal mientras la sesión está abierta y NULL al cerrarla: el
+    # índice único impide dos sesiones abiertas en la misma terminal de una
+    # sucursal (MySQL no tiene índices únicos parciales, pero admite varios NULL)
+    terminal_abierta = models.CharField(max_length=40, null=True, blank=True, editable=False)
+    empleado = models.ForeignKey(Empleado, on_delete=models.PROTECT, related_name='sesiones_caja')
+    abierta = models.DateTimeField(default=timezone.now)
+    cerrada = models.DateTimeField(null=True, blank=True)
+    fondo_inicial = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    cantidad_ventas = models.PositiveIntegerField(default=0)
+    total_efectivo = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_debito = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_credito = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    efectivo_contado = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    # efectivo_contado - (fondo_inicial + total_efectivo); negativo = faltante
+    diferencia = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    observacion = models.CharField(max_length=200, blank=True, default='')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['sucursal', 'terminal_abierta'], name='sesioncaja_terminal_abierta_uniq'),
+        ]
+        indexes = [models.Index(fields=['sucursal', 'cerrada'], name='sesioncaja_suc_cerrada_idx')]
+
+    @property
+    def efectivo_esperado(self):
+        return self.fondo_inicial + self.total_efectivo
+
+    def __str__(self):
+        return f"Caja {self.terminal} ({self.empleado}) {self.abierta:%d-%m-%Y %H:%M}"
+
 
 # Venta
 class Venta(models.Model):
@@ -192,7 +330,7 @@ class Venta(models.Model):
         ('presencial', 'Presencial'),
         ('delivery', 'Delivery'),
     ]
-    fecha = models.DateTimeField()
+    fecha = models.DateTimeField(db_index=True)
     total_sin_iva = models.DecimalField(max_digits=10, decimal_places=2)
     total_iva = models.DecimalField(max_digits=10, decimal_places=2)
     descuento = models.DecimalField(max_digits=10, decimal_places=2)
@@ -201,20 +339,36 @@ class Venta(models.Model):
     folio = models.CharField(max_length=20, null=True, blank=True)
     monto_pagado = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     vuelto = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
-    cliente = models.ForeignKey(Cliente, on_delete=models.DO_NOTHING, null=True, blank=True)
-    empleado = models.ForeignKey(Empleado, on_delete=models.DO_NOTHING, null=True, blank=True)
+    # Suma de los pagos, mantenida al escribir Pago (checkout y señales) para no agregar por fila
+    total_pagado = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    cliente = models.ForeignKey(Cliente, on_delete=models.SET_NULL, null=True, blank=True)
+    empleado = models.ForeignKey(Empleado, on_delete=models.SET_NULL, null=True, blank=True)
+    sesion_caja = models.ForeignKey(SesionCaja, on_delete=models.SET_NULL, null=True, blank=True, related_name='ventas')
+    sucursal = models.ForeignKey(Sucursal, on_delete=models.PROTECT, related_name='ventas',
+                                 default=sucursal_predeterminada_id, db_index=False)
+
+    class Meta:
+        indexes = [models.Index(fields=['sucursal', 'fecha'], name='venta_suc_fecha_idx')]
 
     # Métodos de negocio (resumen básico)
-    def detalles(self):
-        return self.detalleventa_set.all()
+    @staticmethod
+    def recalcular_total_pagado(venta_id):
+        """Reescribe total_pagado desde los pagos en un solo UPDATE con subconsulta."""
+        suma = (
+            Pago.objects.filter(venta_id=models.OuterRef('pk'))
+            .values('venta_id').annotate(total=models.Sum('monto')).values('total')
+        )
+        Venta.objects.filter(pk=venta_id).update(
+            total_pagado=Coalesce(models.Subquery(suma), models.Value(Decimal('0')))
+        )
 
     def calcular_subtotal(self):
         """Suma cantidad * precio_unitario (sin considerar descuentos) de los detalles."""
-        return sum((d.cantidad * float(d.precio_unitario)) for d in self.detalles())
+        return sum((d.cantidad * float(d.precio_unitario)) for d in self.detalles.all())
 
     def calcular_total_descuento(self):
         total_desc = 0.0
-        for d in self.detalles():
+        for d in self.detalles.all():
             if d.descuento_pct:
                 total_desc += (d.cantidad * float(d.precio_unitario)) * (float(d.descuento_pct) / 100.0)
         return round(total_desc, 2)
@@ -241,11 +395,11 @@ class Venta(models.Model):
     def actualizar_stock(self):
         """Actualiza el stock de los productos restando las cantidades vendidas, consumiendo lotes por fecha de caducidad ascendente."""
         from .models import MovimientoInventario
-        for detalle in self.detalles():
+        for detalle in self.detalles.all():
             producto = detalle.producto
             cantidad = detalle.cantidad
-            # Consumir lotes por fecha de caducidad (próxima a vencer primero)
-            lotes = producto.lotes.filter(stock_actual__gt=0).order_by('fecha_caducidad')
+            # Consumir lotes de la sucursal por fecha de caducidad (próxima a vencer primero)
+            lotes = producto.lotes.filter(sucursal_id=self.sucursal_id, stock_actual__gt=0).order_by('fecha_caducidad')
             restante = int(cantidad)
             for lote in lotes:
                 if restante <= 0:
@@ -259,7 +413,8 @@ class Venta(models.Model):
                         tipo_movimiento='salida',
                         cantidad=to_retirar,
                         fecha=timezone.now(),
-                        producto=producto
+                        producto=producto,
+                        sucursal_id=self.sucursal_id,
                     )
                     restante -= to_retirar
             if restante > 0:
@@ -302,6 +457,11 @@ class MovimientoInventario(models.Model):
     cantidad = models.IntegerField()
     fecha = models.DateTimeField()
     producto = models.ForeignKey(Producto, on_delete=models.DO_NOTHING)
+    sucursal = models.ForeignKey(Sucursal, on_delete=models.PROTECT, related_name='movimientos',
+                                 default=sucursal_predeterminada_id, db_index=False)
+
+    class Meta:
+        indexes = [models.Index(fields=['sucursal', 'producto', 'fecha'], name='movinv_suc_prod_fecha_idx')]
 
 # Turno de trabajo
 class Turno(models.Model):
@@ -312,3 +472,146 @@ class Turno(models.Model):
 
     def __str__(self):
         return f"Turno de {self.empleado} el {self.fecha}"
+
+
+# Lotes dados de baja hace tiempo, fuera de la tabla de trabajo (ver pos.lotes.archivar)
+class LoteArchivado(models.Model):
+    # El mismo id que tenía en Lote
+    id = models.BigIntegerField(primary_key=True)
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='lotes_archivados')
+    numero_lote = models.CharField(max_length=50, null=True, blank=True)
+    fecha_elaboracion = models.DateField(null=True, blank=True)
+    fecha_caducidad = models.DateField()
+    # Stock que tenía al darse de baja (distinto de 0 si venció con mercadería)
+    stock_actual = models.IntegerField(default=0)
+    stock_minimo = models.IntegerField(null=True, blank=True)
+    stock_maximo = models.IntegerField(null=True, blank=True)
+    creado = models.DateTimeField()
+    eliminado = models.DateTimeField()
+    archivado = models.DateTimeField(auto_now_add=True)
+    sucursal = models.ForeignKey(Sucursal, on_delete=models.PROTECT, related_name='lotes_archivados')
+
+    def __str__(self):
+        return f"Lote archivado {self.numero_lote or self.id}"
+
+
+# Eliminaciones del catálogo, para que las terminales sincronizadas las repliquen
+class EliminacionCatalogo(models.Model):
+    MODELO_CHOICES = [
+        ('categoria', 'Categoría'),
+        ('producto', 'Producto'),
+        ('lote', 'Lote'),
+    ]
+    modelo = models.CharField(max_length=20, choices=MODELO_CHOICES)
+    objeto_id = models.BigIntegerField()
+    fecha = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.modelo} {self.objeto_id} eliminado el {self.fecha}"
+
+
+# Outbox: efectos secundarios de una venta, escritos en su misma transacción y
+# procesados después por el comando procesar_eventos (ver pos.eventos)
+class EventoSalida(models.Model):
+    tipo = models.CharField(max_length=50)
+    objeto_id = models.BigIntegerField()
+    datos = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    creado = models.DateTimeField(auto_now_add=True)
+    procesado = models.DateTimeField(null=True, blank=True)
+    intentos = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True, default='')
+
+    class Meta:
+        indexes = [models.Index(fields=['procesado', 'id'], name='eventosalida_pendientes_idx')]
+
+    def __str__(self):
+        return f"{self.tipo} {self.objeto_id}"
+
+
+# Ventas agregadas por día y producto, mantenidas por el outbox
+class ResumenVentaDiaria(models.Model):
+    fecha = models.DateField()
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='resumenes_venta')
+    unidades = models.IntegerField(default=0)
+    monto = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    tickets = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['fecha', 'producto'], name='resumen_venta_fecha_producto_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.producto_id} {self.fecha}: {self.unidades}"
+
+
+# Reportes pesados, generados por el worker procesar_reportes (ver pos.reportes)
+class TrabajoReporte(models.Model):
+    ESTADO_CHOICES = [
+        ('pendiente', 'Pendiente'),
+        ('en_proceso', 'En proceso'),
+        ('listo', 'Listo'),
+        ('error', 'Error'),
+        ('expirado', 'Expirado'),
+    ]
+    tipo = models.CharField(max_length=50)
+    parametros = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    # Hash de tipo + parámetros, para servir reportes idénticos desde el cache
+    clave = models.CharField(max_length=64, db_index=True)
+    cacheable = models.BooleanField(default=False)
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='pendiente')
+    archivo = models.FileField(upload_to='reportes/', null=True, blank=True)
+    tamano = models.BigIntegerField(default=0)
+    error = models.TextField(blank=True, default='')
+    solicitado_por = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    creado = models.DateTimeField(auto_now_add=True)
+    iniciado = models.DateTimeField(null=True, blank=True)
+    terminado = models.DateTimeField(null=True, blank=True)
+    ultimo_acceso = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['estado', 'id'], name='trabajoreporte_estado_idx')]
+
+    def __str__(self):
+        return f"{self.tipo} #{self.pk} ({self.estado})"
+
+
+# Historial de precios: cada cambio guarda el precio anterior y el nuevo
+class HistorialPrecio(models.Model):
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='historial_precios')
+    precio_anterior = models.DecimalField(max_digits=10, decimal_places=2)
+    precio_nuevo = models.DecimalField(max_digits=10, decimal_places=2)
+    fecha = models.DateTimeField(default=timezone.now)
+    # Agrupa las filas de un mismo ajuste masivo
+    operacion = models.CharField(max_length=32, db_index=True)
+    motivo = models.CharField(max_length=200, blank=True, default='')
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['producto', 'fecha'], name='historialprecio_prod_fecha_idx')]
+
+    def __str__(self):
+        return f"{self.producto_id}: {self.precio_anterior} → {self.precio_nuevo}"
+
+
+# Perfil de una petición puntual pedido con X-Perfil o ?perfilar=1 (ver pos.perfilado)
+class PerfilPeticion(models.Model):
+    fecha = models.DateTimeField(auto_now_add=True)
+    metodo = models.CharField(max_length=10)
+    ruta = models.CharField(max_length=500)
+    estado = models.PositiveSmallIntegerField()
+    duracion_ms = models.FloatField()
+    cantidad_consultas = models.PositiveIntegerField(default=0)
+    # "firma" o "staff:<usuario>"
+    disparador = models.CharField(max_length=100)
+    # Árbol de llamadas {n, f, v, c} para el flame graph
+    arbol = models.JSONField(default=dict)
+    funciones = models.JSONField(default=list)
+    # Línea de tiempo: [{inicio, ms, alias, sql}] en milisegundos desde el inicio de la petición
+    sql = models.JSONField(default=list)
+
+    class Meta:
+        ordering = ['-id']
+
+    def __str__(self):
+        return f"{self.metodo} {self.ruta} ({self.duracion_ms:.0f} ms)"
@@ -0,0 +1,54 @@
+"""Medios de pago de una venta: validación, pago dividido y vuelto.
+
+El checkout recibe uno o más pagos ({metodo, monto, referencia}) y
+``repartir`` los valida contra el total antes de abrir la transacción, así
+un pago mal formado responde 400 sin tocar la base.
+"""
+from decimal import Decimal, InvalidOperation
+
+from .models import Pago
+
+
+def repartir(tenders, total):
+    """Valida los medios de pago de una venta y calcula el vuelto.
+
+    Solo el efectivo da vuelto: las tarjetas no pueden exceder lo que queda por
+    pagar después de los otros pagos con tarjeta. Cada Pago guarda lo aplicado a
+    la venta (el efectivo menos el vuelto), así que la suma de los pagos es el
+    total cobrado. Retorna (pagos, monto_pagado, vuelto).
+    """
+    if not isinstance(tenders, list):
+        raise ValueError('pagos debe ser una lista de {metodo, monto}')
+    metodos = dict(Pago.METODO_CHOICES)
+    pagos = []
+    for tender in tenders:
+        if not isinstance(tender, dict):
+            raise ValueError('Cada pago debe indicar metodo y monto')
+        metodo = tender.get('metodo')
+        if metodo not in metodos:
+            raise ValueError(f'Método de pago inválido: {metodo}')
+        try:
+            monto = Decimal(str(tender.get('monto', '0'))).quantize(Decimal('0.01'))
+        except (InvalidOperation, TypeError):
+            raise ValueError('Monto de pago inválido')
+        if not monto.is_finite():
+            raise ValueError('Monto de pago inválido')
+        if monto <= 0:
+            raise ValueError('El monto de cada pago debe ser positivo')
+        pagos.append({'metodo': metodo, 'monto': monto, 'referencia': tender.get('referencia') or None})
+
+    monto_pagado = sum((p['monto'] for p in pagos), Decimal('0'))
+    if monto_pagado < total:
+        raise ValueError('El monto pagado es menor al total')
+    tarjetas = sum((p['monto'] for p in pagos if p['metodo'] != 'EFE'), Decimal('0'))
+    if tarjetas > total:
+        raise ValueError('Los pagos con tarjeta no pueden exceder el total')
+
+    vuelto = monto_pagado - total
+    restante = vuelto
+    for pago in pagos:
+        if pago['metodo'] == 'EFE' and restante:
+            descontar = min(restante, pago['monto'])
+            pago['monto'] -= descontar
+            restante -= descontar
+    return [p for p in pagos if p['monto'] > 0], monto_pagado, vuelto
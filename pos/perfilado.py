@@ -0,0 +1,206 @@
+"""Perfilado a pedido de una petición puntual.
+
+Una petición se perfila solo si lo pide (``PerfilMiddleware`` en
+forneria.middleware):
+
+- con la cabecera ``X-Perfil`` y una firma vigente de ``firmar()`` (comando
+  ``firmar_perfil``), útil para la API de las terminales que usan JWT;
+- o con ``?perfilar=1`` si el usuario de la sesión es staff.
+
+Esa petición corre bajo cProfile y con un ``execute_wrapper`` en cada conexión
+que anota cuándo empieza y cuánto dura cada consulta. El resultado se guarda
+en ``PerfilPeticion`` (árbol de llamadas para el flame graph, funciones más
+costosas y línea de tiempo SQL) y la respuesta lleva su id en ``X-Perfil-Id``.
+Las demás peticiones no pasan por aquí: el middleware solo mira la cabecera y
+la query string.
+
+Solo se perfila una petición a la vez por proceso: desde Python 3.12 cProfile
+no admite dos perfiladores activos, y así una ráfaga de peticiones firmadas
+tampoco degrada el servidor.
+"""
+import cProfile
+import logging
+import os
+import pstats
+import sys
+import sysconfig
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core import signing
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+SAL_FIRMA = 'pos.perfilado'
+_en_curso = threading.Lock()
+
+
+def _config(nombre, defecto):
+    return getattr(settings, nombre, defecto)
+
+
+def firmar():
+    """Valor para la cabecera X-Perfil, vigente por ``POS_PERFIL_FIRMA_SEGUNDOS``."""
+    return signing.TimestampSigner(salt=SAL_FIRMA).sign('perfil')
+
+
+def firma_valida(valor):
+    try:
+        signing.TimestampSigner(salt=SAL_FIRMA).unsign(valor, max_age=_config('POS_PERFIL_FIRMA_SEGUNDOS', 3600))
+    except signing.BadSignature:
+        return False
+    return True
+
+
+class _LineaSQL:
+    """execute_wrapper que anota inicio y duración de cada consulta, relativos al inicio de la petición."""
+
+    def __init__(self, t0):
+        self.t0 = t0
+        self.consultas = []
+        self.maximo = _config('POS_PERFIL_MAX_CONSULTAS', 2000)
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            if len(self.consultas) < self.maximo:
+                self.consultas.append({
+                    'inicio': round((inicio - self.t0) * 1000, 3),
+                    'ms': round((time.perf_counter() - inicio) * 1000, 3),
+                    'alias': context['connection'].alias,
+                    'sql': sql[:2000],
+                })
+
+
+def _atender(get_response, request):
+    # Raíz única del árbol: el get_response de Django reaparece más abajo en la
+    # cadena de middlewares, así que pstats no lo ve como llamada de primer nivel
+    return get_response(request)
+
+
+def perfilar(request, get_response, disparador):
+    """Atiende la petición bajo el perfilador y guarda el resultado. Retorna la respuesta."""
+    if not _en_curso.acquire(blocking=False):
+        return get_response(request)
+    try:
+        perfil = cProfile.Profile()
+        t0 = time.perf_counter()
+        linea = _LineaSQL(t0)
+        with ExitStack() as pila:
+            for conexion in connections.all():
+                pila.enter_context(conexion.execute_wrapper(linea))
+            try:
+                perfil.enable()
+            except ValueError:  # otro perfilador activo (p. ej. un depurador)
+                logger.warning("perfilado: no se pudo activar cProfile para %s", request.path)
+                return get_response(request)
+            try:
+                response = _atender(get_response, request)
+            finally:
+                perfil.disable()
+        duracion = (time.perf_counter() - t0) * 1000
+    finally:
+        _en_curso.release()
+
+    try:
+        registro = guardar(request, response, perfil, linea.consultas, duracion, disparador)
+    except Exception:
+        logger.exception("perfilado: no se pudo guardar el perfil de %s", request.path)
+        return response
+    response['X-Perfil-Id'] = str(registro.pk)
+    return response
+
+
+def guardar(request, response, perfil, consultas, duracion, disparador):
+    from .models import PerfilPeticion
+
+    stats = pstats.Stats(perfil).stats
+    registro = PerfilPeticion.objects.create(
+        metodo=request.method,
+        ruta=request.get_full_path()[:500],
+        estado=response.status_code,
+        duracion_ms=round(duracion, 3),
+        cantidad_consultas=len(consultas),
+        disparador=disparador[:100],
+        arbol=arbol(stats),
+        funciones=funciones(stats),
+        sql=consultas,
+    )
+    # Se conservan los últimos POS_PERFIL_MAXIMO
+    maximo = _config('POS_PERFIL_MAXIMO', 200)
+    PerfilPeticion.objects.filter(pk__lte=registro.pk - maximo).delete()
+    return registro
+
+
+_PREFIJOS = sorted(
+    {os.path.join(str(settings.BASE_DIR), ''), *(os.path.join(p, '') for p in sys.path if p)}
+    | {os.path.join(sysconfig.get_paths()[k], '') for k in ('stdlib', 'purelib', 'platlib')},
+    key=len, reverse=True,
+)
+
+
+def _nombre(funcion):
+    archivo, linea, nombre = funcion
+    if archivo == '~':  # built-ins: "<built-in method time.sleep>"
+        return nombre, ''
+    for prefijo in _PREFIJOS:
+        if archivo.startswith(prefijo):
+            archivo = archivo[len(prefijo):]
+            break
+    return nombre, f'{archivo}:{linea}'
+
+
+def arbol(stats):
+    """Árbol de llamadas {n, f, v (ms), c (hijos)} armado desde pstats, al estilo de snakeviz.
+
+    pstats guarda por función cuánto tiempo le dedicó a cada llamador. Al bajar
+    por el árbol, el tiempo de cada hijo se escala por la fracción del tiempo
+    total de la función que corresponde a esa rama. Las ramas de menos de
+    ``POS_PERFIL_UMBRAL`` del total se omiten.
+    """
+    hijos = {}
+    raices = []
+    for funcion, (_, _, _, ct, llamadores) in stats.items():
+        if not llamadores:
+            raices.append((funcion, ct))
+        for llamador, (_, _, _, ct_llamador) in llamadores.items():
+            hijos.setdefault(llamador, []).append((funcion, ct_llamador))
+
+    total = sum(ct for _, ct in raices) * 1000
+    minimo = total * _config('POS_PERFIL_UMBRAL', 0.002)
+    profundidad_maxima = _config('POS_PERFIL_PROFUNDIDAD', 80)
+
+    def nodo(funcion, ms, camino):
+        nombre, ubicacion = _nombre(funcion)
+        resultado = {'n': nombre, 'f': ubicacion, 'v': round(ms, 3), 'c': []}
+        total_funcion = stats[funcion][3] * 1000
+        if len(camino) >= profundidad_maxima or not total_funcion:
+            return resultado
+        escala = ms / total_funcion
+        camino = camino | {funcion}
+        for hijo, ct in sorted(hijos.get(funcion, ()), key=lambda h: -h[1]):
+            ms_hijo = ct * 1000 * escala
+            if ms_hijo >= minimo and hijo not in camino:
+                resultado['c'].append(nodo(hijo, ms_hijo, camino))
+        return resultado
+
+    return {'n': 'petición', 'f': '', 'v': round(total, 3),
+            'c': [nodo(f, ct * 1000, frozenset()) for f, ct in sorted(raices, key=lambda r: -r[1]) if ct * 1000 >= minimo]}
+
+
+def funciones(stats, cantidad=40):
+    """Funciones con más tiempo propio."""
+    filas = sorted(stats.items(), key=lambda item: -item[1][2])[:cantidad]
+    resultado = []
+    for funcion, (_, llamadas, propio, total, _) in filas:
+        nombre, ubicacion = _nombre(funcion)
+        resultado.append({
+            'funcion': nombre, 'ubicacion': ubicacion, 'llamadas': llamadas,
+            'propio_ms': round(propio * 1000, 3), 'total_ms': round(total * 1000, 3),
+        })
+    return resultado
@@ -0,0 +1,85 @@
+"""Ajustes masivos de precio con historial.
+
+Un ajuste (porcentaje o monto fijo) sobre los productos de una categoría,
+marca o tipo se aplica con un solo UPDATE, guarda precio anterior y nuevo en
+``HistorialPrecio`` con un bulk insert y renueva la versión global del
+catálogo una vez, en vez de una señal y un save por producto.
+"""
+import uuid
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Round
+from django.utils import timezone
+
+from . import escaneo
+from .cache import renovar_catalogo
+from .models import HistorialPrecio, Producto
+
+FILTROS = ('categoria', 'marca', 'tipo')
+_precio = Producto._meta.get_field('precio')
+PRECIO_LIMITE = Decimal(10) ** (_precio.max_digits - _precio.decimal_places)
+
+
+def productos_filtrados(filtros):
+    consulta = Producto.objects.all()
+    if filtros.get('categoria'):
+        consulta = consulta.filter(categoria_id=filtros['categoria'])
+    if filtros.get('marca'):
+        consulta = consulta.filter(marca=filtros['marca'])
+    if filtros.get('tipo'):
+        consulta = consulta.filter(tipo=filtros['tipo'])
+    return consulta
+
+
+def ajustar_precios(filtros, porcentaje=None, monto=None, motivo='', usuario=None):
+    """Sube o baja precios por ``porcentaje`` (-10 = 10% menos) o por ``monto`` fijo.
+
+    Retorna {'operacion', 'productos'}. Lanza ValueError si algún precio
+    quedaría en cero o negativo, o sobre lo que admite la columna; en ese caso
+    no se modifica nada.
+    """
+    if (porcentaje is None) == (monto is None):
+        raise ValueError('Indique porcentaje o monto, no ambos')
+    if porcentaje is not None:
+        factor = 1 + Decimal(str(porcentaje)) / 100
+        nuevo = Round(F('precio') * Value(factor), 2)
+    else:
+        delta = Decimal(str(monto))
+        nuevo = F('precio') + Value(delta)
+
+    operacion = uuid.uuid4().hex
+    ahora = timezone.now()
+    with transaction.atomic():
+        consulta = productos_filtrados(filtros)
+        anteriores = dict(consulta.select_for_update().values_list('id', 'precio'))
+        if not anteriores:
+            return {'operacion': None, 'productos': 0}
+
+        minimo, maximo = min(anteriores.values()), max(anteriores.values())
+        if porcentaje is not None:
+            minimo_nuevo, maximo_nuevo = minimo * factor, maximo * factor
+        else:
+            minimo_nuevo, maximo_nuevo = minimo + delta, maximo + delta
+        if minimo_nuevo.quantize(Decimal('0.01')) <= 0:
+            raise ValueError('El ajuste dejaría precios en cero o negativos')
+        if maximo_nuevo.quantize(Decimal('0.01')) >= PRECIO_LIMITE:
+            # La columna no lo admite: el UPDATE fallaría con DataError
+            raise ValueError(f'El ajuste dejaría precios sobre el máximo ({PRECIO_LIMITE - Decimal("0.01")})')
+
+        # modificado se fija a mano: update() no pasa por auto_now y el feed de cambios lo necesita
+        consulta.update(precio=nuevo, modificado=ahora)
+        nuevos = dict(consulta.values_list('id', 'precio'))
+        HistorialPrecio.objects.bulk_create([
+            HistorialPrecio(
+                producto_id=pid, precio_anterior=anteriores[pid], precio_nuevo=nuevos[pid], fecha=ahora,
+                operacion=operacion, motivo=motivo, usuario=usuario,
+            )
+            for pid in anteriores
+        ])
+
+        # update() no dispara señales: una sola invalidación para todo el catálogo
+        transaction.on_commit(renovar_catalogo)
+        transaction.on_commit(escaneo.limpiar)
+    return {'operacion': operacion, 'productos': len(anteriores)}
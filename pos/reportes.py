@@ -0,0 +1,206 @@
+"""Reportes pesados generados en segundo plano.
+
+La API solo encola un ``TrabajoReporte``; el comando ``procesar_reportes``
+toma los pendientes y los genera en un pool de procesos, así que un reporte
+largo nunca ocupa un worker web. El resultado es un CSV en el storage por
+defecto que se descarga desde la API.
+
+Los reportes sobre períodos cerrados no cambian: una solicitud con el mismo
+tipo y parámetros (``clave``) reutiliza el trabajo existente, esté listo o aún
+en cola. El espacio de los resultados se acota con ``desalojar``, que expira
+los menos usados cuando se supera ``POS_REPORTES_CACHE_BYTES``.
+"""
+import csv
+import hashlib
+import io
+import json
+import logging
+import tempfile
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import DetalleVenta, Lote, TrabajoReporte
+
+logger = logging.getLogger(__name__)
+
+MAX_DIAS_PERIODO = 366
+
+_reportes = {}
+
+
+def reporte(tipo, normalizar):
+    """Registra un generador ``funcion(parametros, escritor_csv)``.
+
+    ``normalizar(parametros)`` valida (ValueError si no corresponde) y retorna
+    ``(parametros, cacheable)``: solo los resultados que ya no pueden cambiar
+    son cacheables.
+    """
+    def registrar(funcion):
+        _reportes[tipo] = (funcion, normalizar)
+        return funcion
+    return registrar
+
+
+def _periodo(parametros):
+    try:
+        desde = date.fromisoformat(str(parametros.get('desde')))
+        hasta = date.fromisoformat(str(parametros.get('hasta')))
+    except ValueError:
+        raise ValueError('desde y hasta son obligatorios (AAAA-MM-DD)')
+    if not desde < hasta <= desde + timedelta(days=MAX_DIAS_PERIODO):
+        raise ValueError(f'hasta debe ser posterior a desde y el período de hasta {MAX_DIAS_PERIODO} días')
+    # hasta es exclusiva: si ya pasó, el período está cerrado
+    return {'desde': desde.isoformat(), 'hasta': hasta.isoformat()}, hasta <= timezone.localdate()
+
+
+def _sin_parametros(parametros):
+    return {}, False
+
+
+@reporte('ventas_periodo', _periodo)
+def ventas_periodo(parametros, escritor):
+    inicio = timezone.make_aware(datetime.combine(date.fromisoformat(parametros['desde']), time.min))
+    fin = timezone.make_aware(datetime.combine(date.fromisoformat(parametros['hasta']), time.min))
+    monto = ExpressionWrapper(
+        # 100.0 y no 100: en SQLite los decimales enteros se guardan como INTEGER y dividirían truncando
+        F('cantidad') * F('precio_unitario') * (Value(100) - Coalesce(F('descuento_pct'), Value(0)))
+        / Value(Decimal('100.0')),
+        output_field=DecimalField(max_digits=14, decimal_places=2),
+    )
+    filas = (
+        DetalleVenta.objects.filter(venta__fecha__gte=inicio, venta__fecha__lt=fin)
+        .values('producto_id', 'producto__nombre', 'producto__categoria__nombre')
+        .annotate(unidades=Sum('cantidad'), monto=Sum(monto), tickets=Count('venta_id', distinct=True))
+        .order_by('-monto')
+    )
+    escritor.writerow(['producto_id', 'producto', 'categoria', 'unidades', 'monto', 'tickets'])
+    for fila in filas.iterator():
+        escritor.writerow([
+            fila['producto_id'], fila['producto__nombre'], fila['producto__categoria__nombre'] or '',
+            fila['unidades'], round(fila['monto'] or 0, 2), fila['tickets'],
+        ])
+
+
+@reporte('valorizacion_stock', _sin_parametros)
+def valorizacion_stock(parametros, escritor):
+    escritor.writerow(['lote_id', 'numero_lote', 'producto_id', 'producto', 'fecha_caducidad',
+                       'stock_actual', 'precio', 'valor'])
+    lotes = (
+        Lote.objects.filter(eliminado__isnull=True, stock_actual__gt=0)
+        .values_list('id', 'numero_lote', 'producto_id', 'producto__nombre', 'fecha_caducidad',
+                     'stock_actual', 'producto__precio')
+        .order_by('producto__nombre', 'fecha_caducidad')
+    )
+    for lote_id, numero, producto_id, nombre, caducidad, stock, precio in lotes.iterator():
+        escritor.writerow([lote_id, numero or '', producto_id, nombre, caducidad, stock, precio, stock * precio])
+
+
+def tipos():
+    return sorted(_reportes)
+
+
+def clave(tipo, parametros):
+    return hashlib.sha256(json.dumps([tipo, parametros], sort_keys=True).encode()).hexdigest()
+
+
+def solicitar(tipo, parametros, usuario=None):
+    """Encola un reporte o reutiliza uno idéntico cacheable. Retorna (trabajo, reutilizado)."""
+    if not isinstance(tipo, str) or tipo not in _reportes:
+        raise ValueError(f'Tipo de reporte desconocido: {tipo}')
+    parametros = parametros or {}
+    if not isinstance(parametros, dict):
+        raise ValueError('parametros debe ser un objeto')
+    parametros, cacheable = _reportes[tipo][1](parametros)
+    llave = clave(tipo, parametros)
+
+    if cacheable:
+        existente = (
+            TrabajoReporte.objects.filter(clave=llave, cacheable=True, estado__in=['pendiente', 'en_proceso', 'listo'])
+            .order_by('-id').first()
+        )
+        if existente is not None:
+            return existente, True
+
+    trabajo = TrabajoReporte.objects.create(
+        tipo=tipo, parametros=parametros, clave=llave, cacheable=cacheable,
+        solicitado_por=usuario if usuario is not None and usuario.is_authenticated else None,
+    )
+    return trabajo, False
+
+
+def tomar_pendientes(cantidad):
+    """Marca hasta ``cantidad`` trabajos pendientes como en proceso y retorna sus ids."""
+    with transaction.atomic():
+        ids = list(
+            TrabajoReporte.objects.filter(estado='pendiente').order_by('id')
+            .select_for_update(skip_locked=True).values_list('id', flat=True)[:cantidad]
+        )
+        TrabajoReporte.objects.filter(id__in=ids).update(estado='en_proceso', iniciado=timezone.now())
+    return ids
+
+
+def reclamar_abandonados(minutos=None):
+    """Devuelve a la cola los trabajos en proceso de un worker que murió."""
+    minutos = minutos or getattr(settings, 'POS_REPORTES_MINUTOS_ABANDONO', 60)
+    return TrabajoReporte.objects.filter(
+        estado='en_proceso', iniciado__lt=timezone.now() - timedelta(minutes=minutos),
+    ).update(estado='pendiente', iniciado=None)
+
+
+def ejecutar(trabajo_id):
+    """Genera el archivo de un trabajo. Corre en un proceso del pool del worker."""
+    trabajo = TrabajoReporte.objects.get(pk=trabajo_id)
+    funcion = _reportes[trabajo.tipo][0]
+    try:
+        with tempfile.TemporaryFile() as temporal:
+            texto = io.TextIOWrapper(temporal, encoding='utf-8', newline='')
+            try:
+                funcion(trabajo.parametros, csv.writer(texto))
+                texto.flush()
+            finally:
+                texto.detach()  # el archivo temporal lo cierra el with, no el wrapper
+            trabajo.tamano = temporal.tell()
+            temporal.seek(0)
+            trabajo.archivo.save(f'{trabajo.tipo}-{trabajo.pk}.csv', File(temporal), save=False)
+    except Exception as exc:
+        logger.exception("Falló el reporte %s", trabajo_id)
+        trabajo.estado = 'error'
+        trabajo.error = repr(exc)[:2000]
+    else:
+        trabajo.estado = 'listo'
+    trabajo.terminado = timezone.now()
+    trabajo.save(update_fields=['estado', 'archivo', 'tamano', 'error', 'terminado'])
+    if trabajo.estado == 'listo':
+        desalojar()
+    return trabajo.estado
+
+
+def registrar_acceso(trabajo):
+    TrabajoReporte.objects.filter(pk=trabajo.pk).update(ultimo_acceso=timezone.now())
+
+
+def desalojar(limite=None):
+    """Expira los resultados menos usados hasta que el total quede bajo ``limite`` bytes."""
+    limite = limite if limite is not None else getattr(settings, 'POS_REPORTES_CACHE_BYTES', 200 * 1024 * 1024)
+    listos = TrabajoReporte.objects.filter(estado='listo')
+    total = listos.aggregate(total=Sum('tamano'))['total'] or 0
+    if total <= limite:
+        return 0
+
+    expirados = 0
+    for trabajo in listos.order_by(Coalesce('ultimo_acceso', 'terminado').asc(), 'id').iterator():
+        if total <= limite:
+            break
+        trabajo.archivo.delete(save=False)
+        trabajo.estado = 'expirado'
+        trabajo.save(update_fields=['archivo', 'estado'])
+        total -= trabajo.tamano
+        expirados += 1
+    return expirados
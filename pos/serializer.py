@@ -1,7 +1,12 @@
 from rest_framework import serializers
 from .models import * 
+from . import clientes, escaneo, eventos, sucursales, tablero
+from .cache import renovar_producto
+from django.db import transaction
 from datetime import date, datetime
+from decimal import Decimal
 from django.db.models import Sum
+from django.utils import timezone
 import re
 
 class CategoriaSerializer(serializers.ModelSerializer):
@@ -92,10 +97,18 @@ class LoteSerializer(serializers.ModelSerializer):
         return data
 
 
+class LoteAnidadoSerializer(LoteSerializer):
+    """Lote dentro de un producto: el id se acepta para emparejar con el existente."""
+    id = serializers.IntegerField(required=False)
+
+    class Meta(LoteSerializer.Meta):
+        read_only_fields = ['producto']
+
+
 # --- Producto Serializer ---
 class ProductoSerializer(serializers.ModelSerializer):
     nutricional = NutricionalSerializer(read_only=True)
-    lotes = LoteSerializer(many=True, required=False)
+    lotes = LoteAnidadoSerializer(many=True, required=False)
     stock_total = serializers.SerializerMethodField() 
 
     class Meta:
@@ -103,7 +116,8 @@ class ProductoSerializer(serializers.ModelSerializer):
         fields = '__all__'  
 
     def get_stock_total(self, obj):
-        return obj.lotes.aggregate(total_stock=Sum('stock_actual'))['total_stock'] or 0
+        lotes = obj.lotes.filter(sucursal_id=sucursales.actual_id())
+        return lotes.aggregate(total_stock=Sum('stock_actual'))['total_stock'] or 0
 
     def validate_precio(self, value):
         if value <= 0:
@@ -111,25 +125,99 @@ class ProductoSerializer(serializers.ModelSerializer):
         return value
 
     def create(self, validated_data):
-         lotes_data = validated_data.pop('lotes', [])
-         producto = Producto.objects.create(**validated_data)
-         for lote_data in lotes_data:
-             Lote.objects.create(producto=producto, **lote_data)
-         return producto
+        lotes_data = validated_data.pop('lotes', [])
+        with transaction.atomic():
+            producto = Producto.objects.create(**validated_data)
+            sucursal_id = sucursales.actual_id()
+            Lote.objects.bulk_create([
+                Lote(producto=producto, sucursal_id=sucursal_id, **self._sin_id(lote_data))
+                for lote_data in lotes_data
+            ])
+        return producto
 
     def update(self, instance, validated_data):
         lotes_data = validated_data.pop('lotes', None)
 
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        instance.save()
-
-        if lotes_data is not None:
-             instance.lotes.all().delete()
-             for lote_data in lotes_data:
-                 Lote.objects.create(producto=instance, **lote_data)
-                 
-        return super().update(instance, validated_data)
+        with transaction.atomic():
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
+            instance.save()
+
+            if lotes_data is not None:
+                self._sincronizar_lotes(instance, lotes_data)
+
+        return instance
+
+    @staticmethod
+    def _sin_id(lote_data):
+        return {campo: valor for campo, valor in lote_data.items() if campo != 'id'}
+
+    def _sincronizar_lotes(self, producto, lotes_data):
+        """Aplica ``lotes`` como diferencia sobre los lotes del producto en la sucursal actual.
+
+        Cada lote enviado se empareja por ``id`` o, si no trae, por
+        ``numero_lote``; los emparejados se actualizan (conservan su id), los
+        demás se crean y los existentes que no vinieron se dan de baja
+        (``eliminado``). Son a lo más cuatro consultas sin importar cuántos
+        lotes tenga el producto.
+        """
+        sucursal_id = sucursales.actual_id()
+        existentes = list(producto.lotes.filter(sucursal_id=sucursal_id))
+        por_id = {lote.id: lote for lote in existentes}
+        por_numero = {lote.numero_lote: lote for lote in existentes if lote.numero_lote}
+
+        ahora = timezone.now()
+        nuevos, modificados, campos, conservados = [], [], set(), set()
+        for lote_data in lotes_data:
+            datos = self._sin_id(lote_data)
+            lote_id = lote_data.get('id')
+            if lote_id is not None:
+                lote = por_id.get(lote_id)
+                if lote is None:
+                    raise serializers.ValidationError({
+                        'lotes': f"El lote {lote_id} no pertenece a este producto en esta sucursal."
+                    })
+            else:
+                lote = por_numero.get(datos.get('numero_lote'))
+            if lote is None:
+                nuevos.append(Lote(producto=producto, sucursal_id=sucursal_id, **datos))
+                continue
+            if lote.id in conservados:
+                raise serializers.ValidationError({'lotes': f"El lote {lote.id} viene repetido."})
+            conservados.add(lote.id)
+
+            cambiados = [campo for campo, valor in datos.items() if getattr(lote, campo) != valor]
+            if cambiados:
+                for campo in cambiados:
+                    setattr(lote, campo, datos[campo])
+                # bulk_update no pasa por auto_now y el feed de cambios usa modificado
+                lote.modificado = ahora
+                campos.update(cambiados)
+                modificados.append(lote)
+
+        eliminados = [lote.id for lote in existentes if lote.id not in conservados]
+
+        if modificados:
+            Lote.objects.bulk_update(modificados, [*sorted(campos), 'modificado'])
+        if nuevos:
+            Lote.objects.bulk_create(nuevos)
+        if eliminados:
+            # Baja lógica, como pos.lotes.dar_de_baja: el feed de cambios la replica
+            # por ``modificado`` y depurar_lotes la archiva con su lápida
+            Lote.objects.filter(pk__in=eliminados).update(eliminado=ahora, modificado=ahora)
+
+        if modificados or nuevos or eliminados:
+            # Las operaciones masivas no disparan lote_modificado
+            transaction.on_commit(lambda: (renovar_producto(producto.pk), escaneo.invalidar_producto(producto.pk)))
+            # ni las señales del tablero en vivo (pos.tablero)
+            transaction.on_commit(lambda: self._avisar_tablero(modificados, eliminados, sucursal_id))
+
+    @staticmethod
+    def _avisar_tablero(modificados, eliminados, sucursal_id):
+        for lote in modificados:
+            tablero.lote_modificado(lote)
+        for lote_id in eliminados:
+            tablero.quitar_lote(sucursal_id, lote_id)
 
 
 class AlertaSerializer(serializers.ModelSerializer):
@@ -141,16 +229,26 @@ class ClienteSerializer(serializers.ModelSerializer):
     class Meta:
         model = Cliente
         fields = '__all__'
+        # Métricas mantenidas por las ventas (pos.clientes)
+        read_only_fields = ['visitas', 'ultima_compra', 'gasto_total', 'segmento_rfm']
     
     def validate_rut(self, value):
         if not value:
             raise serializers.ValidationError("El RUT es obligatorio.")
 
         # Validar formato: 7 u 8 dígitos + guion + dígito verificador (número o K)
-        patron = r'^\d{7,8}-[\dkK]$'
+        value = normalizar_rut(value)
+        patron = r'^\d{7,8}-[\dK]$'
         if not re.match(patron, value):
             raise serializers.ValidationError("El RUT debe tener el formato 12345678-5")
-
+        if not rut_valido(value):
+            raise serializers.ValidationError("El dígito verificador del RUT no corresponde.")
+
+        duplicados = Cliente.objects.filter(rut=value)
+        if self.instance is not None:
+            duplicados = duplicados.exclude(pk=self.instance.pk)
+        if duplicados.exists():
+            raise serializers.ValidationError("Ya existe un cliente con este RUT.")
         return value
 
     
@@ -196,16 +294,28 @@ class PagoSerializer(serializers.ModelSerializer):
         if value <= 0:
             raise serializers.ValidationError("El monto del pago debe ser positivo.")
         return value
+
+
+class DetalleVentaAnidadoSerializer(DetalleVentaSerializer):
+    """Detalle dentro de una venta: la venta la pone VentaSerializer.create."""
+
+    class Meta(DetalleVentaSerializer.Meta):
+        read_only_fields = ['venta']
+
+
+class PagoAnidadoSerializer(PagoSerializer):
+    class Meta(PagoSerializer.Meta):
+        read_only_fields = ['venta']
+
         
 class VentaSerializer(serializers.ModelSerializer):
     cliente_rut = serializers.CharField(write_only=True, required=False)
     
     # Relaciones anidadas
-    detalles = DetalleVentaSerializer(many=True) 
-    pagos = PagoSerializer(many=True, required=False)
+    detalles = DetalleVentaAnidadoSerializer(many=True)
+    pagos = PagoAnidadoSerializer(many=True, required=False)
     
-    # Campo calculado para el estado de pago
-    total_pagado = serializers.SerializerMethodField()
+    # Estado de pago: total_pagado es una columna de Venta, no un SUM por fila
     saldo_pendiente = serializers.SerializerMethodField()
     
     class Meta:
@@ -220,25 +330,34 @@ class VentaSerializer(serializers.ModelSerializer):
         
         cliente_rut = serializers.CharField(write_only=True, required=False)
         
-    def get_total_pagado(self, obj):
-         return obj.pagos.aggregate(total=Sum('monto'))['total'] or 0
-     
     def get_saldo_pendiente(self, obj):
-        total_pagado = self.get_total_pagado(obj)
-        return obj.total_con_iva - total_pagado
+        return obj.total_con_iva - obj.total_pagado
+
+    def validate_cliente_rut(self, value):
+        value = normalizar_rut(value)
+        if not rut_valido(value):
+            raise serializers.ValidationError("RUT inválido.")
+        return value
         
     def create(self, validated_data):
+        # ModelSerializer.create no escribe relaciones anidadas: detalles y pagos van aparte
+        detalles = validated_data.pop('detalles')
+        pagos = validated_data.pop('pagos', [])
         rut = validated_data.pop('cliente_rut', None)
-        if rut:
-            cliente, created = Cliente.objects.get_or_create(
-                rut=rut,
-                defaults={
-                    "nombre": None,
-                    "correo": None
-                }
-            )
-            validated_data['cliente'] = cliente
-        return super().create(validated_data)
+        with transaction.atomic():
+            if rut:
+                validated_data['cliente_id'] = clientes.resolver_cliente_id(rut)
+            # total_pagado se fija aquí: bulk_create no pasa por la señal de Pago
+            validated_data['total_pagado'] = sum((p['monto'] for p in pagos), Decimal('0'))
+            venta = super().create(validated_data)
+            DetalleVenta.objects.bulk_create([DetalleVenta(venta=venta, **d) for d in detalles])
+            Pago.objects.bulk_create([Pago(venta=venta, **p) for p in pagos])
+            eventos.publicar_venta(venta, [
+                {'producto_id': d['producto'].pk, 'cantidad': d['cantidad'],
+                 'precio_unitario': d['precio_unitario'], 'descuento_pct': d.get('descuento_pct')}
+                for d in detalles
+            ])
+        return venta
         
     def validate(self, data):
         # total_con_iva = total_sin_iva + total_iva - descuento
@@ -0,0 +1,106 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from . import autenticacion, clientes, escaneo, tablero
+from .cache import renovar_listados, renovar_producto
+from .models import Categoria, Cliente, EliminacionCatalogo, Empleado, Lote, Nutricional, Pago, Producto, Venta
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Producto)
+@receiver(post_delete, sender=Producto)
+def producto_modificado(sender, instance, **kwargs):
+    renovar_producto(instance.pk)
+    escaneo.invalidar_producto(instance.pk, instance.codigo_barra)
+
+
+@receiver(post_save, sender=Lote)
+@receiver(post_delete, sender=Lote)
+def lote_modificado(sender, instance, **kwargs):
+    # El stock visible en la tarjeta sale de los lotes del producto
+    renovar_producto(instance.producto_id)
+    escaneo.invalidar_producto(instance.producto_id)
+
+
+@receiver(post_save, sender=Lote)
+def lote_stock_tablero(sender, instance, **kwargs):
+    # El tablero en vivo lista los lotes con stock bajo (pos.tablero)
+    transaction.on_commit(lambda: tablero.lote_modificado(instance))
+
+
+@receiver(post_delete, sender=Lote)
+def lote_borrado_tablero(sender, instance, **kwargs):
+    sucursal_id, lote_id = instance.sucursal_id, instance.pk
+    transaction.on_commit(lambda: tablero.quitar_lote(sucursal_id, lote_id))
+
+
+@receiver(post_save, sender=Categoria)
+@receiver(post_delete, sender=Categoria)
+@receiver(post_save, sender=Nutricional)
+@receiver(post_delete, sender=Nutricional)
+def listado_modificado(sender, instance, **kwargs):
+    # Salen en los listados de la API, pero no en la tarjeta ni en el escaneo
+    renovar_listados()
+
+
+@receiver(post_delete, sender=Categoria)
+@receiver(post_delete, sender=Producto)
+@receiver(post_delete, sender=Lote)
+def registrar_eliminacion(sender, instance, **kwargs):
+    # Las terminales replican las eliminaciones a través del feed de cambios
+    EliminacionCatalogo.objects.create(modelo=sender._meta.model_name, objeto_id=instance.pk)
+
+
+@receiver(post_save, sender=Cliente)
+@receiver(post_delete, sender=Cliente)
+def cliente_modificado(sender, instance, created=False, **kwargs):
+    # Un cliente nuevo no puede estar cacheado; editar o borrar uno puede cambiar su RUT
+    if not created:
+        clientes.invalidar()
+
+
+@receiver(post_save, sender=Pago)
+@receiver(post_delete, sender=Pago)
+def pago_modificado(sender, instance, **kwargs):
+    # checkout inserta con bulk_create (sin señales) y fija total_pagado él mismo
+    Venta.recalcular_total_pagado(instance.venta_id)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def usuario_modificado(sender, instance, **kwargs):
+    autenticacion.invalidar(instance.pk)
+
+
+@receiver(post_save, sender=Empleado)
+@receiver(post_delete, sender=Empleado)
+def empleado_modificado(sender, instance, **kwargs):
+    autenticacion.invalidar(instance.usuario_id)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def permisos_usuario_modificados(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action.startswith('post_'):
+            autenticacion.invalidar(instance.pk)
+    elif action == 'pre_clear':
+        # desde el grupo o el permiso: después de clear ya no se sabe qué usuarios tenía
+        autenticacion.invalidar(*instance.user_set.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        autenticacion.invalidar(*pk_set)
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+def permisos_grupo_modificados(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        grupos = list(instance.group_set.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove') or (action == 'post_clear' and not reverse):
+        grupos = pk_set if reverse else [instance.pk]
+    else:
+        return
+    autenticacion.invalidar(*User.objects.filter(groups__in=grupos).values_list('pk', flat=True).distinct())
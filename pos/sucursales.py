@@ -0,0 +1,163 @@
+"""Sucursal de la petición en curso, alcance por sucursal y ruteo de base de datos.
+
+``SucursalMiddleware`` (forneria.middleware) fija la sucursal de cada petición
+desde la cabecera ``X-Sucursal`` o la cookie ``sucursal`` (su código); sin
+ninguna de las dos se usa ``POS_SUCURSAL_PREDETERMINADA``. El valor vive en un
+ContextVar, así que lo leen igual las vistas, los modelos y el router. Los
+usuarios que no son staff solo pueden elegir la sucursal de su empleado
+(``permitida``, que aplican el middleware y el permiso ``SucursalAsignada``).
+
+``RouterSucursales`` permite mover una sucursal grande a su propia base: si
+``POS_SUCURSALES_BD`` asigna un alias a su código, las tablas particionadas
+(lotes, ventas y lo que cuelga de ellas, movimientos y cajas) se leen y
+escriben allí. Esa base debe tener el mismo esquema y una copia del catálogo.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DatabaseError
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import BasePermission
+
+from .cache import LRUCache
+
+_actual = ContextVar('pos_sucursal', default=None)
+_ids = LRUCache(maxsize=1024, ttl=getattr(settings, 'POS_SUCURSALES_CACHE_SEGUNDOS', 300))
+# Último id leído de cada código, sin expiración: se usa solo si la base no responde
+_conocidos = {}
+
+# Modelos que se rutean con su sucursal (los hijos de Venta van con ella)
+MODELOS_POR_SUCURSAL = {'lote', 'lotearchivado', 'venta', 'detalleventa', 'pago', 'movimientoinventario', 'sesioncaja'}
+
+
+def predeterminada():
+    return getattr(settings, 'POS_SUCURSAL_PREDETERMINADA', 'principal')
+
+
+def id_por_codigo(codigo):
+    """Id de la sucursal ``codigo`` (cacheado en el proceso); None si no existe.
+
+    Si la base falla al refrescar el cache se devuelve el último id conocido;
+    sin uno, se propaga el ``DatabaseError``.
+    """
+    from .models import Sucursal
+
+    sucursal_id = _ids.get(codigo)
+    if sucursal_id is None:
+        try:
+            sucursal_id = Sucursal.objects.filter(codigo=codigo).values_list('id', flat=True).first()
+            if sucursal_id is None and codigo == predeterminada():
+                sucursal_id = Sucursal.objects.get_or_create(codigo=codigo, defaults={'nombre': codigo.title()})[0].id
+        except DatabaseError:
+            if codigo not in _conocidos:
+                raise
+            return _conocidos[codigo]
+        if sucursal_id is not None:
+            _ids.set(codigo, sucursal_id)
+            _conocidos[codigo] = sucursal_id
+    return sucursal_id
+
+
+def predeterminada_id():
+    return id_por_codigo(predeterminada())
+
+
+def actual():
+    """Código de la sucursal de la petición en curso."""
+    return _actual.get() or predeterminada()
+
+
+def actual_id():
+    return id_por_codigo(actual())
+
+
+@contextmanager
+def usar(codigo):
+    """Ejecuta el bloque como si la petición fuera de la sucursal ``codigo``."""
+    token = _actual.set(codigo)
+    try:
+        yield
+    finally:
+        _actual.reset(token)
+
+
+def permitida(user, sucursal_id):
+    """True si ``user`` puede operar en la sucursal ``sucursal_id``.
+
+    Un usuario autenticado que no es staff solo opera en la sucursal de su
+    empleado (o en la predeterminada si no tiene una asignada). El empleado
+    viene precargado con el usuario (pos.autenticacion): no hay consultas.
+    """
+    if user is None or not user.is_authenticated or user.is_staff:
+        return True
+    empleado = getattr(user, 'empleado', None)
+    asignada = empleado.sucursal_id if empleado is not None else None
+    return sucursal_id == (asignada or predeterminada_id())
+
+
+class SucursalAsignada(BasePermission):
+    """Permiso de DRF con ``permitida``: cubre también a los usuarios con JWT,
+    que se autentican en la vista, después de ``SucursalMiddleware``."""
+
+    message = 'El usuario no está asignado a esta sucursal.'
+
+    def has_permission(self, request, view):
+        return permitida(request.user, actual_id())
+
+
+def invalidar():
+    _ids.clear()
+    _conocidos.clear()
+
+
+class PorSucursalMixin:
+    """Para ViewSets de modelos con sucursal: lista y crea en la sucursal actual.
+
+    ``campo_sucursal`` es la ruta hasta el id de la sucursal. Los modelos que la
+    heredan de su padre (``'venta__sucursal_id'``) no la guardan: se exige que el
+    padre sea de la sucursal actual.
+    """
+    campo_sucursal = 'sucursal_id'
+
+    def get_queryset(self):
+        return super().get_queryset().filter(**{self.campo_sucursal: actual_id()})
+
+    def _validar_padre(self, serializer):
+        padre = serializer.validated_data.get(self.campo_sucursal.partition('__')[0])
+        if padre is not None and padre.sucursal_id != actual_id():
+            raise ValidationError('Pertenece a otra sucursal')
+
+    def perform_create(self, serializer):
+        if '__' not in self.campo_sucursal:
+            serializer.save(**{self.campo_sucursal: actual_id()})
+            return
+        self._validar_padre(serializer)
+        serializer.save()
+
+    def perform_update(self, serializer):
+        if '__' in self.campo_sucursal:
+            self._validar_padre(serializer)
+        serializer.save()
+
+
+class RouterSucursales:
+    """Envía las tablas particionadas a la base de la sucursal, si tiene una propia."""
+
+    def _alias(self, model):
+        if model._meta.app_label != 'pos' or model._meta.model_name not in MODELOS_POR_SUCURSAL:
+            return None
+        bases = getattr(settings, 'POS_SUCURSALES_BD', None)
+        return bases.get(actual()) if bases else None
+
+    def db_for_read(self, model, **hints):
+        return self._alias(model)
+
+    def db_for_write(self, model, **hints):
+        return self._alias(model)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Producto, Cliente y Empleado se replican en la base de cada sucursal
+        if obj1._meta.app_label == 'pos' and obj2._meta.app_label == 'pos':
+            return True
+        return None
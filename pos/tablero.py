@@ -0,0 +1,217 @@
+"""Tablero de ventas en vivo, servido por Server-Sent Events.
+
+Cada proceso lleva en memoria, por sucursal, los totales del día: cantidad de
+ventas y monto por ``canal_venta``, productos más vendidos y lotes con stock
+bajo. El checkout los actualiza al confirmar cada venta (``registrar_venta``)
+y la señal de ``Lote`` al cambiar un stock (``lote_modificado``): unas sumas
+en diccionarios y un contador de versión, sin consultas.
+
+Los tableros conectados no dependen de las ventas: cada uno revisa la versión
+una vez por ``POS_TABLERO_INTERVALO`` segundos y, si cambió, envía la foto ya
+serializada, que se arma una sola vez por versión para todos. Con cientos de
+tableros abiertos una venta sigue costando lo mismo.
+
+La primera foto del día de una sucursal sale de la base (``sembrar``); desde
+ahí el proceso solo suma las ventas que él mismo confirma. Con varios procesos
+ASGI cada tablero ve la semilla más las ventas de su proceso: para totales
+exactos, el checkout y los tableros deben atenderse en el mismo proceso.
+"""
+import heapq
+import threading
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Max, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from forneria.renderers import JSONRapidoRenderer
+from .models import DetalleVenta, Lote, Venta
+
+_lock = threading.Lock()
+_sembrando = threading.Lock()
+_dias = {}        # sucursal_id -> _Dia
+_versiones = {}   # sucursal_id -> int, cambia con cada venta o lote registrado
+_fotos = {}       # sucursal_id -> (version, bytes)
+_renderer = JSONRapidoRenderer()
+
+
+def _config(nombre, defecto):
+    return getattr(settings, nombre, defecto)
+
+
+class _Dia:
+    """Totales de un día en una sucursal."""
+
+    def __init__(self, fecha, hasta_id):
+        self.fecha = fecha
+        # ventas con id <= hasta_id ya vienen contadas en la semilla
+        self.hasta_id = hasta_id
+        self.por_canal = {}    # canal -> [ventas, monto]
+        self.productos = {}    # producto_id -> [nombre, unidades, monto]
+        self.stock_bajo = {}   # lote_id -> dict del lote
+
+
+def _umbral(stock_minimo):
+    return stock_minimo if stock_minimo is not None else _config('POS_TABLERO_STOCK_BAJO', 5)
+
+
+def _en_stock_bajo(stock_actual, stock_minimo):
+    # Los lotes agotados no se listan: sin stock es asunto de las alertas del producto
+    return 0 < (stock_actual or 0) <= _umbral(stock_minimo)
+
+
+def _renovar(sucursal_id):
+    _versiones[sucursal_id] = _versiones.get(sucursal_id, 0) + 1
+
+
+def version(sucursal_id):
+    return _versiones.get(sucursal_id, 0)
+
+
+def necesita_semilla(sucursal_id):
+    dia = _dias.get(sucursal_id)
+    return dia is None or dia.fecha != timezone.localdate()
+
+
+def sembrar(sucursal_id):
+    """Carga desde la base los totales de hoy de la sucursal (una vez por día y proceso)."""
+    with _sembrando:
+        # Cientos de tableros piden la semilla a la vez al cambiar el día: la calcula uno
+        if necesita_semilla(sucursal_id):
+            _sembrar(sucursal_id)
+
+
+def _sembrar(sucursal_id):
+    fecha = timezone.localdate()
+    inicio = timezone.make_aware(datetime.combine(fecha, time.min))
+    ventas = Venta.objects.filter(sucursal_id=sucursal_id, fecha__gte=inicio, fecha__lt=inicio + timedelta(days=1))
+    hasta_id = ventas.aggregate(m=Max('id'))['m'] or 0
+    ventas = ventas.filter(id__lte=hasta_id)
+
+    dia = _Dia(fecha, hasta_id)
+    for fila in ventas.values('canal_venta').annotate(n=Count('id'), monto=Sum('total_con_iva')):
+        dia.por_canal[fila['canal_venta']] = [fila['n'], fila['monto'] or Decimal('0')]
+
+    neto = ExpressionWrapper(
+        F('cantidad') * F('precio_unitario') * (Value(100) - Coalesce(F('descuento_pct'), Value(0))) / Value(100),
+        output_field=DecimalField(max_digits=14, decimal_places=2),
+    )
+    productos = (
+        DetalleVenta.objects.filter(venta__in=ventas)
+        .values('producto_id', 'producto__nombre')
+        .annotate(unidades=Sum('cantidad'), monto=Sum(neto))
+    )
+    for fila in productos:
+        dia.productos[fila['producto_id']] = [fila['producto__nombre'], fila['unidades'], Decimal(fila['monto'] or 0)]
+
+    bajos = Lote.objects.filter(sucursal_id=sucursal_id, eliminado__isnull=True, stock_actual__gt=0).filter(
+        Q(stock_minimo__isnull=False, stock_actual__lte=F('stock_minimo'))
+        | Q(stock_minimo__isnull=True, stock_actual__lte=_umbral(None))
+    )
+    for lote in bajos.values('id', 'numero_lote', 'producto__nombre', 'stock_actual', 'stock_minimo', 'fecha_caducidad'):
+        dia.stock_bajo[lote['id']] = _lote(lote['id'], lote['numero_lote'], lote['producto__nombre'],
+                                           lote['stock_actual'], lote['stock_minimo'], lote['fecha_caducidad'])
+
+    with _lock:
+        _dias[sucursal_id] = dia
+        _renovar(sucursal_id)
+
+
+def _lote(lote_id, numero_lote, producto, stock_actual, stock_minimo, fecha_caducidad):
+    return {
+        'id': lote_id, 'numero_lote': numero_lote, 'producto': producto, 'stock_actual': stock_actual,
+        'stock_minimo': stock_minimo, 'fecha_caducidad': fecha_caducidad,
+    }
+
+
+def registrar_venta(venta, detalles, nombres):
+    """Suma una venta confirmada; llamar con ``transaction.on_commit``.
+
+    ``detalles`` son los dicts del checkout (producto_id, cantidad,
+    precio_unitario, descuento_pct) y ``nombres`` el {producto_id: nombre}.
+    """
+    with _lock:
+        dia = _dias.get(venta.sucursal_id)
+        if dia is None or venta.id <= dia.hasta_id:
+            return  # nadie mira esta sucursal en el proceso, o la semilla ya la contó
+        if dia.fecha != timezone.localdate(venta.fecha):
+            del _dias[venta.sucursal_id]  # cambió el día: el próximo tablero siembra de nuevo
+            _renovar(venta.sucursal_id)
+            return
+        canal = dia.por_canal.setdefault(venta.canal_venta, [0, Decimal('0')])
+        canal[0] += 1
+        canal[1] += Decimal(str(venta.total_con_iva))
+        for d in detalles:
+            monto = d['precio_unitario'] * d['cantidad'] * (1 - Decimal(d.get('descuento_pct') or 0) / 100)
+            producto = dia.productos.setdefault(d['producto_id'], [nombres.get(d['producto_id'], ''), 0, Decimal('0')])
+            producto[1] += d['cantidad']
+            producto[2] += monto
+        _renovar(venta.sucursal_id)
+
+
+def lote_modificado(lote):
+    """Actualiza la lista de stock bajo con un lote recién guardado; llamar con ``on_commit``."""
+    dia = _dias.get(lote.sucursal_id)
+    if dia is None:
+        return
+    bajo = lote.eliminado is None and _en_stock_bajo(lote.stock_actual, lote.stock_minimo)
+    anterior = dia.stock_bajo.get(lote.pk)
+    # El nombre solo se lee al entrar a la lista (en el checkout el producto ya viene con el lote)
+    nombre = anterior['producto'] if anterior else lote.producto.nombre if bajo else None
+    with _lock:
+        if bajo:
+            dia.stock_bajo[lote.pk] = _lote(lote.pk, lote.numero_lote, nombre, lote.stock_actual,
+                                            lote.stock_minimo, lote.fecha_caducidad)
+        elif dia.stock_bajo.pop(lote.pk, None) is None:
+            return
+        _renovar(lote.sucursal_id)
+
+
+def quitar_lote(sucursal_id, lote_id):
+    """Saca de la lista de stock bajo un lote borrado."""
+    with _lock:
+        dia = _dias.get(sucursal_id)
+        if dia is not None and dia.stock_bajo.pop(lote_id, None) is not None:
+            _renovar(sucursal_id)
+
+
+def foto(sucursal_id):
+    """(versión, JSON en bytes) de los totales de la sucursal; se serializa una vez por versión."""
+    with _lock:
+        actual = _versiones.get(sucursal_id, 0)
+        guardada = _fotos.get(sucursal_id)
+        if guardada is not None and guardada[0] == actual:
+            return guardada
+        dia = _dias.get(sucursal_id)
+        datos = _datos(dia) if dia is not None else {}
+        _fotos[sucursal_id] = (actual, _renderer.render(datos))
+        return _fotos[sucursal_id]
+
+
+def _pesos(monto):
+    return str(monto.quantize(Decimal('0.01')))
+
+
+def _datos(dia):
+    top = heapq.nlargest(_config('POS_TABLERO_TOP', 10), dia.productos.items(), key=lambda p: (p[1][2], p[1][1]))
+    bajos = sorted(dia.stock_bajo.values(), key=lambda l: (l['stock_actual'], l['id']))
+    return {
+        'fecha': dia.fecha,
+        'ventas': sum(n for n, _ in dia.por_canal.values()),
+        'monto': _pesos(sum((m for _, m in dia.por_canal.values()), Decimal('0'))),
+        'por_canal': {canal: {'ventas': n, 'monto': _pesos(m)} for canal, (n, m) in sorted(dia.por_canal.items())},
+        'top_productos': [
+            {'producto_id': pid, 'nombre': nombre, 'unidades': unidades, 'monto': _pesos(monto)}
+            for pid, (nombre, unidades, monto) in top
+        ],
+        'stock_bajo': bajos[:_config('POS_TABLERO_MAX_LOTES', 20)],
+    }
+
+
+def limpiar():
+    with _lock:
+        _dias.clear()
+        _versiones.clear()
+        _fotos.clear()
@@ -1,3 +1,1333 @@
-from django.test import TestCase
+import base64
+import gzip
+import json
+import shutil
+import tempfile
+import threading
+import time as reloj
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.contrib.auth.models import Group, Permission, User
+from django.core.cache import cache
+from django.db import OperationalError, connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
+from django.utils import timezone
+from forneria import middleware
+
+from . import admin as pos_admin
+from . import (
+    analitica, autenticacion, boleta, caja, catalogo, clientes, escaneo, eventos, lotes, perfilado, precios, pronostico,
+    reportes, sucursales, tablero, views, vuelo_unico,
+)
+from .models import (
+    Alerta, Categoria, Cliente, DetalleVenta, EliminacionCatalogo, Empleado, EventoSalida, HistorialPrecio, Lote,
+    LoteArchivado, MovimientoInventario, Pago, PerfilPeticion, Producto, ResumenVentaDiaria, SesionCaja, Sucursal,
+    TrabajoReporte, Turno, Venta,
+)
+from .serializer import VentaSerializer
+
+
+def simular_caida(execute, sql, params, many, context):
+    raise OperationalError("(2003, \"Can't connect to MySQL server\")")
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class InicioSinBaseDeDatosTests(TestCase):
+
+    def setUp(self):
+        catalogo.snapshot.guardar([], [])
+        categoria = Categoria.objects.create(nombre='Panes')
+        Producto.objects.create(nombre='Marraqueta', precio=150, categoria=categoria, codigo_barra='7800001')
+        Producto.objects.create(nombre='Hallulla', precio=120, categoria=categoria, codigo_barra='7800002')
+
+    def test_vista_no_importa_requests(self):
+        self.assertFalse(hasattr(views, 'requests'))
+
+    def test_caida_de_base_de_datos_sirve_snapshot(self):
+        # Una vista sin filtros deja el catálogo completo como snapshot
+        self.client.get(reverse('inicio'))
+
+        with mock.patch.object(catalogo.snapshot, 'refrescar_en_segundo_plano') as refrescar, \
+                connection.execute_wrapper(simular_caida), \
+                self.assertLogs('pos.views', 'WARNING'):
+            response = self.client.get(reverse('inicio'), {'buscar': 'marra'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Marraqueta')
+        self.assertNotContains(response, 'Hallulla')
+        self.assertContains(response, 'último catálogo disponible')
+        refrescar.assert_called_once()
+
+    def test_caida_con_sucursal_elegida_sirve_snapshot(self):
+        Sucursal.objects.create(codigo='norte', nombre='Norte')
+        sucursales.invalidar()
+        self.client.cookies['sucursal'] = 'norte'
+        self.client.get(reverse('inicio'))
+        sucursales._ids.clear()  # expiró la entrada del LRU
+
+        for olvidar in (False, True):
+            if olvidar:
+                sucursales.invalidar()  # proceso que nunca vio el código
+            with mock.patch.object(catalogo.snapshot, 'refrescar_en_segundo_plano'), \
+                    connection.execute_wrapper(simular_caida), \
+                    self.assertLogs('pos.views', 'WARNING'):
+                response = self.client.get(reverse('inicio'), HTTP_X_SUCURSAL='norte')
+            self.assertEqual(response.status_code, 200)
+            self.assertContains(response, 'Marraqueta')
+
+    def test_caida_sin_snapshot_muestra_catalogo_vacio(self):
+        with mock.patch.object(catalogo.snapshot, 'refrescar_en_segundo_plano'), \
+                connection.execute_wrapper(simular_caida), \
+                self.assertLogs('pos.views', 'WARNING'):
+            response = self.client.get(reverse('inicio'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'Marraqueta')
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class TarjetasCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        categoria = Categoria.objects.create(nombre='Panes')
+        self.pan = Producto.objects.create(nombre='Marraqueta', precio=1000, categoria=categoria)
+        self.lote = Lote.objects.create(producto=self.pan, fecha_caducidad=date.today() + timedelta(days=3),
+                                        stock_actual=5)
+
+    def test_tarjeta_cacheada_hasta_que_cambia_precio_o_stock(self):
+        self.assertContains(self.client.get(reverse('inicio')), 'Marraqueta')
+
+        # update() no dispara señales: la versión sigue igual y la tarjeta sale del cache
+        Producto.objects.filter(pk=self.pan.pk).update(nombre='Hallulla')
+        response = self.client.get(reverse('inicio'))
+        self.assertContains(response, '<h2>Marraqueta</h2>', html=True)
+        self.assertNotContains(response, 'Hallulla')
+
+        self.pan.refresh_from_db()
+        self.pan.precio = 1500
+        self.pan.save()
+        response = self.client.get(reverse('inicio'))
+        self.assertContains(response, '<h2>Hallulla</h2>', html=True)
+        self.assertContains(response, 'data-precio="1500"')
+
+        self.lote.stock_actual = 12
+        self.lote.save()
+        self.assertContains(self.client.get(reverse('inicio')), '<strong>12</strong>', html=True)
+
+
+class PronosticoTests(TestCase):
+
+    def test_pronostico_por_dia_de_la_semana(self):
+        desde = date(2026, 1, 5)  # lunes
+        # 4 semanas: los lunes se venden 10, 12, 14, 16; el resto de los días 1
+        matriz = np.ones((1, 28))
+        matriz[0, [0, 7, 14, 21]] = [10, 12, 14, 16]
+
+        pronostico_lunes, seguridad = pronostico.pronosticar(matriz, desde, date(2026, 2, 2), semanas=4, z=1)
+        self.assertAlmostEqual(pronostico_lunes[0], 13.0)
+        self.assertAlmostEqual(seguridad[0], np.std([10, 12, 14, 16], ddof=1))
+
+        pronostico_martes, seguridad = pronostico.pronosticar(matriz, desde, date(2026, 2, 3), semanas=4)
+        self.assertAlmostEqual(pronostico_martes[0], 1.0)
+        self.assertAlmostEqual(seguridad[0], 0.0)
+
+    @override_settings(ALLOWED_HOSTS=['testserver'])
+    def test_plan_descuenta_stock_disponible(self):
+        categoria = Categoria.objects.create(nombre='Panes')
+        pan = Producto.objects.create(nombre='Marraqueta', precio=150, categoria=categoria)
+        fecha = date(2026, 2, 2)
+        for semana in range(1, 5):
+            venta = Venta.objects.create(
+                fecha=timezone.make_aware(datetime.combine(fecha - timedelta(weeks=semana), time(9))),
+                total_sin_iva=0, total_iva=0, descuento=0, total_con_iva=0, canal_venta='presencial',
+            )
+            DetalleVenta.objects.create(venta=venta, producto=pan, cantidad=20, precio_unitario=150)
+        Lote.objects.create(producto=pan, fecha_caducidad=fecha, stock_actual=5)
+
+        response = self.client.get(reverse('plan-produccion'), {'fecha': fecha.isoformat(), 'semanas': 4})
+
+        self.assertEqual(response.status_code, 200)
+        [plan] = response.json()['productos']
+        self.assertEqual(plan['pronostico'], 20.0)
+        self.assertEqual(plan['stock_disponible'], 5)
+        self.assertEqual(plan['producir'], 15)
+
+        for z in ('nan', 'inf', '-5', 'alto'):
+            response = self.client.get(reverse('plan-produccion'), {'fecha': fecha.isoformat(), 'z': z})
+            self.assertEqual(response.status_code, 400, z)
+
+
+class AnaliticaPersonalTests(TestCase):
+
+    def crear_empleado(self, n):
+        usuario = User.objects.create_user(f'cajero{n}')
+        return Empleado.objects.create(
+            nombres=f'Cajero{n}', apellido_paterno='Prueba', run=f'{n}-9', correo=f'c{n}@forneria.cl',
+            fono=n, clave='x', direccion='-', cargo='cajero', usuario=usuario,
+        )
+
+    def vender(self, empleado, fecha, hora, total, cantidad):
+        venta = Venta.objects.create(
+            fecha=timezone.make_aware(datetime.combine(fecha, hora)), empleado=empleado,
+            total_sin_iva=0, total_iva=0, descuento=0, total_con_iva=total, canal_venta='presencial',
+        )
+        DetalleVenta.objects.create(venta=venta, producto=self.pan, cantidad=cantidad, precio_unitario=100)
+
+    def test_ventas_por_hora_trabajada(self):
+        self.pan = Producto.objects.create(nombre='Marraqueta', precio=100, categoria=Categoria.objects.create(nombre='Panes'))
+        dia = date(2026, 3, 2)
+        ana, beto = self.crear_empleado(1), self.crear_empleado(2)
+        Turno.objects.create(empleado=ana, fecha=dia, hora_entrada=time(8), hora_salida=time(12))
+        Turno.objects.create(empleado=beto, fecha=dia, hora_entrada=time(10), hora_salida=time(12))
+        self.vender(ana, dia, time(9, 30), 4000, 4)
+        self.vender(ana, dia, time(10, 30), 2000, 2)
+        self.vender(beto, dia, time(11), 1000, 1)
+        self.vender(beto, dia, time(13), 500, 1)  # fuera de turno
+
+        with self.assertNumQueries(3):
+            resultado = analitica.productividad_personal(dia, dia + timedelta(days=1))
+
+        empleados = {e['empleado_id']: e for e in resultado['por_empleado']}
+        self.assertEqual(empleados[ana.id]['horas_trabajadas'], 4)
+        self.assertEqual(empleados[ana.id]['ventas_por_hora'], 1500)
+        self.assertEqual(empleados[beto.id]['ventas_fuera_de_turno'], 1)
+        self.assertEqual(empleados[beto.id]['unidades_por_hora'], 1)
+
+        hora_10 = resultado['por_hora'][10]
+        self.assertEqual((hora_10['horas_trabajadas'], hora_10['tickets']), (2, 1))
+
+        dotacion = {d['personas']: d for d in resultado['por_dotacion']}
+        self.assertEqual(dotacion[1]['horas_trabajadas'], 2)
+        self.assertEqual(dotacion[1]['ventas'], 4000)
+        self.assertEqual(dotacion[2]['horas_trabajadas'], 4)
+        self.assertEqual(dotacion[2]['tickets'], 2)
+        self.assertEqual(dotacion[0]['tickets'], 1)
+
+    def test_ventas_identicas_cuentan_por_separado(self):
+        self.pan = Producto.objects.create(nombre='Marraqueta', precio=100, categoria=Categoria.objects.create(nombre='Panes'))
+        dia = date(2026, 3, 2)
+        ana = self.crear_empleado(1)
+        Turno.objects.create(empleado=ana, fecha=dia, hora_entrada=time(8), hora_salida=time(12))
+        self.vender(ana, dia, time(9), 1000, 1)
+        self.vender(ana, dia, time(9), 1000, 1)
+
+        [fila] = analitica.productividad_personal(dia, dia + timedelta(days=1))['por_empleado']
+        self.assertEqual((fila['tickets'], fila['unidades']), (2, 2))
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class ClientesTests(TestCase):
+
+    def setUp(self):
+        clientes.invalidar()
+        categoria = Categoria.objects.create(nombre='Panes')
+        self.pan = Producto.objects.create(nombre='Marraqueta', precio=1000, categoria=categoria)
+        Lote.objects.create(producto=self.pan, fecha_caducidad=date.today() + timedelta(days=3), stock_actual=50)
+
+    def comprar(self, rut):
+        response = self.client.post(reverse('checkout'), {
+            'cliente_rut': rut,
+            'items': [{'producto_id': self.pan.id, 'cantidad': 1, 'precio_unitario': 1000}],
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 201, response.content)
+
+    def test_rut_normalizado_en_el_modelo(self):
+        cliente = Cliente.objects.create(rut='12.345.678-k')
+        self.assertEqual(cliente.rut, '12345678-K')
+
+    def test_checkout_acumula_metricas_en_un_solo_cliente(self):
+        self.comprar('10000013-k')
+        self.comprar('10.000.013-K')
+        eventos.procesar_lote()
+
+        cliente = Cliente.objects.get()
+        self.assertEqual(cliente.rut, '10000013-K')
+        self.assertEqual(cliente.visitas, 2)
+        self.assertEqual(cliente.gasto_total, 2 * 1190)
+        self.assertEqual(cliente.segmento_rfm, 'nuevo')
+        self.assertIsNotNone(cliente.ultima_compra)
+
+        response = self.client.get(reverse('cliente-por-rut', args=['10000013k']))
+        self.assertEqual(response.json()['visitas'], 2)
+
+    def test_rut_invalido_no_crea_clientes(self):
+        for rut in ('', '   ', 'abc', '12.345.678-K', '123-4'):
+            response = self.client.post(reverse('checkout'), {
+                'cliente_rut': rut,
+                'items': [{'producto_id': self.pan.id, 'cantidad': 1, 'precio_unitario': 1000}],
+            }, content_type='application/json')
+            self.assertEqual(response.status_code, 400 if rut else 201, rut)
+        self.assertFalse(Cliente.objects.exists())
+        self.assertEqual(Venta.objects.count(), 1)
+        with self.assertRaises(ValueError):
+            clientes.resolver_cliente_id('12345678-0')
+
+    def test_rut_cacheado_no_consulta_clientes(self):
+        cliente_id = Cliente.objects.create(rut='11111111-1').id
+        self.assertEqual(clientes.resolver_cliente_id('11111111-1'), cliente_id)
+        with self.assertNumQueries(0):
+            self.assertEqual(clientes.resolver_cliente_id('11.111.111-1'), cliente_id)
+
+    def test_segmentar_por_quintiles(self):
+        ahora = timezone.now()
+        for i in range(10):
+            Cliente.objects.create(
+                rut=f'1000000{i}-1', visitas=i + 1, gasto_total=(i + 1) * 1000,
+                ultima_compra=ahora - timedelta(days=10 - i),
+            )
+        segmentos = clientes.segmentar(ahora)
+
+        self.assertEqual(sum(segmentos.values()), 10)
+        self.assertEqual(Cliente.objects.get(rut='10000009-1').segmento_rfm, 'campeon')
+        self.assertEqual(Cliente.objects.get(rut='10000000-1').segmento_rfm, 'perdido')
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class PagosTests(TestCase):
+
+    def setUp(self):
+        categoria = Categoria.objects.create(nombre='Panes')
+        self.pan = Producto.objects.create(nombre='Marraqueta', precio=1000, categoria=categoria)
+        Lote.objects.create(producto=self.pan, fecha_caducidad=date.today() + timedelta(days=3), stock_actual=50)
+
+    def pagar(self, **pago):
+        datos = {'items': [{'producto_id': self.pan.id, 'cantidad': 10, 'precio_unitario': 1000}]}  # 11.900
+        datos.update(pago)
+        return self.client.post(reverse('checkout'), datos, content_type='application/json')
+
+    def test_pago_dividido_con_vuelto_en_efectivo(self):
+        response = self.pagar(pagos=[
+            {'metodo': 'DEB', 'monto': 5000, 'referencia': '998877'},
+            {'metodo': 'EFE', 'monto': 10000},
+        ])
+
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.json()['vuelto'], '3100.00')
+        venta = Venta.objects.get()
+        self.assertEqual(venta.total_pagado, venta.monto_pagado - venta.vuelto)
+        self.assertEqual(
+            sorted(venta.pagos.values_list('metodo', 'monto', 'referencia')),
+            [('DEB', 5000, '998877'), ('EFE', 6900, None)],
+        )
+
+    def test_tarjeta_no_puede_dar_vuelto(self):
+        response = self.pagar(pagos=[{'metodo': 'CRE', 'monto': 20000}])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Venta.objects.exists())
+
+    def test_pago_insuficiente(self):
+        response = self.pagar(monto_pagado=1000)
+        self.assertEqual(response.status_code, 400)
+
+    def test_pagos_mal_formados(self):
+        for pagos in ([{'metodo': 'EFE', 'monto': 'abc'}], [{'metodo': 'EFE', 'monto': 'NaN'}],
+                      [{'metodo': 'EFE', 'monto': None}], ['EFE'], 5, True, {'metodo': 'EFE'}):
+            response = self.pagar(pagos=pagos)
+            self.assertEqual(response.status_code, 400, pagos)
+        self.assertFalse(Venta.objects.exists())
+
+    def test_total_pagado_se_mantiene_al_editar_pagos(self):
+        self.assertEqual(self.pagar(monto_pagado=11900).status_code, 201)
+        venta = Venta.objects.get()
+        pago = Pago.objects.create(venta=venta, monto=100, metodo='EFE')
+        venta.refresh_from_db()
+        self.assertEqual(venta.total_pagado, 12000)
+
+        pago.delete()
+        venta.refresh_from_db()
+        self.assertEqual(venta.total_pagado, 11900)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(VentaSerializer().get_saldo_pendiente(venta), 0)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class OutboxTests(TestCase):
+
+    def setUp(self):
+        categoria = Categoria.objects.create(nombre='Panes')
+        self.pan = Producto.objects.create(nombre='Marraqueta', precio=1000, categoria=categoria)
+        Lote.objects.create(producto=self.pan, fecha_caducidad=date.today() + timedelta(days=3),
+                            stock_actual=5, stock_minimo=3)
+
+    def vender(self, cantidad):
+        response = self.client.post(reverse('checkout'), {
+            'items': [{'producto_id': self.pan.id, 'cantidad': cantidad, 'precio_unitario': 1000}],
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 201, response.content)
+
+    def test_checkout_solo_publica_el_evento(self):
+        self.vender(1)
+        evento = EventoSalida.objects.get()
+        self.assertEqual(evento.tipo, 'venta_registrada')
+        self.assertIsNone(evento.procesado)
+        self.assertFalse(ResumenVentaDiaria.objects.exists())
+
+    def test_api_de_ventas_crea_detalles_y_publica_el_evento(self):
+        response = self.client.post('/pos/ventas/', {
+            'fecha': timezone.now().isoformat(), 'canal_venta': 'presencial', 'cliente_rut': '12.345.678-5',
+            'total_sin_iva': '2000', 'total_iva': '380', 'descuento': '0', 'total_con_iva': '2380',
+            'detalles': [{'producto': self.pan.id, 'cantidad': 2, 'precio_unitario': '1000'}],
+            'pagos': [{'metodo': 'EFE', 'monto': '2380'}],
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 201, response.content)
+
+        venta = Venta.objects.get()
+        self.assertEqual(venta.cliente.rut, '12345678-5')
+        self.assertEqual((venta.total_pagado, response.json()['saldo_pendiente']), (2380, '0.00'))
+        self.assertEqual(list(venta.detalles.values_list('producto_id', 'cantidad')), [(self.pan.id, 2)])
+        self.assertEqual(EventoSalida.objects.get().datos['items'][0]['monto'], '2000.00')
+
+    def test_worker_aplica_efectos_una_vez(self):
+        self.vender(1)
+        self.vender(2)
+
+        self.assertEqual(eventos.procesar_lote(), (2, 0))
+        self.assertEqual(eventos.procesar_lote(), (0, 0))
+
+        resumen = ResumenVentaDiaria.objects.get()
+        self.assertEqual((resumen.unidades, resumen.tickets, resumen.monto), (3, 2, 3000))
+        alerta = Alerta.objects.get()
+        self.assertEqual((alerta.tipo_alerta, alerta.estado), ('amarilla', 'pendiente'))
+
+    def test_manejador_fallido_revierte_y_reintenta(self):
+        self.vender(1)
+        def fallar(evento):
+            raise ZeroDivisionError
+
+        # El último manejador falla: los efectos de los anteriores deben revertirse
+        manejadores = {'venta_registrada': eventos._manejadores['venta_registrada'] + [fallar]}
+        with mock.patch.dict(eventos._manejadores, manejadores), self.assertLogs('pos.eventos', 'ERROR'):
+            self.assertEqual(eventos.procesar_lote(), (0, 1))
+
+        evento = EventoSalida.objects.get()
+        self.assertEqual(evento.intentos, 1)
+        self.assertIn('ZeroDivisionError', evento.error)
+        self.assertFalse(ResumenVentaDiaria.objects.exists())
+
+        self.assertEqual(eventos.procesar_lote(), (1, 0))
+        self.assertEqual(ResumenVentaDiaria.objects.get().unidades, 1)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class ReportesTests(TestCase):
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        ajustes = override_settings(MEDIA_ROOT=self.media)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+        self.pan = Producto.objects.create(nombre='Marraqueta', precio=1000, categoria=Categoria.objects.create(nombre='Panes'))
+        venta = Venta.objects.create(
+            fecha=timezone.make_aware(datetime(2026, 1, 15, 10)),
+            total_sin_iva=0, total_iva=0, descuento=0, total_con_iva=0, canal_venta='presencial',
+        )
+        DetalleVenta.objects.create(venta=venta, producto=self.pan, cantidad=4, precio_unitario=1000, descuento_pct=10)
+
+    def test_solicitud_mal_formada(self):
+        for datos in ({'tipo': ['x']}, {'tipo': {'a': 1}}, {'tipo': 'ventas_periodo', 'parametros': ['2026-01-01']},
+                      {'tipo': 'ventas_periodo', 'parametros': 'x'}):
+            response = self.client.post(reverse('reportes'), datos, content_type='application/json')
+            self.assertEqual(response.status_code, 400, datos)
+        self.assertFalse(TrabajoReporte.objects.exists())
+
+    def test_solicitar_procesar_y_descargar(self):
+        response = self.client.post(reverse('reportes'), {
+            'tipo': 'ventas_periodo', 'parametros': {'desde': '2026-01-01', 'hasta': '2026-02-01'},
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 202)
+        trabajo_id = response.json()['id']
+        self.assertEqual(self.client.get(reverse('reporte-descarga', args=[trabajo_id])).status_code, 409)
+
+        self.assertEqual(reportes.tomar_pendientes(5), [trabajo_id])
+        self.assertEqual(reportes.ejecutar(trabajo_id), 'listo')
+
+        estado = self.client.get(reverse('reporte-estado', args=[trabajo_id])).json()
+        self.assertEqual(estado['estado'], 'listo')
+        descarga = self.client.get(estado['descarga'])
+        contenido = b''.join(descarga.streaming_content).decode().splitlines()
+        self.assertEqual(contenido[1], f'{self.pan.id},Marraqueta,Panes,4,3600.00,1')
+
+    def test_periodo_cerrado_reutiliza_resultado(self):
+        parametros = {'desde': '2026-01-01', 'hasta': '2026-02-01'}
+        trabajo, reutilizado = reportes.solicitar('ventas_periodo', parametros)
+        self.assertFalse(reutilizado)
+        self.assertEqual(reportes.solicitar('ventas_periodo', parametros), (trabajo, True))
+
+        # El stock actual siempre se recalcula
+        primero, _ = reportes.solicitar('valorizacion_stock', {})
+        segundo, reutilizado = reportes.solicitar('valorizacion_stock', {})
+        self.assertFalse(reutilizado)
+        self.assertNotEqual(primero, segundo)
+
+    def test_desalojo_por_tamano_expira_el_menos_usado(self):
+        viejo, _ = reportes.solicitar('ventas_periodo', {'desde': '2026-01-01', 'hasta': '2026-02-01'})
+        nuevo, _ = reportes.solicitar('ventas_periodo', {'desde': '2026-01-01', 'hasta': '2026-01-31'})
+        for trabajo in (viejo, nuevo):
+            reportes.ejecutar(trabajo.id)
+        reportes.registrar_acceso(nuevo)
+
+        tamano = TrabajoReporte.objects.get(pk=nuevo.pk).tamano
+        self.assertEqual(reportes.desalojar(limite=tamano), 1)
+        self.assertEqual(TrabajoReporte.objects.get(pk=viejo.pk).estado, 'expirado')
+        self.assertEqual(TrabajoReporte.objects.get(pk=nuevo.pk).estado, 'listo')
+        self.assertFalse(reportes.solicitar('ventas_periodo', {'desde': '2026-01-01', 'hasta': '2026-02-01'})[1])
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class AdminTests(TestCase):
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@forneria.cl', 'x'))
+        self.categoria = Categoria.objects.create(nombre='Panes')
+
+    def crear_lotes(self, n):
+        for i in range(n):
+            producto = Producto.objects.create(nombre=f'Pan {i}', precio=100, categoria=self.categoria)
+            Lote.objects.create(producto=producto, fecha_caducidad=date.today(), stock_actual=1)
+
+    def consultas_changelist(self, nombre):
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(self.client.get(reverse(f'admin:pos_{nombre}_changelist')).status_code, 200)
+        return len(consultas)
+
+    def test_changelist_de_lotes_sin_n_mas_1(self):
+        self.crear_lotes(2)
+        self.consultas_changelist('lote')  # la primera carga además el usuario al cache de autenticación
+        pocas = self.consultas_changelist('lote')
+        self.crear_lotes(20)
+        self.assertEqual(self.consultas_changelist('lote'), pocas)
+
+    def test_changelist_de_detalles_sin_n_mas_1(self):
+        def vender(n):
+            for i in range(n):
+                producto = Producto.objects.create(nombre=f'Torta {i}', precio=100, categoria=self.categoria)
+                venta = Venta.objects.create(fecha=timezone.now(), total_sin_iva=0, total_iva=0, descuento=0,
+                                             total_con_iva=0, canal_venta='presencial')
+                DetalleVenta.objects.create(venta=venta, producto=producto, cantidad=1, precio_unitario=100)
+
+        vender(2)
+        self.consultas_changelist('detalleventa')
+        pocas = self.consultas_changelist('detalleventa')
+        vender(20)
+        self.assertEqual(self.consultas_changelist('detalleventa'), pocas)
+
+    def test_formulario_de_lote_no_lista_productos(self):
+        self.crear_lotes(3)
+        response = self.client.get(reverse('admin:pos_lote_add'))
+        self.assertNotContains(response, 'Pan 2')
+
+    def test_conteo_estimado_sin_filtros(self):
+        paginador = pos_admin.ConteoEstimadoPaginator(Venta.objects.order_by('-id'), 100)
+        with mock.patch.object(pos_admin, 'estimar_filas', return_value=5_000_000), self.assertNumQueries(0):
+            self.assertEqual(paginador.count, 5_000_000)
+
+        filtrado = pos_admin.ConteoEstimadoPaginator(Venta.objects.filter(canal_venta='delivery').order_by('-id'), 100)
+        with mock.patch.object(pos_admin, 'estimar_filas', return_value=5_000_000):
+            self.assertEqual(filtrado.count, 0)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class PreciosTests(TestCase):
+
+    def setUp(self):
+        self.panes = Categoria.objects.create(nombre='Panes')
+        self.dulces = Categoria.objects.create(nombre='Dulces')
+        self.marraqueta = Producto.objects.create(nombre='Marraqueta', precio=1000, categoria=self.panes)
+        self.hallulla = Producto.objects.create(nombre='Hallulla', precio=1250, categoria=self.panes)
+        self.kuchen = Producto.objects.create(nombre='Kuchen', precio=5000, categoria=self.dulces)
+
+    def test_ajuste_porcentual_por_categoria(self):
+        with self.assertNumQueries(6), self.captureOnCommitCallbacks(execute=True):
+            resultado = precios.ajustar_precios({'categoria': self.panes.id}, porcentaje=-10, motivo='Promo')
+
+        self.assertEqual(resultado['productos'], 2)
+        self.marraqueta.refresh_from_db()
+        self.hallulla.refresh_from_db()
+        self.kuchen.refresh_from_db()
+        self.assertEqual((self.marraqueta.precio, self.hallulla.precio, self.kuchen.precio), (900, 1125, 5000))
+        historial = HistorialPrecio.objects.get(producto=self.hallulla)
+        self.assertEqual((historial.precio_anterior, historial.precio_nuevo), (1250, 1125))
+        self.assertEqual(historial.operacion, resultado['operacion'])
+
+    def test_ajuste_que_deja_precios_negativos_no_modifica_nada(self):
+        with self.assertRaises(ValueError):
+            precios.ajustar_precios({'categoria': self.panes.id}, monto=-1000)
+        self.marraqueta.refresh_from_db()
+        self.assertEqual(self.marraqueta.precio, 1000)
+        self.assertFalse(HistorialPrecio.objects.exists())
+
+    def test_endpoint_exige_filtro_y_guarda_historial(self):
+        url = reverse('ajustar-precios')
+        todos = {'todos': True, 'porcentaje': -50}
+        self.assertEqual(self.client.post(url, todos, content_type='application/json').status_code, 403)
+        self.client.force_login(User.objects.create_user('cajero', password='x'))
+        self.assertEqual(self.client.post(url, todos, content_type='application/json').status_code, 403)
+        self.assertFalse(HistorialPrecio.objects.exists())
+
+        self.client.force_login(User.objects.create_user('encargada', password='x', is_staff=True))
+        self.assertEqual(self.client.post(url, {'monto': 100}, content_type='application/json').status_code, 400)
+        # 5000 * 1e6 no cabe en DecimalField(10, 2): 400 en vez de DataError
+        response = self.client.post(url, {'todos': True, 'porcentaje': 1e8}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post(url, {'categoria': self.dulces.id, 'monto': 500}, content_type='application/json')
+        self.assertEqual(response.json()['productos'], 1)
+        [cambio] = self.client.get(reverse('historial-precios', args=[self.kuchen.id])).json()
+        self.assertEqual((cambio['precio_anterior'], cambio['precio_nuevo']), ('5000.00', '5500.00'))
+
+    def test_aplicar_descuento_guarda_precio_anterior(self):
+        self.kuchen.aplicar_descuento(20, aplicar=True)
+        historial = HistorialPrecio.objects.get()
+        self.assertEqual((historial.precio_anterior, historial.precio_nuevo), (5000, 4000))
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class BoletaTests(TestCase):
+
+    def setUp(self):
+        clientes.invalidar()
+        categoria = Categoria.objects.create(nombre='Panes')
+        self.pan = Producto.objects.create(nombre='Marraqueta', precio=1000, categoria=categoria)
+        self.kuchen = Producto.objects.create(nombre='Kuchen de nuez', precio=5000, categoria=categoria)
+        for producto in (self.pan, self.kuchen):
+            Lote.objects.create(producto=producto, fecha_caducidad=date.today() + timedelta(days=3), stock_actual=50)
+
+    def vender(self, **extra):
+        datos = {
+            'cliente_rut': '12.345.678-5',
+            'pagos': [{'metodo': 'DEB', 'monto': 5000}, {'metodo': 'EFE', 'monto': 20000}],
+            'items': [
+                {'producto_id': self.pan.id, 'cantidad': 10, 'precio_unitario': 1000},
+                {'producto_id': self.kuchen.id, 'cantidad': 1, 'precio_unitario': 5000, 'descuento_pct': 10},
+            ],
+        }
+        datos.update(extra)
+        response = self.client.post(reverse('checkout'), datos, content_type='application/json')
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()
+
+    def test_escpos_de_una_venta_en_dos_consultas(self):
+        venta_id = self.vender()['id']
+        with self.assertNumQueries(2):
+            datos = boleta.datos_venta(venta_id)
+        salida = boleta.escpos(datos)
+
+        self.assertTrue(salida.startswith(b'\x1b@\x1bt\x13'))
+        self.assertTrue(salida.endswith(b'\x1dV\x42\x00'))
+        lineas = salida.split(b'\n')
+        for izquierda, derecha in [
+            (b'10 x Marraqueta', b'$10.000'), (b'  Descuento 10%', b'-$500'), (b'Neto', b'$14.500'),
+            ('Débito'.encode('cp858'), b'$5.000'), (b'Vuelto', b'$7.745'), (b'Cliente', b'12345678-5'),
+        ]:
+            self.assertIn(izquierda.ljust(boleta.ANCHO - len(derecha)) + derecha, lineas)
+        # el buffer por hilo se reutiliza sin arrastrar el comprobante anterior
+        self.assertEqual(boleta.escpos(datos), salida)
+
+    def test_checkout_incluye_la_boleta_sin_consultas_extra(self):
+        sin_boleta = self.vender()
+        self.vender()  # el RUT ya quedó en el cache de clientes
+        with CaptureQueriesContext(connection) as base:
+            self.vender()
+        with CaptureQueriesContext(connection) as con_boleta:
+            respuesta = self.vender(boleta='escpos')
+
+        self.assertNotIn('boleta', sin_boleta)
+        self.assertEqual(len(con_boleta), len(base))
+        self.assertEqual(base64.b64decode(respuesta['boleta']), boleta.escpos(boleta.datos_venta(respuesta['id'])))
+
+    def test_checkout_desde_la_ui_con_ids_de_texto(self):
+        # pos.js envía data-id como texto y pide la boleta en html
+        respuesta = self.vender(boleta='html', pagos=[{'metodo': 'EFE', 'monto': '2000'}], items=[
+            {'producto_id': str(self.pan.id), 'cantidad': '1', 'precio_unitario': '1000'},
+        ])
+        self.assertIn('1 x Marraqueta', respuesta['boleta'])
+        self.assertEqual(self.pan.lotes.get().stock_actual, 49)
+
+        response = self.client.post(reverse('checkout'), {
+            'items': [{'producto_id': 'pan', 'cantidad': 1, 'precio_unitario': 1000}],
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Venta.objects.count(), 1)
+
+    def test_falla_de_la_boleta_no_revierte_la_venta(self):
+        with mock.patch.object(boleta, 'html_boleta', side_effect=KeyError('x')), self.assertLogs('pos.views', 'ERROR'):
+            respuesta = self.vender(boleta='html')
+        self.assertNotIn('boleta', respuesta)
+        self.assertEqual(Venta.objects.get().folio, respuesta['folio'])
+
+    def test_endpoint_html(self):
+        venta_id = self.vender()['id']
+        response = self.client.get(reverse('boleta-venta', args=[venta_id]), {'formato': 'html'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/html; charset=utf-8')
+        self.assertContains(response, 'TOTAL')
+        self.assertContains(response, f'V{venta_id:06d}')
+
+        response = self.client.get(reverse('boleta-venta', args=[venta_id]))
+        self.assertEqual(response['Content-Type'], 'application/octet-stream')
+        self.assertEqual(self.client.get(reverse('boleta-venta', args=[999])).status_code, 404)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class CajaTests(TestCase):
+
+    def setUp(self):
+        categoria = Categoria.objects.create(nombre='Panes')
+        self.pan = Producto.objects.create(nombre='Marraqueta', precio=1000, categoria=categoria)
+        Lote.objects.create(producto=self.pan, fecha_caducidad=date.today() + timedelta(days=3), stock_actual=100)
+        usuario = User.objects.create_user('cajero', password='x')
+        self.empleado = Empleado.objects.create(
+            nombres='Ana', apellido_paterno='Rojas', run='1-9', correo='ana@forneria.cl',
+            fono=1, clave='x', direccion='-', cargo='cajero', usuario=usuario,
+        )
+
+    def abrir(self, terminal='caja-1', fondo=20000):
+        return self.client.post(reverse('caja-abrir'), {
+            'terminal': terminal, 'fondo_inicial': fondo, 'empleado_id': self.empleado.id,
+        }, content_type='application/json')
+
+    def vender(self, sesion_id, pagos):
+        return self.client.post(reverse('checkout'), {
+            'sesion_caja': sesion_id, 'pagos': pagos,
+            'items': [{'producto_id': self.pan.id, 'cantidad': 10, 'precio_unitario': 1000}],  # 11.900
+        }, content_type='application/json')
+
+    def test_contadores_y_cierre_con_diferencia(self):
+        sesion_id = self.abrir().json()['id']
+        self.assertEqual(self.vender(sesion_id, [{'metodo': 'EFE', 'monto': 20000}]).status_code, 201)
+        self.assertEqual(self.vender(sesion_id, [{'metodo': 'DEB', 'monto': 5000},
+                                                 {'metodo': 'EFE', 'monto': 6900}]).status_code, 201)
+        self.assertEqual(self.vender(sesion_id, [{'metodo': 'CRE', 'monto': 11900}]).status_code, 201)
+
+        sesion = SesionCaja.objects.get()
+        self.assertEqual((sesion.cantidad_ventas, sesion.total_efectivo, sesion.total_debito, sesion.total_credito),
+                         (3, 18800, 5000, 11900))
+        esperado = caja.recalcular(sesion_id)
+        self.assertEqual(esperado, {'cantidad_ventas': 3, 'total_efectivo': 18800, 'total_debito': 5000,
+                                    'total_credito': 11900})
+
+        # el cierre no lee ventas ni pagos
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.post(reverse('caja-cerrar', args=[sesion_id]),
+                                        {'efectivo_contado': 38000}, content_type='application/json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertFalse([q for q in consultas if 'pos_venta' in q['sql'] or 'pos_pago' in q['sql']])
+        self.assertEqual(response.json()['efectivo_esperado'], '38800.00')
+        self.assertEqual(response.json()['diferencia'], '-800.00')
+
+        cuadratura = self.client.get(reverse('caja-cuadratura')).json()
+        self.assertEqual((cuadratura['descuadradas'], cuadratura['faltante']), (1, '-800.00'))
+
+    def test_una_caja_abierta_por_terminal(self):
+        sesion_id = self.abrir().json()['id']
+        self.assertEqual(self.abrir().status_code, 400)
+        self.assertEqual(self.abrir(terminal='caja-2').status_code, 201)
+
+        caja.cerrar(sesion_id, 20000)
+        self.assertEqual(self.abrir().status_code, 201)
+
+    def test_venta_en_caja_cerrada_se_revierte(self):
+        sesion_id = self.abrir().json()['id']
+        caja.cerrar(sesion_id, 20000)
+
+        response = self.vender(sesion_id, [{'metodo': 'EFE', 'monto': 11900}])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Venta.objects.exists())
+        self.assertEqual(SesionCaja.objects.get().cantidad_ventas, 0)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class SucursalesTests(TestCase):
+
+    def setUp(self):
+        sucursales.invalidar()
+        escaneo.limpiar()
+        self.principal = Sucursal.objects.get(codigo='principal')
+        self.norte = Sucursal.objects.create(codigo='norte', nombre='Norte')
+        categoria = Categoria.objects.create(nombre='Panes')
+        self.pan = Producto.objects.create(nombre='Marraqueta', precio=1000, categoria=categoria, codigo_barra='780001')
+        vence = date.today() + timedelta(days=3)
+        self.lote_principal = Lote.objects.create(producto=self.pan, fecha_caducidad=vence, stock_actual=5)
+        self.lote_norte = Lote.objects.create(producto=self.pan, fecha_caducidad=vence, stock_actual=40,
+                                              sucursal=self.norte)
+
+    def test_lote_sin_sucursal_queda_en_la_predeterminada(self):
+        self.assertEqual(self.lote_principal.sucursal_id, self.principal.id)
+
+    def test_checkout_consume_stock_de_su_sucursal(self):
+        response = self.client.post(reverse('checkout'), {
+            'items': [{'producto_id': self.pan.id, 'cantidad': 10, 'precio_unitario': 1000}],
+        }, content_type='application/json', HTTP_X_SUCURSAL='norte')
+
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(Venta.objects.get().sucursal_id, self.norte.id)
+        self.lote_principal.refresh_from_db()
+        self.lote_norte.refresh_from_db()
+        self.assertEqual((self.lote_principal.stock_actual, self.lote_norte.stock_actual), (5, 30))
+        self.assertEqual(list(MovimientoInventario.objects.values_list('sucursal_id', flat=True)), [self.norte.id])
+
+        # en la principal solo hay 5
+        response = self.client.post(reverse('checkout'), {
+            'items': [{'producto_id': self.pan.id, 'cantidad': 10, 'precio_unitario': 1000}],
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_escaneo_y_lotes_por_sucursal(self):
+        url = reverse('escanear', args=['780001'])
+        self.assertEqual(self.client.get(url).json()['stock'], 5)
+        self.assertEqual(self.client.get(url, HTTP_X_SUCURSAL='norte').json()['stock'], 40)
+        # la entrada del LRU trae el stock de todas las sucursales
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, HTTP_X_SUCURSAL='norte').json()['stock'], 40)
+
+        lotes = self.client.get('/pos/lotes/', HTTP_X_SUCURSAL='norte').json()
+        self.assertEqual([l['id'] for l in lotes], [self.lote_norte.id])
+        self.assertEqual(self.client.get(url, HTTP_X_SUCURSAL='sur').status_code, 400)
+
+    def test_misma_terminal_en_dos_sucursales(self):
+        usuario = User.objects.create_user('cajero', password='x')
+        empleado = Empleado.objects.create(
+            nombres='Ana', apellido_paterno='Rojas', run='1-9', correo='ana@forneria.cl',
+            fono=1, clave='x', direccion='-', cargo='cajero', usuario=usuario,
+        )
+        caja.abrir('caja-1', empleado, sucursal_id=self.principal.id)
+        caja.abrir('caja-1', empleado, sucursal_id=self.norte.id)
+        with self.assertRaises(ValueError):
+            caja.abrir('caja-1', empleado, sucursal_id=self.norte.id)
+
+    def test_empleado_solo_opera_en_su_sucursal(self):
+        url = reverse('escanear', args=['780001'])
+        usuario = User.objects.create_user('cajero', password='x')
+        Empleado.objects.create(
+            nombres='Ana', apellido_paterno='Rojas', run='1-9', correo='ana@forneria.cl',
+            fono=1, clave='x', direccion='-', cargo='cajero', usuario=usuario, sucursal=self.norte,
+        )
+        jwt = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(usuario)}'}
+        self.assertEqual(self.client.get(url, HTTP_X_SUCURSAL='norte', **jwt).json()['stock'], 40)
+        self.assertEqual(self.client.get(url, **jwt).status_code, 403)
+        response = self.client.post(reverse('checkout'), {
+            'items': [{'producto_id': self.pan.id, 'cantidad': 1, 'precio_unitario': 1000}],
+        }, content_type='application/json', **jwt)
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Venta.objects.exists())
+
+        # con sesión lo corta el middleware, también fuera de la API
+        self.client.force_login(User.objects.create_user('sin-empleado', password='x'))
+        self.assertEqual(self.client.get(url, HTTP_X_SUCURSAL='norte').status_code, 403)
+        self.assertEqual(self.client.get('/', HTTP_X_SUCURSAL='norte').status_code, 403)
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.client.force_login(User.objects.create_user('encargada', password='x', is_staff=True))
+        self.assertEqual(self.client.get(url, HTTP_X_SUCURSAL='norte').status_code, 200)
+
+    def test_pagos_detalles_y_boleta_de_otra_sucursal(self):
+        venta = Venta.objects.create(
+            fecha=timezone.now(), total_sin_iva=840, total_iva=160, descuento=0, total_con_iva=1000,
+            canal_venta='presencial', sucursal=self.norte,
+        )
+        detalle = DetalleVenta.objects.create(venta=venta, producto=self.pan, cantidad=1, precio_unitario=1000)
+        pago = Pago.objects.create(venta=venta, metodo='EFE', monto=1000)
+        boleta_url = reverse('boleta-venta', args=[venta.id])
+
+        self.assertEqual(self.client.get('/pos/pagos/').json(), [])
+        self.assertEqual([p['id'] for p in self.client.get('/pos/pagos/', HTTP_X_SUCURSAL='norte').json()], [pago.id])
+        self.assertEqual(self.client.get(f'/pos/detalle-ventas/{detalle.id}/').status_code, 404)
+        self.assertEqual(self.client.get(f'/pos/detalle-ventas/{detalle.id}/', HTTP_X_SUCURSAL='norte').status_code, 200)
+        self.assertEqual(self.client.get(boleta_url).status_code, 404)
+        self.assertEqual(self.client.get(boleta_url, HTTP_X_SUCURSAL='norte').status_code, 200)
+
+        # tampoco se puede colgar un pago de una venta ajena
+        response = self.client.post('/pos/pagos/', {'venta': venta.id, 'metodo': 'EFE', 'monto': 500},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Pago.objects.count(), 1)
+
+    @override_settings(POS_SUCURSALES_BD={'norte': 'norte'})
+    def test_router_envia_la_sucursal_a_su_base(self):
+        router = sucursales.RouterSucursales()
+        self.assertIsNone(router.db_for_write(Venta))
+        with sucursales.usar('norte'):
+            self.assertEqual(router.db_for_write(Venta), 'norte')
+            self.assertEqual(router.db_for_read(DetalleVenta), 'norte')
+            self.assertIsNone(router.db_for_read(Producto))
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class VueloUnicoTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_peticiones_paralelas_calculan_una_vez(self):
+        llamadas = []
+
+        def get_queryset(viewset):
+            llamadas.append(threading.get_ident())
+            reloj.sleep(0.2)  # las demás peticiones llegan mientras se calcula
+            return [Categoria(id=i, nombre=f'Categoría {i}') for i in range(3)]
+
+        vista = views.CategoriaViewSet.as_view({'get': 'list'})
+        fabrica = APIRequestFactory()
+        with mock.patch.object(views.CategoriaViewSet, 'get_queryset', get_queryset), \
+                ThreadPoolExecutor(max_workers=20) as pool:
+            respuestas = list(pool.map(lambda _: vista(fabrica.get('/pos/categorias/')), range(20)))
+
+        self.assertEqual(len(llamadas), 1)
+        self.assertEqual({r.status_code for r in respuestas}, {200})
+        self.assertEqual({len(r.data) for r in respuestas}, {3})
+
+    def test_espera_el_resultado_de_otro_proceso(self):
+        clave = 'pos:vuelo:prueba'
+        cache.add(f'{clave}:candado', 1)  # otro proceso está calculando
+        threading.Timer(0.1, cache.set, args=(clave, ['de otro proceso'])).start()
+
+        calcular = mock.Mock(return_value=['local'])
+        self.assertEqual(vuelo_unico.compartir(clave, calcular), ['de otro proceso'])
+        calcular.assert_not_called()
+
+    def test_un_cambio_del_catalogo_renueva_el_listado(self):
+        self.assertEqual(self.client.get('/pos/categorias/').json(), [])
+        Categoria.objects.create(nombre='Panes')
+        self.assertEqual([c['nombre'] for c in self.client.get('/pos/categorias/').json()], ['Panes'])
+
+    def test_error_se_propaga_y_no_queda_cacheado(self):
+        with self.assertRaises(ZeroDivisionError):
+            vuelo_unico.compartir('pos:vuelo:error', lambda: 1 / 0)
+        self.assertEqual(vuelo_unico.compartir('pos:vuelo:error', lambda: 'ok'), 'ok')
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class AutenticacionTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        escaneo.limpiar()
+        self.usuario = User.objects.create_user('cajero', password='x')
+        self.empleado = Empleado.objects.create(
+            nombres='Ana', apellido_paterno='Rojas', run='1-9', correo='ana@forneria.cl',
+            fono=1, clave='x', direccion='-', cargo='cajero', usuario=self.usuario,
+        )
+        categoria = Categoria.objects.create(nombre='Panes')
+        self.pan = Producto.objects.create(nombre='Marraqueta', precio=1000, categoria=categoria, codigo_barra='780001')
+        Lote.objects.create(producto=self.pan, fecha_caducidad=date.today() + timedelta(days=3), stock_actual=50)
+        self.jwt = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(self.usuario)}'}
+
+    def consultas_auth(self, consultas):
+        return [q['sql'] for q in consultas if 'auth_' in q['sql'] or 'pos_empleado' in q['sql']]
+
+    def test_escaneo_con_jwt_sin_consultas(self):
+        url = reverse('escanear', args=['780001'])
+        self.assertEqual(self.client.get(url, **self.jwt).status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, **self.jwt).status_code, 200)
+
+    def test_checkout_asigna_el_empleado_sin_consultas_de_autenticacion(self):
+        autenticacion.usuario(self.usuario.pk)  # cache caliente
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.post(reverse('checkout'), {
+                'items': [{'producto_id': self.pan.id, 'cantidad': 1, 'precio_unitario': 1000}],
+            }, content_type='application/json', **self.jwt)
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(self.consultas_auth(consultas), [])
+        self.assertEqual(Venta.objects.get().empleado, self.empleado)
+
+    def test_sesion_sin_consultas_de_usuario(self):
+        self.client.force_login(self.usuario)
+        url = reverse('escanear', args=['780001'])
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(self.consultas_auth(consultas), [])
+
+    def test_cambios_invalidan_el_cache(self):
+        self.assertEqual(autenticacion.usuario(self.usuario.pk).empleado.cargo, 'cajero')
+        self.empleado.cargo = 'supervisor'
+        self.empleado.save()
+        self.assertEqual(autenticacion.usuario(self.usuario.pk).empleado.cargo, 'supervisor')
+
+        grupo = Group.objects.create(name='caja')
+        grupo.permissions.add(Permission.objects.get(codename='add_venta'))
+        self.assertFalse(autenticacion.usuario(self.usuario.pk).has_perm('pos.add_venta'))
+        self.usuario.groups.add(grupo)
+        self.assertTrue(autenticacion.usuario(self.usuario.pk).has_perm('pos.add_venta'))
+        grupo.permissions.clear()
+        self.assertFalse(autenticacion.usuario(self.usuario.pk).has_perm('pos.add_venta'))
+
+        self.usuario.is_active = False
+        self.usuario.save()
+        response = self.client.get(reverse('escanear', args=['780001']), **self.jwt)
+        # 403 y no 401: SessionAuthentication va primero y no define WWW-Authenticate
+        self.assertContains(response, 'User is inactive', status_code=403)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class ProductoLotesTests(TestCase):
+
+    def setUp(self):
+        sucursales.invalidar()
+        self.norte = Sucursal.objects.create(codigo='norte', nombre='Norte')
+        self.pan = Producto.objects.create(nombre='Marraqueta', precio=1000, categoria=Categoria.objects.create(nombre='Panes'))
+        self.vence = (date.today() + timedelta(days=5)).isoformat()
+        self.url = f'/pos/productos/{self.pan.id}/'
+
+    def crear_lotes(self, cantidad, **extra):
+        return Lote.objects.bulk_create([
+            Lote(producto=self.pan, numero_lote=f'L{i}', fecha_caducidad=self.vence, stock_actual=10, **extra)
+            for i in range(cantidad)
+        ])
+
+    def editar(self, lotes, **extra):
+        return self.client.patch(self.url, {'lotes': lotes}, content_type='application/json', **extra)
+
+    def test_diferencia_por_id_y_numero_de_lote(self):
+        por_id, por_numero, sobrante = self.crear_lotes(3)
+        [del_norte] = self.crear_lotes(1, sucursal=self.norte)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.editar([
+                {'id': por_id.id, 'numero_lote': 'A1', 'fecha_caducidad': self.vence, 'stock_actual': 7},
+                {'numero_lote': por_numero.numero_lote, 'fecha_caducidad': self.vence, 'stock_actual': 3},
+                {'numero_lote': 'NUEVO', 'fecha_caducidad': self.vence, 'stock_actual': 20},
+            ])
+
+        self.assertEqual(response.status_code, 200, response.content)
+        lotes = {l.numero_lote: l for l in self.pan.lotes.all()}
+        self.assertEqual(lotes['A1'].id, por_id.id)
+        self.assertEqual(lotes['L1'].id, por_numero.id)
+        self.assertEqual((lotes['A1'].stock_actual, lotes['L1'].stock_actual, lotes['NUEVO'].stock_actual), (7, 3, 20))
+        self.assertFalse(Lote.objects.filter(pk=sobrante.id).exists())
+        self.assertIsNotNone(Lote.todos.get(pk=sobrante.id).eliminado)
+        desde = timezone.now() - timedelta(minutes=1)
+        self.assertIn({'modelo': 'lote', 'id': sobrante.id}, catalogo.cambios_desde(desde)['eliminados'])
+        # los lotes de otra sucursal no se tocan
+        self.assertEqual(lotes['L0'].id, del_norte.id)
+
+    def test_id_ajeno_se_rechaza_sin_cambios(self):
+        [del_norte] = self.crear_lotes(1, sucursal=self.norte)
+        response = self.editar([{'id': del_norte.id, 'fecha_caducidad': self.vence, 'stock_actual': 1}])
+        self.assertEqual(response.status_code, 400)
+        del_norte.refresh_from_db()
+        self.assertEqual(del_norte.stock_actual, 10)
+
+    def test_consultas_constantes(self):
+        def consultas(cantidad):
+            Lote.objects.all().delete()
+            lotes = self.crear_lotes(cantidad)
+            cuerpo = [
+                {'id': l.id, 'fecha_caducidad': self.vence, 'stock_actual': 9} for l in lotes[:cantidad // 2]
+            ] + [{'numero_lote': f'N{i}', 'fecha_caducidad': self.vence} for i in range(cantidad // 2)]
+            with CaptureQueriesContext(connection) as capturadas:
+                self.assertEqual(self.editar(cuerpo).status_code, 200)
+            return len(capturadas)
+
+        self.assertEqual(consultas(4), consultas(100))
+        self.assertEqual(self.pan.lotes.count(), 100)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'], POS_COMPRESION_MINIMO=200)
+class RenderizadoTests(TestCase):
+
+    def setUp(self):
+        categoria = Categoria.objects.create(nombre='Panes')
+        vence = date.today() + timedelta(days=3)
+        for i in range(10):
+            producto = Producto.objects.create(nombre=f'Pan {i}', precio='1290.50', categoria=categoria)
+            Lote.objects.create(producto=producto, numero_lote=f'L{i}', fecha_caducidad=vence, stock_actual=5)
+
+    def test_misma_salida_que_el_renderer_de_drf(self):
+        from rest_framework.renderers import JSONRenderer
+        from forneria.renderers import JSONRapidoRenderer
+
+        datos = self.client.get('/pos/productos/').json()
+        extra = {'fecha': timezone.now(), 'dia': date.today(), 'nombre': 'Ñandú'}
+        esperado = JSONRenderer().render(datos + [{'precio': '10.50', **extra}])
+        # el Decimal suelto sale como string (DRF lo pasaría a float)
+        self.assertEqual(JSONRapidoRenderer().render(datos + [{'precio': Decimal('10.50'), **extra}]), esperado)
+
+    def test_messagepack_por_accept(self):
+        import msgpack
+
+        response = self.client.get('/pos/productos/', HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        productos = msgpack.unpackb(response.content)
+        self.assertEqual(productos, self.client.get('/pos/productos/').json())
+        self.assertEqual(productos[0]['precio'], '1290.50')
+
+    def test_compresion_negociada(self):
+        import brotli
+
+        plano = self.client.get('/pos/productos/')
+        self.assertFalse(plano.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', plano['Vary'])
+
+        response = self.client.get('/pos/productos/', HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(response.content), plano.content)
+
+        response = self.client.get('/pos/productos/', HTTP_ACCEPT_ENCODING='gzip, br;q=0')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), plano.content)
+
+        # el HTML (con token CSRF) no se comprime
+        self.assertFalse(self.client.get('/pos/productos/?format=api', HTTP_ACCEPT_ENCODING='br').has_header('Content-Encoding'))
+
+
+class EstaticosTests(TestCase):
+
+    def setUp(self):
+        raiz = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, raiz, ignore_errors=True)
+        archivos = {
+            'pos.1a2b3c.js': b'plano', 'pos.1a2b3c.js.br': b'brotli', 'pos.1a2b3c.js.gz': b'gzip',
+            'estilos.css': b'css', 'estilos.css.gz': b'css gzip',
+            'logo.png': b'png',
+            'staticfiles.json': json.dumps({'paths': {'pos.js': 'pos.1a2b3c.js'}}).encode(),
+        }
+        for nombre, contenido in archivos.items():
+            with open(f'{raiz}/{nombre}', 'wb') as f:
+                f.write(contenido)
+        with override_settings(STATIC_ROOT=raiz, STATIC_URL='/static/'):
+            self.middleware = middleware.EstaticosMiddleware(lambda request: HttpResponse('vista'))
+        self.factory = RequestFactory()
+
+    def pedir(self, ruta, metodo='get', **extra):
+        response = self.middleware(getattr(self.factory, metodo)(ruta, **extra))
+        if response.streaming:
+            response.contenido = b''.join(response.streaming_content)
+            response.close()
+        else:
+            response.contenido = response.content
+        return response
+
+    def test_elige_la_variante_segun_accept_encoding(self):
+        casos = [('gzip, br', 'br', b'brotli'), ('gzip, br;q=0', 'gzip', b'gzip'), ('', None, b'plano')]
+        for aceptadas, codificacion, contenido in casos:
+            response = self.pedir('/static/pos.1a2b3c.js', HTTP_ACCEPT_ENCODING=aceptadas)
+            self.assertEqual(response.get('Content-Encoding'), codificacion)
+            self.assertEqual(response.contenido, contenido)
+            self.assertEqual(response['Vary'], 'Accept-Encoding')
+            self.assertEqual(response['Content-Type'], 'text/javascript')
+
+        # sin variantes no hay nada que negociar
+        self.assertFalse(self.pedir('/static/logo.png', HTTP_ACCEPT_ENCODING='br').has_header('Vary'))
+
+    def test_immutable_solo_para_nombres_con_hash(self):
+        con_hash = self.pedir('/static/pos.1a2b3c.js')
+        sin_hash = self.pedir('/static/estilos.css')
+        self.assertEqual(con_hash['Cache-Control'], middleware.CACHE_INMUTABLE)
+        self.assertEqual(sin_hash['Cache-Control'], middleware.CACHE_SIN_HASH)
+
+        # el sin hash se revalida con Last-Modified; el inmutable se sirve siempre
+        revalidar = {'HTTP_IF_MODIFIED_SINCE': sin_hash['Last-Modified']}
+        self.assertEqual(self.pedir('/static/estilos.css', **revalidar).status_code, 304)
+        self.assertEqual(self.pedir('/static/pos.1a2b3c.js', **revalidar).status_code, 200)
+
+    def test_rutas_desconocidas_siguen_a_la_vista(self):
+        for ruta, metodo in [('/static/nada.js', 'get'), ('/static/pos.1a2b3c.js.br', 'get'),
+                             ('/static/pos.1a2b3c.js', 'post'), ('/pos/productos/', 'get')]:
+            self.assertEqual(self.pedir(ruta, metodo).contenido, b'vista')
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'], POS_TABLERO_INTERVALO=0.01)
+class TableroTests(TestCase):
+
+    def setUp(self):
+        tablero.limpiar()
+        self.sucursal_id = sucursales.predeterminada_id()
+        categoria = Categoria.objects.create(nombre='Panes')
+        self.pan = Producto.objects.create(nombre='Marraqueta', precio=1000, categoria=categoria)
+        self.kuchen = Producto.objects.create(nombre='Kuchen', precio=5000, categoria=categoria)
+        vence = date.today() + timedelta(days=3)
+        self.lote_pan = Lote.objects.create(producto=self.pan, numero_lote='P1', fecha_caducidad=vence,
+                                            stock_actual=50, stock_minimo=45)
+        Lote.objects.create(producto=self.kuchen, numero_lote='K1', fecha_caducidad=vence, stock_actual=3)
+        self.encargado = User.objects.create_user('encargada', password='x', is_staff=True)
+
+    def vender(self, producto, cantidad, canal='presencial'):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('checkout'), {
+                'canal_venta': canal,
+                # como pos.js: el id viaja como texto y debe sumarse a la fila sembrada desde la base
+                'items': [{'producto_id': str(producto.id), 'cantidad': cantidad,
+                           'precio_unitario': str(producto.precio)}],
+            }, content_type='application/json')
+        self.assertEqual(response.status_code, 201, response.content)
+
+    def totales(self):
+        return json.loads(tablero.foto(self.sucursal_id)[1])
+
+    def test_semilla_y_ventas_en_memoria(self):
+        self.vender(self.pan, 2)
+        tablero.sembrar(self.sucursal_id)
+        self.assertEqual(self.totales()['ventas'], 1)
+        self.assertEqual([l['numero_lote'] for l in self.totales()['stock_bajo']], ['K1'])
+
+        self.vender(self.pan, 4)
+        self.vender(self.kuchen, 1, canal='delivery')
+        with self.assertNumQueries(0):
+            totales = self.totales()
+        self.assertEqual(totales['ventas'], 3)
+        self.assertEqual(totales['por_canal']['presencial'], {'ventas': 2, 'monto': '7140.00'})
+        self.assertEqual(totales['por_canal']['delivery'], {'ventas': 1, 'monto': '5950.00'})
+        self.assertEqual([(p['nombre'], p['unidades'], p['monto']) for p in totales['top_productos']],
+                         [('Marraqueta', 6, '6000.00'), ('Kuchen', 1, '5000.00')])
+        # el pan bajó a 44, bajo su mínimo de 45
+        self.assertEqual([(l['numero_lote'], l['stock_actual']) for l in totales['stock_bajo']], [('K1', 2), ('P1', 44)])
+
+        # la semilla de otro proceso llega a lo mismo
+        tablero.limpiar()
+        tablero.sembrar(self.sucursal_id)
+        self.assertEqual(self.totales(), totales)
+
+    def test_una_serializacion_por_version(self):
+        tablero.sembrar(self.sucursal_id)
+        primera = tablero.foto(self.sucursal_id)
+        self.assertIs(tablero.foto(self.sucursal_id), primera)
+        self.vender(self.pan, 1)
+        self.assertGreater(tablero.foto(self.sucursal_id)[0], primera[0])
+
+    def test_eventos_solo_para_encargados_y_con_reconexion_en_wsgi(self):
+        url = reverse('tablero-eventos')
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.client.force_login(self.encargado)
+        response = self.client.get(url)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        lineas = response.content.decode().splitlines()
+        self.assertEqual(lineas[0], 'retry: 5000')
+        self.assertEqual(lineas[2], 'event: totales')
+        self.assertEqual(json.loads(lineas[3][len('data: '):])['ventas'], 0)
+
+    async def test_flujo_asgi_envia_cada_cambio(self):
+        await self.async_client.aforce_login(self.encargado)
+        response = await self.async_client.get(reverse('tablero-eventos'))
+        self.assertTrue(response.streaming)
+        flujo = aiter(response.streaming_content)
+        try:
+            self.assertIn(b'"ventas":0', await anext(flujo))
+            venta = await Venta.objects.acreate(
+                fecha=timezone.now(), total_sin_iva=1000, total_iva=190, descuento=0, total_con_iva=1190,
+                canal_venta='presencial', sucursal_id=self.sucursal_id,
+            )
+            tablero.registrar_venta(venta, [{'producto_id': self.pan.id, 'cantidad': 1, 'precio_unitario': Decimal('1000')}],
+                                    {self.pan.id: self.pan.nombre})
+            self.assertIn(b'"ventas":1', await anext(flujo))
+        finally:
+            await flujo.aclose()
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class LotesTests(TestCase):
+
+    def setUp(self):
+        self.sucursal_id = sucursales.predeterminada_id()
+        self.pan = Producto.objects.create(nombre='Marraqueta', precio=1000, categoria=Categoria.objects.create(nombre='Panes'))
+        hoy = timezone.localdate()
+        self.vivo = Lote.objects.create(producto=self.pan, numero_lote='VIVO', fecha_caducidad=hoy + timedelta(days=2), stock_actual=10)
+        self.vencido = Lote.objects.create(producto=self.pan, numero_lote='VENCIDO', fecha_caducidad=hoy - timedelta(days=1), stock_actual=4)
+        self.agotado = Lote.objects.create(producto=self.pan, numero_lote='AGOTADO', fecha_caducidad=hoy + timedelta(days=1), stock_actual=0)
+        self.recien_creado = Lote.objects.create(producto=self.pan, numero_lote='NUEVO', fecha_caducidad=hoy + timedelta(days=5), stock_actual=0)
+        # agotado hace dos días
+        Lote.objects.filter(pk=self.agotado.pk).update(modificado=timezone.now() - timedelta(days=2))
+
+    def test_baja_logica_oculta_los_lotes(self):
+        cursor = timezone.now()
+        self.assertEqual(lotes.dar_de_baja(self.sucursal_id), 2)
+
+        self.assertEqual(sorted(self.pan.lotes.values_list('numero_lote', flat=True)), ['NUEVO', 'VIVO'])
+        self.assertEqual(Lote.todos.count(), 4)
+        self.assertEqual(self.pan.stock_total(), 10)
+        # el feed incremental los replica como eliminaciones; el completo ni los lee
+        cambios = catalogo.cambios_desde(cursor + catalogo.MARGEN_CURSOR, self.sucursal_id)
+        self.assertEqual(sorted(e['id'] for e in cambios['eliminados']), sorted([self.vencido.id, self.agotado.id]))
+        self.assertEqual([l['id'] for l in catalogo.cambios_desde(None, self.sucursal_id)['lotes']], [self.vivo.id])
+
+    def test_archivo_mueve_los_dados_de_baja(self):
+        lotes.dar_de_baja(self.sucursal_id)
+        self.assertEqual(lotes.archivar(self.sucursal_id), 0)
+        Lote.todos.filter(eliminado__isnull=False).update(eliminado=timezone.now() - timedelta(days=31))
+
+        # una tanda: leer, copiar, lápidas y borrar, más el savepoint y su liberación
+        with self.assertNumQueries(6):
+            self.assertEqual(lotes.archivar(self.sucursal_id), 2)
+
+        self.assertEqual(sorted(LoteArchivado.objects.values_list('id', 'stock_actual')),
+                         sorted([(self.vencido.id, 4), (self.agotado.id, 0)]))
+        self.assertEqual(Lote.todos.count(), 2)
+        self.assertEqual(EliminacionCatalogo.objects.filter(modelo='lote').count(), 2)
+
+    def test_fefo_usa_solo_lotes_vigentes(self):
+        Lote.objects.filter(pk=self.vivo.pk).update(eliminado=timezone.now())
+        response = self.client.post(reverse('checkout'), {
+            'items': [{'producto_id': self.pan.id, 'cantidad': 1, 'precio_unitario': 1000}],
+        }, content_type='application/json')
+        # el único lote con stock está dado de baja (el vencido sigue vigente hasta la depuración)
+        self.assertEqual(response.status_code, 201, response.content)
+        self.vencido.refresh_from_db()
+        self.assertEqual(self.vencido.stock_actual, 3)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class PerfiladoTests(TestCase):
+
+    def setUp(self):
+        self.pan = Producto.objects.create(nombre='Marraqueta', precio=1000, categoria=Categoria.objects.create(nombre='Panes'))
+        Lote.objects.create(producto=self.pan, fecha_caducidad=date.today() + timedelta(days=3), stock_actual=50)
+
+    def vender(self, **extra):
+        return self.client.post(reverse('checkout'), {
+            'items': [{'producto_id': self.pan.id, 'cantidad': 1, 'precio_unitario': 1000}],
+        }, content_type='application/json', **extra)
+
+    def test_sin_pedirlo_no_se_perfila(self):
+        with mock.patch('cProfile.Profile') as perfilador:
+            response = self.vender(HTTP_X_PERFIL='firma-falsa')
+            self.assertEqual(self.client.get('/pos/productos/?perfilar=1').status_code, 200)
+        self.assertEqual(response.status_code, 201)
+        perfilador.assert_not_called()
+        self.assertFalse(response.has_header('X-Perfil-Id'))
+        self.assertFalse(PerfilPeticion.objects.exists())
+
+    def test_cabecera_firmada_guarda_arbol_y_sql(self):
+        response = self.vender(HTTP_X_PERFIL=perfilado.firmar())
+        self.assertEqual(response.status_code, 201, response.content)
+
+        perfil = PerfilPeticion.objects.get(pk=response['X-Perfil-Id'])
+        self.assertEqual((perfil.metodo, perfil.ruta, perfil.estado, perfil.disparador), ('POST', '/pos/checkout/', 201, 'firma'))
+        self.assertEqual(perfil.cantidad_consultas, len(perfil.sql))
+        self.assertTrue(any(c['sql'].startswith('INSERT INTO "pos_venta"') for c in perfil.sql))
+        inicios = [c['inicio'] for c in perfil.sql]
+        self.assertEqual(inicios, sorted(inicios))
+
+        def nombres(nodo):
+            yield nodo['n']
+            for hijo in nodo['c']:
+                yield from nombres(hijo)
+        self.assertIn('checkout', set(nombres(perfil.arbol)))
+        self.assertTrue(all(h['v'] <= perfil.arbol['v'] + 0.01 for h in perfil.arbol['c']))
+
+    def test_parametro_solo_para_staff_y_pagina(self):
+        usuario = User.objects.create_user('cajero', password='x')
+        self.client.force_login(usuario)
+        self.assertFalse(self.client.get('/pos/productos/?perfilar=1').has_header('X-Perfil-Id'))
+        self.assertEqual(self.client.get(reverse('perfiles')).status_code, 302)
+
+        usuario.is_staff = True
+        usuario.save()
+        response = self.client.get('/pos/productos/?perfilar=1')
+        perfil = PerfilPeticion.objects.get(pk=response['X-Perfil-Id'])
+        self.assertEqual(perfil.disparador, 'staff:cajero')
+        self.assertContains(self.client.get(reverse('perfiles')), reverse('perfil', args=[perfil.pk]))
+        self.assertContains(self.client.get(reverse('perfil', args=[perfil.pk])), 'perfil-arbol')
@@ -20,6 +20,25 @@ router.register(r'turnos', views.TurnoViewSet)
 
 urlpatterns = [
     path('checkout/', views.checkout, name='checkout'),
+    path('catalogo/cambios/', views.catalogo_cambios, name='catalogo-cambios'),
+    path('escanear/<str:codigo>/', views.escanear, name='escanear'),
+    path('ventas/<int:pk>/boleta/', views.boleta_venta, name='boleta-venta'),
+    path('caja/abrir/', views.caja_abrir, name='caja-abrir'),
+    path('caja/cuadratura/', views.caja_cuadratura, name='caja-cuadratura'),
+    path('caja/<int:pk>/', views.caja_sesion, name='caja-sesion'),
+    path('caja/<int:pk>/cerrar/', views.caja_cerrar, name='caja-cerrar'),
+    path('tablero/', views.tablero_pagina, name='tablero'),
+    path('tablero/eventos/', views.tablero_eventos, name='tablero-eventos'),
+    path('perfiles/', views.perfiles_lista, name='perfiles'),
+    path('perfiles/<int:pk>/', views.perfil_detalle, name='perfil'),
+    path('clientes/rut/<str:rut>/', views.cliente_por_rut, name='cliente-por-rut'),
+    path('precios/ajustar/', views.ajustar_precios, name='ajustar-precios'),
+    path('productos/<int:pk>/precios/', views.historial_precios, name='historial-precios'),
+    path('produccion/plan/', views.plan_produccion, name='plan-produccion'),
+    path('analitica/personal/', views.analitica_personal, name='analitica-personal'),
+    path('reportes/', views.reportes_solicitar, name='reportes'),
+    path('reportes/<int:pk>/', views.reporte_estado, name='reporte-estado'),
+    path('reportes/<int:pk>/descarga/', views.reporte_descarga, name='reporte-descarga'),
     path('', include(router.urls)),
     path("sistema/", views.inicio, name='inicio')
 ]
@@ -1,24 +1,43 @@
-from django.shortcuts import render
-import requests
+import asyncio
+import base64
+import logging
+import math
+from asgiref.sync import sync_to_async
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, render
+from django.urls import reverse
 from rest_framework import viewsets
 from rest_framework.decorators import api_view
 from django.views.decorators.csrf import csrf_exempt
 from rest_framework.response import Response
 from rest_framework import status
-from django.db import transaction
+from django.db import DatabaseError, transaction
 from decimal import Decimal
+from datetime import date, datetime, time, timedelta
 from django.utils import timezone
 from django.core.paginator import Paginator
+from django.conf import settings
+from urllib.parse import urlencode
 from .serializer import *
 from .models import *
-
-# Nota: la vista `inicio` intentará usar ORM para obtener productos y categorías
-# (más rápido y seguro), y caerá de forma silenciosa al fallback HTTP a la API si
-# por alguna razón la consulta ORM falla (por ejemplo, durante despliegues o tests aislados).
-# Create your views here.
+from .cache import versiones_productos
+from . import pagos as pagos_venta
+from . import (
+    analitica, autenticacion, boleta, caja, catalogo, clientes, escaneo, eventos, precios, pronostico, reportes, sucursales,
+    tablero,
+)
+from .sucursales import PorSucursalMixin
+from .vuelo_unico import ListadoCompartidoMixin
+
+# Nota: la vista `inicio` obtiene productos y categorías por ORM. Si la base de
+# datos falla, sirve el último snapshot bueno del catálogo (ver pos.catalogo) y lo
+# refresca en segundo plano; nunca se llama a sí misma por HTTP.
+logger = logging.getLogger(__name__)
 
 #API REST
-class CategoriaViewSet(viewsets.ModelViewSet):
+class CategoriaViewSet(ListadoCompartidoMixin, viewsets.ModelViewSet):
     queryset = Categoria.objects.all()
     serializer_class = CategoriaSerializer
 
@@ -26,11 +45,11 @@ class NutricionalViewSet(viewsets.ModelViewSet):
     queryset = Nutricional.objects.all()
     serializer_class = NutricionalSerializer
 
-class LoteViewSet(viewsets.ModelViewSet):
+class LoteViewSet(PorSucursalMixin, viewsets.ModelViewSet):
     queryset = Lote.objects.all()
     serializer_class = LoteSerializer
     
-class ProductoViewSet(viewsets.ModelViewSet):
+class ProductoViewSet(ListadoCompartidoMixin, viewsets.ModelViewSet):
     queryset = Producto.objects.all()
     serializer_class = ProductoSerializer
 
@@ -42,21 +61,23 @@ class ClienteViewSet(viewsets.ModelViewSet):
     queryset = Cliente.objects.all()
     serializer_class = ClienteSerializer
 
-class VentaViewSet(viewsets.ModelViewSet):
+class VentaViewSet(PorSucursalMixin, viewsets.ModelViewSet):
     queryset = Venta.objects.all()
     serializer_class = VentaSerializer
 
 
 
-class PagoViewSet(viewsets.ModelViewSet):
+class PagoViewSet(PorSucursalMixin, viewsets.ModelViewSet):
     queryset = Pago.objects.all()
     serializer_class = PagoSerializer
+    campo_sucursal = 'venta__sucursal_id'
 
-class DetalleVentaViewSet(viewsets.ModelViewSet):
+class DetalleVentaViewSet(PorSucursalMixin, viewsets.ModelViewSet):
     queryset = DetalleVenta.objects.all()
     serializer_class = DetalleVentaSerializer
+    campo_sucursal = 'venta__sucursal_id'
 
-class MovimientoInventarioViewSet(viewsets.ModelViewSet):
+class MovimientoInventarioViewSet(PorSucursalMixin, viewsets.ModelViewSet):
     queryset = MovimientoInventario.objects.all()
     serializer_class = MovimientoInventarioSerializer
 
@@ -70,55 +91,295 @@ class TurnoViewSet(viewsets.ModelViewSet):
     
     
 def inicio(request):
-    # Intentar obtener datos por ORM
+    buscar = request.GET.get("buscar", "").strip()
+    categoria_filtro = request.GET.get("categorias", "").strip()
+    catalogo_desactualizado = False
+
     try:
-        categorias_qs = Categoria.objects.all()
-        productos_qs = Producto.objects.select_related('categoria').prefetch_related('lotes').all()
-
-        # Filtros
-        buscar = request.GET.get("buscar", "").strip()
-        categoria_filtro = request.GET.get("categorias", "").strip()
-
-        if buscar:
-            productos_qs = productos_qs.filter(models.Q(nombre__icontains=buscar) | models.Q(codigo_barra__startswith=buscar))
-
-        if categoria_filtro:
-            productos_qs = productos_qs.filter(categoria__id=categoria_filtro)
-
-        # Convertir a lista de dicts tal como la plantilla espera (campos mínimos)
-        productos = []
-        for p in productos_qs:
-            productos.append({
-                'id': p.id,
-                'nombre': p.nombre,
-                'codigo_barra': p.codigo_barra,
-                'precio': float(p.precio) if p.precio is not None else 0,
-                'stock_total': p.stock_total(),
-                'categoria': p.categoria.id if p.categoria else None,
-            })
-
-        categorias = [{'id': c.id, 'nombre': c.nombre} for c in categorias_qs]
-
-    except Exception:
-        # Fallback: usar API HTTP si algo falla con la ORM (evita romper la vista)
-        try:
-            productos = requests.get("http://127.0.0.1:8000/pos/productos/").json()
-            categorias = requests.get("http://127.0.0.1:8000/pos/categorias/").json()
-        except Exception:
-            productos = []
-            categorias = []
+        productos, categorias = catalogo.productos_para_venta(buscar, categoria_filtro)
+        if not buscar and not categoria_filtro:
+            # La vista sin filtros ya trae el catálogo completo: sirve como snapshot sin costo extra
+            catalogo.snapshot.guardar(productos, categorias)
+        elif catalogo.snapshot.vencido():
+            catalogo.snapshot.refrescar_en_segundo_plano()
+    except DatabaseError:
+        # Base de datos caída: servir el último catálogo bueno conocido mientras
+        # un hilo reintenta la carga, sin bloquear el worker.
+        logger.warning("inicio: catálogo servido desde snapshot por error de base de datos", exc_info=True)
+        catalogo.snapshot.refrescar_en_segundo_plano()
+        productos, categorias = catalogo.snapshot.obtener()
+        productos = catalogo.filtrar_productos(productos, buscar, categoria_filtro)
+        catalogo_desactualizado = True
 
     # Paginación: 8 productos por página
     paginator = Paginator(productos, 8)
     page_number = request.GET.get("page")
     page_obj = paginator.get_page(page_number)
 
+    # Versión de cada tarjeta de la página: si el producto y sus lotes no
+    # cambiaron, la plantilla sirve el fragmento ya renderizado desde el cache.
+    # (copias: los dicts pueden pertenecer al snapshot compartido entre threads)
+    versiones = versiones_productos([p['id'] for p in page_obj])
+    page_obj.object_list = [dict(p, version=versiones[p['id']]) for p in page_obj.object_list]
+
+    # Query string de filtros armado una sola vez para todos los enlaces de paginación
+    filtros = {campo: valor for campo, valor in (("buscar", buscar), ("categorias", categoria_filtro)) if valor}
+
     return render(request, "pos.html", {
         "categorias": categorias,
-        "page_obj": page_obj
+        "page_obj": page_obj,
+        "query_filtros": "&" + urlencode(filtros) if filtros else "",
+        "tarjetas_ttl": settings.POS_TARJETAS_CACHE_SEGUNDOS,
+        # el stock de la tarjeta es el de la sucursal: parte de la clave del fragmento
+        "sucursal": sucursales.actual(),
+        "catalogo_desactualizado": catalogo_desactualizado,
+    })
+
+
+@api_view(['GET'])
+def catalogo_cambios(request):
+    """Cambios del catálogo desde el cursor ``?desde=`` (sin cursor: catálogo completo).
+
+    Respuesta: {cursor, completo, categorias, productos, lotes, eliminados}. El
+    cliente debe guardar ``cursor`` y enviarlo en la siguiente llamada.
+    """
+    try:
+        desde = catalogo.leer_cursor(request.GET.get('desde'))
+    except ValueError as ve:
+        return Response({'detail': str(ve)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(catalogo.cambios_desde(desde))
+
+
+@api_view(['GET'])
+def escanear(request, codigo):
+    """Producto por código de barras: {id, nombre, precio, stock}. 404 si no existe."""
+    datos = escaneo.buscar(codigo)
+    if datos is None:
+        return Response({'detail': 'Código no registrado'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(datos)
+
+
+@api_view(['GET'])
+def cliente_por_rut(request, rut):
+    """Cliente y sus métricas de fidelización por RUT, en cualquier formato. 404 si no existe."""
+    cliente = Cliente.objects.filter(rut=normalizar_rut(rut)).first()
+    if cliente is None:
+        return Response({'detail': 'Cliente no registrado'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(ClienteSerializer(cliente).data)
+
+
+@api_view(['POST'])
+def ajustar_precios(request):
+    """Ajuste masivo de precios en un solo UPDATE, con historial. Solo staff o con ``pos.change_producto``.
+
+    Payload: {"categoria": 3, "marca": "...", "tipo": "...", "porcentaje": -10 | "monto": 200,
+    "motivo": "..."}. Se exige al menos un filtro, o "todos": true para el catálogo completo.
+    """
+    if not (request.user.is_staff or request.user.has_perm('pos.change_producto')):
+        return Response({'detail': 'No tiene permiso para ajustar precios'}, status=status.HTTP_403_FORBIDDEN)
+    data = request.data
+    filtros = {campo: data.get(campo) for campo in precios.FILTROS if data.get(campo) not in (None, '')}
+    if not filtros and data.get('todos') is not True:
+        return Response({'detail': 'Indique categoria, marca o tipo (o "todos": true)'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    try:
+        resultado = precios.ajustar_precios(
+            filtros, porcentaje=data.get('porcentaje'), monto=data.get('monto'),
+            motivo=data.get('motivo') or '',
+            usuario=request.user if request.user.is_authenticated else None,
+        )
+    except (ValueError, ArithmeticError) as ve:
+        return Response({'detail': str(ve)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(resultado)
+
+
+@api_view(['GET'])
+def historial_precios(request, pk):
+    """Últimos cambios de precio de un producto, del más reciente al más antiguo."""
+    cambios = (
+        HistorialPrecio.objects.filter(producto_id=pk).order_by('-fecha', '-id')
+        .values('fecha', 'precio_anterior', 'precio_nuevo', 'operacion', 'motivo')[:100]
+    )
+    return Response([
+        dict(c, precio_anterior=str(c['precio_anterior']), precio_nuevo=str(c['precio_nuevo'])) for c in cambios
+    ])
+
+
+@api_view(['GET'])
+def plan_produccion(request):
+    """Plan de producción para ``?fecha=AAAA-MM-DD`` (por defecto mañana).
+
+    Parámetros opcionales: ``semanas`` de historia por día de la semana (1-104,
+    por defecto 8) y ``z`` para el stock de seguridad (por defecto 1.65, ~95%).
+    """
+    try:
+        fecha_param = request.GET.get('fecha')
+        fecha = date.fromisoformat(fecha_param) if fecha_param else timezone.localdate() + timedelta(days=1)
+        semanas = int(request.GET.get('semanas', 8))
+        z = float(request.GET.get('z', pronostico.Z_SERVICIO))
+        if not 1 <= semanas <= 104:
+            raise ValueError('semanas debe estar entre 1 y 104')
+        if not (math.isfinite(z) and z >= 0):
+            raise ValueError('z debe ser un número finito mayor o igual a 0')
+    except ValueError as ve:
+        return Response({'detail': str(ve)}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({
+        'fecha': fecha,
+        'semanas': semanas,
+        'productos': pronostico.plan_produccion(fecha, semanas=semanas, z=z),
     })
 
 
+@api_view(['GET'])
+def analitica_personal(request):
+    """Ventas, tickets y unidades por hora trabajada entre ``?desde`` y ``?hasta``.
+
+    Las fechas son AAAA-MM-DD; ``hasta`` es exclusiva. Por defecto, los últimos 30 días.
+    """
+    try:
+        hasta_param = request.GET.get('hasta')
+        desde_param = request.GET.get('desde')
+        hasta = date.fromisoformat(hasta_param) if hasta_param else timezone.localdate() + timedelta(days=1)
+        desde = date.fromisoformat(desde_param) if desde_param else hasta - timedelta(days=30)
+        if desde >= hasta:
+            raise ValueError('desde debe ser anterior a hasta')
+    except ValueError as ve:
+        return Response({'detail': str(ve)}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response(dict(analitica.productividad_personal(desde, hasta), desde=desde, hasta=hasta))
+
+
+def _estado_reporte(request, trabajo, reutilizado=False):
+    datos = {
+        'id': trabajo.id,
+        'tipo': trabajo.tipo,
+        'parametros': trabajo.parametros,
+        'estado': trabajo.estado,
+        'reutilizado': reutilizado,
+        'creado': trabajo.creado,
+        'terminado': trabajo.terminado,
+        'error': trabajo.error or None,
+        'descarga': None,
+    }
+    if trabajo.estado == 'listo':
+        datos['descarga'] = request.build_absolute_uri(reverse('reporte-descarga', args=[trabajo.id]))
+    return datos
+
+
+@api_view(['GET', 'POST'])
+def reportes_solicitar(request):
+    """GET: tipos disponibles. POST ``{"tipo": ..., "parametros": {...}}``: encola el reporte.
+
+    Responde 202 con el trabajo a consultar en /pos/reportes/<id>/; si ya existe
+    uno idéntico sobre un período cerrado, responde 200 con ese trabajo.
+    """
+    if request.method == 'GET':
+        return Response({'tipos': reportes.tipos()})
+    try:
+        trabajo, reutilizado = reportes.solicitar(
+            request.data.get('tipo'), request.data.get('parametros'), usuario=request.user,
+        )
+    except ValueError as ve:
+        return Response({'detail': str(ve)}, status=status.HTTP_400_BAD_REQUEST)
+    if reutilizado and trabajo.estado == 'listo':
+        reportes.registrar_acceso(trabajo)
+    return Response(
+        _estado_reporte(request, trabajo, reutilizado),
+        status=status.HTTP_200_OK if reutilizado else status.HTTP_202_ACCEPTED,
+    )
+
+
+@api_view(['GET'])
+def reporte_estado(request, pk):
+    trabajo = TrabajoReporte.objects.filter(pk=pk).first()
+    if trabajo is None:
+        return Response({'detail': 'Reporte no encontrado'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(_estado_reporte(request, trabajo))
+
+
+@api_view(['GET'])
+def reporte_descarga(request, pk):
+    trabajo = TrabajoReporte.objects.filter(pk=pk).first()
+    if trabajo is None:
+        return Response({'detail': 'Reporte no encontrado'}, status=status.HTTP_404_NOT_FOUND)
+    if trabajo.estado != 'listo':
+        return Response({'detail': f'El reporte está {trabajo.get_estado_display().lower()}'},
+                        status=status.HTTP_409_CONFLICT)
+    reportes.registrar_acceso(trabajo)
+    return FileResponse(trabajo.archivo.open('rb'), as_attachment=True,
+                        filename=f'{trabajo.tipo}-{trabajo.id}.csv', content_type='text/csv')
+
+
+@api_view(['GET'])
+def boleta_venta(request, pk):
+    """Comprobante de una venta: ``?formato=escpos`` (bytes para la impresora) o ``html``."""
+    formato = request.query_params.get('formato', 'escpos')
+    if formato not in ('escpos', 'html'):
+        return Response({'detail': 'formato debe ser escpos o html'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        datos = boleta.datos_venta(pk, sucursal_id=sucursales.actual_id())
+    except Venta.DoesNotExist:
+        return Response({'detail': 'Venta no encontrada'}, status=status.HTTP_404_NOT_FOUND)
+    if formato == 'html':
+        return HttpResponse(boleta.html_boleta(datos), content_type='text/html; charset=utf-8')
+    return HttpResponse(boleta.escpos(datos), content_type='application/octet-stream')
+
+
+@api_view(['POST'])
+def caja_abrir(request):
+    """Abre una caja. Payload: {"terminal": "caja-1", "fondo_inicial": 20000, "empleado_id": 3}.
+
+    Sin empleado_id se usa el empleado del usuario autenticado.
+    """
+    data = request.data
+    if data.get('empleado_id'):
+        empleado = Empleado.objects.filter(pk=data['empleado_id']).first()
+    else:
+        empleado = autenticacion.empleado_de(request.user)
+    if empleado is None:
+        return Response({'detail': 'Empleado no encontrado'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        sesion = caja.abrir(data.get('terminal'), empleado, data.get('fondo_inicial'), sucursales.actual_id())
+    except (ValueError, ArithmeticError) as ve:
+        return Response({'detail': str(ve)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(caja.resumen(sesion), status=status.HTTP_201_CREATED)
+
+
+@api_view(['GET'])
+def caja_sesion(request, pk):
+    sesion = SesionCaja.objects.select_related('empleado').filter(pk=pk, sucursal_id=sucursales.actual_id()).first()
+    if sesion is None:
+        return Response({'detail': 'Sesión no encontrada'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(caja.resumen(sesion))
+
+
+@api_view(['POST'])
+def caja_cerrar(request, pk):
+    """Cierra la caja. Payload: {"efectivo_contado": 85000, "observacion": "..."}."""
+    if request.data.get('efectivo_contado') in (None, ''):
+        return Response({'detail': 'Indique efectivo_contado'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        sesion = caja.cerrar(pk, request.data['efectivo_contado'], request.data.get('observacion') or '',
+                             sucursales.actual_id())
+    except SesionCaja.DoesNotExist:
+        return Response({'detail': 'Sesión no encontrada'}, status=status.HTTP_404_NOT_FOUND)
+    except (ValueError, ArithmeticError) as ve:
+        return Response({'detail': str(ve)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(caja.resumen(sesion))
+
+
+@api_view(['GET'])
+def caja_cuadratura(request):
+    """Cierres del día ``?fecha=AAAA-MM-DD`` (por defecto hoy) de la sucursal, con sus diferencias."""
+    try:
+        fecha = date.fromisoformat(request.GET['fecha']) if request.GET.get('fecha') else timezone.localdate()
+    except ValueError as ve:
+        return Response({'detail': str(ve)}, status=status.HTTP_400_BAD_REQUEST)
+    desde = timezone.make_aware(datetime.combine(fecha, time.min))
+    return Response(dict(caja.cuadratura(desde, desde + timedelta(days=1), sucursales.actual_id()), fecha=fecha))
+
+
 @csrf_exempt
 @api_view(['POST'])
 def checkout(request):
@@ -128,15 +389,22 @@ def checkout(request):
     {
       "canal_venta": "presencial",
       "cliente_rut": "12345678-9",          # opcional
-      "monto_pagado": 10000,                 # opcional (number)
+      "pagos": [                             # opcional, uno o más medios de pago
+         {"metodo": "DEB", "monto": 5000, "referencia": "123456"},
+         {"metodo": "EFE", "monto": 10000}
+      ],
+      "monto_pagado": 10000,                 # opcional, equivale a un solo pago EFE
+      "boleta": "html",                      # opcional: "html" o "escpos" (base64)
+      "sesion_caja": 7,                      # opcional, suma la venta a la caja abierta
       "items": [
          {"producto_id": 1, "cantidad": 2, "precio_unitario": 1200, "descuento_pct": 0},
          ...
       ]
     }
 
-    Crea Venta y DetalleVenta dentro de una transacción atómica y consume stock
-    usando Venta.actualizar_stock(). Retorna JSON con id/folio/total/vuelto.
+    Crea Venta, DetalleVenta y Pago dentro de una transacción atómica y consume
+    stock usando Venta.actualizar_stock(). Retorna JSON con id/folio/total/vuelto
+    y, si se pidió, el comprobante ya renderizado (sin releer la venta).
     """
     data = request.data
     items = data.get('items') or []
@@ -145,15 +413,24 @@ def checkout(request):
 
     canal = data.get('canal_venta', 'presencial')
     cliente_rut = data.get('cliente_rut')
-    monto_pagado = data.get('monto_pagado')
+    sesion_id = data.get('sesion_caja')
+    tenders = data.get('pagos') or []
+    if not tenders and data.get('monto_pagado') is not None:
+        # Compatibilidad: un monto_pagado solo es un pago en efectivo
+        tenders = [{'metodo': 'EFE', 'monto': data.get('monto_pagado')}]
 
+    venta = None
     try:
         # calcular totales con Decimal
         subtotal = Decimal('0')
         descuento_total = Decimal('0')
         detalles_to_create = []
         for it in items:
-            pid = it.get('producto_id')
+            # La UI envía el id como texto (data-id): se normaliza una vez para todo el checkout
+            try:
+                pid = int(it.get('producto_id'))
+            except (TypeError, ValueError):
+                raise ValueError(f"producto_id inválido: {it.get('producto_id')!r}")
             qty = int(it.get('cantidad', 0))
             precio = Decimal(str(it.get('precio_unitario', '0')))
             desc_pct = Decimal(str(it.get('descuento_pct') or 0))
@@ -171,11 +448,9 @@ def checkout(request):
 
         monto_pagado_dec = None
         vuelto = None
-        if monto_pagado is not None:
-            monto_pagado_dec = Decimal(str(monto_pagado)).quantize(Decimal('0.01'))
-            if monto_pagado_dec < total_con_iva:
-                return Response({'detail': 'El monto pagado es menor al total'}, status=status.HTTP_400_BAD_REQUEST)
-            vuelto = (monto_pagado_dec - total_con_iva).quantize(Decimal('0.01'))
+        pagos = []
+        if tenders:
+            pagos, monto_pagado_dec, vuelto = pagos_venta.repartir(tenders, total_con_iva)
 
         with transaction.atomic():
             venta = Venta.objects.create(
@@ -186,19 +461,21 @@ def checkout(request):
                 total_con_iva=total_con_iva,
                 canal_venta=canal,
                 monto_pagado=monto_pagado_dec,
-                vuelto=vuelto
+                vuelto=vuelto,
+                total_pagado=sum((p['monto'] for p in pagos), Decimal('0')),
+                # si viene cliente_rut, enlazar cliente (normalizado y cacheado)
+                cliente_id=clientes.resolver_cliente_id(cliente_rut) if cliente_rut else None,
+                sesion_caja_id=sesion_id,
+                sucursal_id=sucursales.actual_id(),
+                # el empleado viene precargado con el usuario autenticado (pos.autenticacion)
+                empleado=autenticacion.empleado_de(request.user),
             )
 
-            # si viene cliente_rut, enlazar cliente
-            if cliente_rut:
-                from .models import Cliente
-                cliente, created = Cliente.objects.get_or_create(rut=cliente_rut, defaults={'nombre': None, 'correo': None})
-                venta.cliente = cliente
-                venta.save(update_fields=['cliente'])
-
             # crear detalles
+            nombres = {}
             for d in detalles_to_create:
                 prod = Producto.objects.get(id=d['producto_id'])
+                nombres[prod.id] = prod.nombre
                 DetalleVenta.objects.create(
                     venta=venta,
                     producto=prod,
@@ -207,6 +484,10 @@ def checkout(request):
                     descuento_pct=d['descuento_pct']
                 )
 
+            Pago.objects.bulk_create([Pago(venta=venta, **p) for p in pagos])
+            if sesion_id:
+                caja.registrar_venta(sesion_id, pagos, venta.sucursal_id)
+
             # recalcular y guardar totales por si hay reglas adicionales
             venta.calcular_totales_desde_detalles()
 
@@ -217,17 +498,116 @@ def checkout(request):
             venta.folio = f"V{venta.id:06d}"
             venta.save(update_fields=['folio'])
 
-        resp = {
-            'id': venta.id,
-            'folio': venta.folio,
-            'total_con_iva': str(venta.total_con_iva),
-            'vuelto': str(venta.vuelto) if venta.vuelto is not None else None
-        }
-        return Response(resp, status=status.HTTP_201_CREATED)
+            # métricas del cliente, resúmenes, alertas y caches: en el worker del outbox
+            eventos.publicar_venta(venta, detalles_to_create)
+            # totales en memoria del tablero en vivo, solo si la venta se confirma
+            transaction.on_commit(lambda: tablero.registrar_venta(venta, detalles_to_create, nombres), robust=True)
 
-    except Producto.DoesNotExist:
-        return Response({'detail': 'Producto no encontrado'}, status=status.HTTP_400_BAD_REQUEST)
-    except ValueError as ve:
-        return Response({'detail': str(ve)}, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
-        return Response({'detail': 'Error al procesar la venta', 'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+        if venta is None or not Venta.objects.filter(pk=venta.pk).exists():
+            if isinstance(e, Producto.DoesNotExist):
+                return Response({'detail': 'Producto no encontrado'}, status=status.HTTP_400_BAD_REQUEST)
+            if isinstance(e, ValueError):
+                return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            return Response({'detail': 'Error al procesar la venta', 'error': str(e)},
+                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        # Falló un aviso posterior al commit: la venta existe y un reintento la duplicaría
+        logger.exception("checkout: la venta %s quedó confirmada pero falló un paso posterior", venta.pk)
+
+    resp = {
+        'id': venta.id,
+        'folio': venta.folio,
+        'total_con_iva': str(venta.total_con_iva),
+        'vuelto': str(venta.vuelto) if venta.vuelto is not None else None
+    }
+    formato = data.get('boleta')
+    if formato in ('html', 'escpos'):
+        try:
+            datos = boleta.armar_datos(
+                venta,
+                [(d['cantidad'], nombres[d['producto_id']], d['precio_unitario'], d['descuento_pct'])
+                 for d in detalles_to_create],
+                [(p['metodo'], p['monto']) for p in pagos],
+                cliente_rut=normalizar_rut(cliente_rut) if cliente_rut else None,
+            )
+            resp['boleta_formato'] = formato
+            if formato == 'html':
+                resp['boleta'] = boleta.html_boleta(datos)
+            else:
+                resp['boleta'] = base64.b64encode(boleta.escpos(datos)).decode('ascii')
+        except Exception:
+            # La boleta se puede reimprimir desde boleta-venta; la venta ya está hecha
+            logger.exception("checkout: no se pudo armar la boleta de la venta %s", venta.pk)
+            resp['boleta_error'] = 'No se pudo generar la boleta'
+    return Response(resp, status=status.HTTP_201_CREATED)
+
+
+# --- Tablero en vivo (Server-Sent Events, ver pos.tablero) ---
+@staff_member_required
+def tablero_pagina(request):
+    return render(request, 'tablero.html')
+
+
+def _evento_sse(version, datos, retry=None):
+    prefijo = f'retry: {retry}\n'.encode() if retry else b''
+    return prefijo + b'id: %d\nevent: totales\ndata: %s\n\n' % (version, datos)
+
+
+async def tablero_eventos(request):
+    """Totales del día de la sucursal como Server-Sent Events.
+
+    Es una vista async de Django (DRF no las tiene): en ASGI cada tablero
+    abierto es una corrutina que duerme entre revisiones, sin ocupar un hilo.
+    Bajo WSGI envía una sola foto y pide al navegador reconectar en
+    ``POS_TABLERO_RETRY_MS``, un sondeo que tampoco consulta la base.
+    """
+    user = await request.auser()
+    if not (user.is_authenticated and user.is_staff):
+        return JsonResponse({'detail': 'Solo para encargados'}, status=403)
+    # se lee aquí: el middleware suelta la sucursal antes de que corra el flujo
+    sucursal_id = await sync_to_async(sucursales.actual_id)()
+
+    if not isinstance(request, ASGIRequest):
+        if tablero.necesita_semilla(sucursal_id):
+            await sync_to_async(tablero.sembrar)(sucursal_id)
+        version, datos = tablero.foto(sucursal_id)
+        retry = getattr(settings, 'POS_TABLERO_RETRY_MS', 5000)
+        return HttpResponse(_evento_sse(version, datos, retry), content_type='text/event-stream')
+
+    response = StreamingHttpResponse(_flujo_tablero(sucursal_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # nginx no debe acumular los eventos
+    return response
+
+
+async def _flujo_tablero(sucursal_id):
+    intervalo = getattr(settings, 'POS_TABLERO_INTERVALO', 1.0)
+    latido = getattr(settings, 'POS_TABLERO_LATIDO', 15.0)
+    enviada, silencio = None, 0.0
+    while True:
+        if tablero.necesita_semilla(sucursal_id):
+            await sync_to_async(tablero.sembrar)(sucursal_id)
+        if tablero.version(sucursal_id) != enviada:
+            enviada, datos = tablero.foto(sucursal_id)
+            yield _evento_sse(enviada, datos)
+            silencio = 0.0
+        elif silencio >= latido:
+            # comentario SSE: mantiene viva la conexión a través de proxies
+            yield b': latido\n\n'
+            silencio = 0.0
+        await asyncio.sleep(intervalo)
+        silencio += intervalo
+
+
+
+# --- Perfiles de peticiones (ver pos.perfilado) ---
+@staff_member_required
+def perfiles_lista(request):
+    perfiles = PerfilPeticion.objects.defer('arbol', 'funciones', 'sql')[:100]
+    return render(request, 'perfiles.html', {'perfiles': perfiles})
+
+
+@staff_member_required
+def perfil_detalle(request, pk):
+    perfil = get_object_or_404(PerfilPeticion, pk=pk)
+    return render(request, 'perfil.html', {'perfil': perfil})
@@ -0,0 +1,117 @@
+"""Vuelo único (single-flight) para lecturas caras de la API.
+
+Al abrir el local decenas de terminales piden el mismo listado a la vez. Con
+``compartir`` solo una petición calcula el resultado:
+
+- en el proceso, las peticiones idénticas concurrentes esperan el cálculo de
+  la primera (un ``threading.Event`` por clave);
+- entre procesos, quien calcula toma un candado en el cache compartido
+  (``cache.add``); los demás procesos esperan a que el resultado aparezca en
+  el cache en vez de recalcularlo.
+
+El resultado queda en el cache ``ttl`` segundos. La clave debe incluir las
+versiones de los datos (``pos.cache.version_listados``) para que un cambio la
+deje obsoleta de inmediato.
+"""
+import hashlib
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+from . import sucursales
+from .cache import version_listados
+
+logger = logging.getLogger(__name__)
+
+_FALTA = object()
+_vuelos = {}
+_lock = threading.Lock()
+
+
+class _Vuelo:
+    def __init__(self):
+        self.listo = threading.Event()
+        self.resultado = None
+        self.error = None
+
+
+def _config(nombre, defecto):
+    return getattr(settings, nombre, defecto)
+
+
+def compartir(clave, calcular, ttl=None):
+    """Resultado de ``calcular()`` para ``clave``, calculado una sola vez entre peticiones concurrentes."""
+    resultado = cache.get(clave, _FALTA)
+    if resultado is not _FALTA:
+        return resultado
+
+    with _lock:
+        vuelo = _vuelos.get(clave)
+        lider = vuelo is None
+        if lider:
+            vuelo = _vuelos[clave] = _Vuelo()
+
+    if not lider:
+        vuelo.listo.wait()
+        if vuelo.error is not None:
+            raise vuelo.error
+        return vuelo.resultado
+
+    try:
+        vuelo.resultado = _calcular_una_vez(clave, calcular, ttl)
+        return vuelo.resultado
+    except Exception as exc:
+        vuelo.error = exc
+        raise
+    finally:
+        with _lock:
+            del _vuelos[clave]
+        vuelo.listo.set()
+
+
+def _calcular_una_vez(clave, calcular, ttl):
+    """Calcula con el candado entre procesos, o espera el resultado de quien lo tiene."""
+    ttl = ttl or _config('POS_VUELO_UNICO_SEGUNDOS', 60)
+    bloqueo = _config('POS_VUELO_UNICO_BLOQUEO_SEGUNDOS', 30)
+    candado = f'{clave}:candado'
+
+    if not cache.add(candado, 1, timeout=bloqueo):
+        # Otro proceso está calculando: esperar su resultado hasta que venza su candado
+        limite = time.monotonic() + bloqueo
+        while time.monotonic() < limite:
+            time.sleep(_config('POS_VUELO_UNICO_SONDEO_SEGUNDOS', 0.05))
+            resultado = cache.get(clave, _FALTA)
+            if resultado is not _FALTA:
+                return resultado
+            if cache.add(candado, 1, timeout=bloqueo):
+                break  # el otro proceso terminó sin resultado (error): calcular aquí
+        else:
+            logger.warning("vuelo único: se venció la espera de %s, se calcula en este proceso", clave)
+            cache.add(candado, 1, timeout=bloqueo)
+
+    try:
+        resultado = calcular()
+        cache.set(clave, resultado, timeout=ttl)
+        return resultado
+    finally:
+        cache.delete(candado)
+
+
+class ListadoCompartidoMixin:
+    """Para ViewSets de catálogo: ``list`` pasa por ``compartir``.
+
+    La clave incluye la ruta con sus parámetros, la sucursal (el stock es por
+    sucursal) y la versión de los listados del catálogo.
+    """
+
+    def list(self, request, *args, **kwargs):
+        consulta = sorted(request.query_params.lists())
+        descriptor = f'{request.path}|{consulta}|{sucursales.actual()}|{version_listados()}'
+        # en hash: memcached no acepta espacios ni claves de más de 250 caracteres
+        clave = 'pos:vuelo:' + hashlib.sha1(descriptor.encode()).hexdigest()
+        datos = compartir(clave, lambda: super(ListadoCompartidoMixin, self).list(request, *args, **kwargs).data)
+        return Response(datos)
@@ -0,0 +1,55 @@
+// Flame graph y línea de tiempo SQL de un perfil (pos/perfilado.py)
+const ALTO_FILA = 18;
+
+function colorDe(nodo) {
+  // Código propio en tonos cálidos; Django, librerías y built-ins en grises
+  if (/^(pos|inventario|forneria)\//.test(nodo.f)) return `hsl(${20 + (nodo.n.length * 7) % 30}, 85%, 62%)`;
+  return `hsl(0, 0%, ${70 + (nodo.n.length * 3) % 20}%)`;
+}
+
+function profundidad(nodo) {
+  return 1 + Math.max(0, ...nodo.c.map(profundidad));
+}
+
+function dibujarFlame(contenedor, raiz) {
+  contenedor.replaceChildren();
+  contenedor.style.height = `${profundidad(raiz) * ALTO_FILA}px`;
+  const dibujar = (nodo, x, ancho, nivel) => {
+    if (ancho < 0.05) return;
+    const div = document.createElement('div');
+    div.style.left = `${x}%`;
+    div.style.width = `${ancho}%`;
+    div.style.top = `${nivel * ALTO_FILA}px`;
+    div.style.background = colorDe(nodo);
+    div.textContent = `${nodo.n} (${nodo.v.toFixed(1)} ms)`;
+    div.title = `${nodo.n}\n${nodo.f}\n${nodo.v.toFixed(2)} ms`;
+    div.addEventListener('click', e => { e.stopPropagation(); dibujarFlame(contenedor, nodo); });
+    contenedor.appendChild(div);
+    let inicio = x;
+    nodo.c.forEach(hijo => {
+      const anchoHijo = nodo.v ? ancho * hijo.v / nodo.v : 0;
+      dibujar(hijo, inicio, anchoHijo, nivel + 1);
+      inicio += anchoHijo;
+    });
+  };
+  dibujar(raiz, 0, 100, 0);
+}
+
+function dibujarSQL(contenedor, consultas, duracion) {
+  contenedor.style.height = `${Math.max(consultas.length, 1) * 8}px`;
+  consultas.forEach((c, i) => {
+    const div = document.createElement('div');
+    div.style.left = `${100 * c.inicio / duracion}%`;
+    div.style.width = `${100 * c.ms / duracion}%`;
+    div.style.top = `${i * 8}px`;
+    div.title = `${c.inicio.toFixed(1)} ms +${c.ms.toFixed(2)} ms [${c.alias}]\n${c.sql}`;
+    contenedor.appendChild(div);
+  });
+}
+
+const arbolPerfil = JSON.parse(document.getElementById('perfil-arbol').textContent);
+const flame = document.getElementById('perfil-flame');
+dibujarFlame(flame, arbolPerfil);
+flame.addEventListener('dblclick', () => dibujarFlame(flame, arbolPerfil));
+dibujarSQL(document.getElementById('perfil-sql'),
+           JSON.parse(document.getElementById('perfil-consultas').textContent), PERFIL_DURACION || 1);
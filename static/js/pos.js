@@ -45,17 +45,220 @@ function clearCart() {
   renderCart();
 }
 
+// Catálogo local en IndexedDB, sincronizado con /pos/catalogo/cambios/.
+// Las búsquedas y el detalle de producto se resuelven en la terminal sin ir al servidor.
+const CATALOGO_DB = 'forneria_catalogo';
+const CATALOGO_DB_VERSION = 1;
+const CATALOGO_SYNC_MS = 60000;
+const BUSQUEDA_LIMITE = 48;
+const STORE_POR_MODELO = { categoria: 'categorias', producto: 'productos', lote: 'lotes' };
+let catalogoListo = false;
+let catalogoDB = null;
+
+function idbPromesa(req) {
+  return new Promise((resolve, reject) => {
+    req.onsuccess = () => resolve(req.result);
+    req.onerror = () => reject(req.error);
+  });
+}
+
+function abrirCatalogo() {
+  if (!catalogoDB) {
+    catalogoDB = new Promise((resolve, reject) => {
+      if (!('indexedDB' in window)) { reject(new Error('IndexedDB no disponible')); return; }
+      const req = indexedDB.open(CATALOGO_DB, CATALOGO_DB_VERSION);
+      req.onupgradeneeded = () => {
+        const db = req.result;
+        const productos = db.createObjectStore('productos', { keyPath: 'id' });
+        productos.createIndex('codigo_barra', 'codigo_barra');
+        const lotes = db.createObjectStore('lotes', { keyPath: 'id' });
+        lotes.createIndex('producto_id', 'producto_id');
+        db.createObjectStore('categorias', { keyPath: 'id' });
+        db.createObjectStore('meta');
+      };
+      req.onsuccess = () => resolve(req.result);
+      req.onerror = () => reject(req.error);
+    });
+  }
+  return catalogoDB;
+}
+
+async function leerCursorCatalogo() {
+  const db = await abrirCatalogo();
+  return idbPromesa(db.transaction('meta').objectStore('meta').get('cursor'));
+}
+
+async function sincronizarCatalogo() {
+  const db = await abrirCatalogo();
+  const cursor = await leerCursorCatalogo();
+  const url = '/pos/catalogo/cambios/' + (cursor ? '?desde=' + encodeURIComponent(cursor) : '');
+  const r = await fetch(url, { credentials: 'same-origin' });
+  if (!r.ok) throw new Error('Error sincronizando catálogo: ' + r.status);
+  const data = await r.json();
+
+  const tx = db.transaction(['productos', 'lotes', 'categorias', 'meta'], 'readwrite');
+  const fin = new Promise((resolve, reject) => {
+    tx.oncomplete = resolve;
+    tx.onerror = tx.onabort = () => reject(tx.error);
+  });
+  if (data.completo) {
+    ['productos', 'lotes', 'categorias'].forEach(s => tx.objectStore(s).clear());
+  }
+  data.categorias.forEach(c => tx.objectStore('categorias').put(c));
+  data.productos.forEach(p => tx.objectStore('productos').put(p));
+  data.lotes.forEach(l => tx.objectStore('lotes').put(l));
+  data.eliminados.forEach(e => {
+    const store = STORE_POR_MODELO[e.modelo];
+    if (store) tx.objectStore(store).delete(e.id);
+  });
+  tx.objectStore('meta').put(data.cursor, 'cursor');
+  await fin;
+  catalogoListo = true;
+}
+
+async function productoLocal(id) {
+  const db = await abrirCatalogo();
+  const tx = db.transaction(['productos', 'lotes']);
+  const reqProducto = tx.objectStore('productos').get(Number(id));
+  const reqLotes = tx.objectStore('lotes').index('producto_id').getAll(Number(id));
+  const [producto, lotes] = await Promise.all([idbPromesa(reqProducto), idbPromesa(reqLotes)]);
+  if (!producto) return null;
+  producto.stock_total = lotes.reduce((total, l) => total + (l.stock_actual || 0), 0);
+  return producto;
+}
+
+async function buscarLocal(texto) {
+  const db = await abrirCatalogo();
+  const tx = db.transaction(['productos', 'lotes']);
+  const reqProductos = tx.objectStore('productos').getAll();
+  const reqLotes = tx.objectStore('lotes').getAll();
+  const [productos, lotes] = await Promise.all([idbPromesa(reqProductos), idbPromesa(reqLotes)]);
+
+  const stock = new Map();
+  lotes.forEach(l => stock.set(l.producto_id, (stock.get(l.producto_id) || 0) + (l.stock_actual || 0)));
+  const q = texto.trim().toLowerCase();
+  const encontrados = [];
+  for (const p of productos) {
+    if (q && !(p.nombre || '').toLowerCase().includes(q) && !String(p.codigo_barra ?? '').startsWith(q)) continue;
+    encontrados.push(Object.assign({}, p, { stock_total: stock.get(p.id) || 0 }));
+    if (encontrados.length >= BUSQUEDA_LIMITE) break;
+  }
+  return encontrados;
+}
+
+function crearTarjeta(p) {
+  const precio = Math.round(Number(p.precio) || 0);
+  const card = document.createElement('div');
+  card.className = 'card';
+  card.dataset.id = p.id;
+  card.dataset.nombre = p.nombre;
+  card.dataset.precio = precio;
+  const cuerpo = document.createElement('div');
+  cuerpo.className = 'w3-container w3-center';
+  const h2 = document.createElement('h2');
+  h2.textContent = p.nombre;
+  const codigo = document.createElement('p');
+  codigo.textContent = `Código de barra: ${p.codigo_barra ?? ''}`;
+  const stock = document.createElement('p');
+  stock.innerHTML = 'Stock disponible: <strong></strong>';
+  stock.querySelector('strong').textContent = p.stock_total;
+  const precioEl = document.createElement('p');
+  precioEl.innerHTML = 'Precio: <strong></strong>';
+  precioEl.querySelector('strong').textContent = formatCLP(precio);
+  const acciones = document.createElement('div');
+  acciones.className = 'card-actions';
+  const agregar = document.createElement('button');
+  agregar.className = 'button1 add-to-cart';
+  Object.assign(agregar.dataset, { id: p.id, nombre: p.nombre, precio: precio });
+  agregar.textContent = 'Agregar al carrito';
+  const detalle = document.createElement('button');
+  detalle.className = 'button1 view-detail';
+  detalle.dataset.id = p.id;
+  detalle.textContent = 'Ver detalle';
+  acciones.append(agregar, detalle);
+  cuerpo.append(h2, codigo, stock, precioEl, acciones);
+  card.appendChild(cuerpo);
+  return card;
+}
+
+let tarjetasServidor = null;
+
+async function mostrarBusquedaLocal(texto) {
+  const contenedor = document.querySelector('.containercartas');
+  const paginacion = document.querySelector('.pagination');
+  if (!contenedor || !catalogoListo) return false;
+  if (tarjetasServidor === null) tarjetasServidor = contenedor.innerHTML;
+
+  if (!texto.trim()) {
+    contenedor.innerHTML = tarjetasServidor;
+    if (paginacion) paginacion.style.display = '';
+    return true;
+  }
+  const productos = await buscarLocal(texto);
+  contenedor.replaceChildren(...productos.map(crearTarjeta));
+  if (paginacion) paginacion.style.display = 'none';
+  return true;
+}
+
 document.addEventListener('DOMContentLoaded', () => {
   renderCart();
 
-  // añadir eventos a botones existentes
-  document.querySelectorAll('.add-to-cart').forEach(btn => {
-    btn.addEventListener('click', (e) => {
-      const id = btn.getAttribute('data-id');
-      const nombre = btn.getAttribute('data-nombre');
-      const precio = parseFloat(btn.getAttribute('data-precio')) || 0;
-      addToCart(id, nombre, precio);
+  // Catálogo local: marcar listo si ya hay una copia previa y sincronizar en segundo plano
+  leerCursorCatalogo()
+    .then(cursor => { if (cursor) catalogoListo = true; })
+    .catch(() => {})
+    .finally(() => sincronizarCatalogo().catch(err => console.warn(err)));
+  setInterval(() => sincronizarCatalogo().catch(err => console.warn(err)), CATALOGO_SYNC_MS);
+  document.addEventListener('visibilitychange', () => {
+    if (document.visibilityState === 'visible') sincronizarCatalogo().catch(err => console.warn(err));
+  });
+
+  // Búsqueda instantánea contra el catálogo local; sin copia local se usa el servidor
+  const formBusqueda = document.querySelector('.search form');
+  const inputBusqueda = formBusqueda && formBusqueda.querySelector('input[name="buscar"]');
+  if (inputBusqueda) {
+    let espera = null;
+    inputBusqueda.addEventListener('input', () => {
+      clearTimeout(espera);
+      espera = setTimeout(() => mostrarBusquedaLocal(inputBusqueda.value), 120);
+    });
+    formBusqueda.addEventListener('submit', (e) => {
+      if (!catalogoListo) return;
+      e.preventDefault();
+      mostrarBusquedaLocal(inputBusqueda.value);
     });
+  }
+
+  // Escanear: agrega al carrito el producto del código escrito o leído por el lector
+  const btnEscanear = document.querySelector('.btn-scan');
+  if (btnEscanear && inputBusqueda) {
+    btnEscanear.addEventListener('click', async () => {
+      const codigo = inputBusqueda.value.trim();
+      if (!codigo) { inputBusqueda.focus(); return; }
+      try {
+        const r = await fetch(`/pos/escanear/${encodeURIComponent(codigo)}/`, { credentials: 'same-origin' });
+        if (r.status === 404) { alert('Código no registrado'); return; }
+        if (!r.ok) throw new Error('scan ' + r.status);
+        const p = await r.json();
+        addToCart(p.id, p.nombre, Math.round(Number(p.precio) || 0));
+        inputBusqueda.value = '';
+        inputBusqueda.focus();
+      } catch (err) {
+        console.error(err);
+        alert('Error comunicándose con el servidor');
+      }
+    });
+  }
+
+  // delegado para agregar al carrito (tarjetas del servidor o de la búsqueda local)
+  const contenedorCartas = document.querySelector('.containercartas');
+  contenedorCartas.addEventListener('click', (e) => {
+    const btn = e.target.closest('.add-to-cart');
+    if (!btn) return;
+    const id = btn.getAttribute('data-id');
+    const nombre = btn.getAttribute('data-nombre');
+    const precio = parseFloat(btn.getAttribute('data-precio')) || 0;
+    addToCart(id, nombre, precio);
   });
 
   // delegado para remover items
@@ -93,6 +296,19 @@ document.addEventListener('DOMContentLoaded', () => {
   document.getElementById('monto-pagado').addEventListener('input', () => {
     updateChange();
   });
+  // imprime el comprobante que viene en la respuesta del checkout, sin otra petición
+  function imprimirBoleta(html) {
+    let marco = document.getElementById('boleta-frame');
+    if (!marco) {
+      marco = document.createElement('iframe');
+      marco.id = 'boleta-frame';
+      marco.style.display = 'none';
+      document.body.appendChild(marco);
+    }
+    marco.onload = () => marco.contentWindow.print();
+    marco.srcdoc = html;
+  }
+
   document.getElementById('confirm-sale').addEventListener('click', () => {
     // Enviar carrito al endpoint de checkout
     (async function(){
@@ -102,6 +318,7 @@ document.addEventListener('DOMContentLoaded', () => {
       const payload = {
         canal_venta: 'presencial',
         monto_pagado: monto || null,
+        boleta: 'html',
         items: cart.map(i => ({ producto_id: i.id, cantidad: i.qty, precio_unitario: i.precio, descuento_pct: i.descuento_pct || 0 }))
       };
 
@@ -123,8 +340,11 @@ document.addEventListener('DOMContentLoaded', () => {
         }
         // éxito
         alert(`Venta registrada. Folio: ${data.folio} - Total: ${formatCLP(data.total_con_iva)}${data.vuelto ? ' - Vuelto: ' + formatCLP(data.vuelto) : ''}`);
+        if (data.boleta) imprimirBoleta(data.boleta);
         clearCart();
         document.getElementById('cartModal').style.display = 'none';
+        // el stock cambió: traer los lotes actualizados al catálogo local
+        sincronizarCatalogo().catch(err => console.warn(err));
       } catch (err) {
         console.error(err);
         alert('Error comunicándose con el servidor');
@@ -132,27 +352,29 @@ document.addEventListener('DOMContentLoaded', () => {
     })();
   });
 
-  // modal: view-detail buttons
-  document.querySelectorAll('.view-detail').forEach(btn => {
-    btn.addEventListener('click', async (e) => {
-      const id = btn.getAttribute('data-id');
-      // intentar obtener datos desde API REST
-      try {
+  // modal: view-detail (primero catálogo local, si no está se consulta la API REST)
+  contenedorCartas.addEventListener('click', async (e) => {
+    const btn = e.target.closest('.view-detail');
+    if (!btn) return;
+    const id = btn.getAttribute('data-id');
+    try {
+      let data = await productoLocal(id).catch(() => null);
+      if (!data) {
         const r = await fetch(`/pos/productos/${id}/`);
         if (!r.ok) throw new Error('no data');
-        const data = await r.json();
-        document.getElementById('modal-nombre').textContent = data.nombre || '';
-        document.getElementById('modal-descripcion').textContent = data.descripcion || '';
-        document.getElementById('modal-precio').textContent = data.precio || 0;
-        document.getElementById('modal-stock').textContent = data.stock_total || 0;
-      } catch (err) {
-        document.getElementById('modal-nombre').textContent = 'Detalle no disponible';
-        document.getElementById('modal-descripcion').textContent = '';
-        document.getElementById('modal-precio').textContent = '0';
-        document.getElementById('modal-stock').textContent = '0';
+        data = await r.json();
       }
-      document.getElementById('productModal').style.display = 'flex';
-    });
+      document.getElementById('modal-nombre').textContent = data.nombre || '';
+      document.getElementById('modal-descripcion').textContent = data.descripcion || '';
+      document.getElementById('modal-precio').textContent = data.precio || 0;
+      document.getElementById('modal-stock').textContent = data.stock_total || 0;
+    } catch (err) {
+      document.getElementById('modal-nombre').textContent = 'Detalle no disponible';
+      document.getElementById('modal-descripcion').textContent = '';
+      document.getElementById('modal-precio').textContent = '0';
+      document.getElementById('modal-stock').textContent = '0';
+    }
+    document.getElementById('productModal').style.display = 'flex';
   });
 
   document.getElementById('modal-close').addEventListener('click', () => {
@@ -0,0 +1,49 @@
+// Tablero en vivo: recibe los totales del día por Server-Sent Events (pos/tablero.py)
+
+function formatCLP(value) {
+  return '$' + Math.round(Number(value) || 0).toLocaleString('es-CL');
+}
+
+function celda(texto, clase) {
+  const td = document.createElement('td');
+  td.textContent = texto;
+  if (clase) td.className = clase;
+  return td;
+}
+
+function llenarTabla(id, filas) {
+  const tbody = document.getElementById(id);
+  tbody.replaceChildren(...filas.map(celdas => {
+    const tr = document.createElement('tr');
+    tr.append(...celdas);
+    return tr;
+  }));
+}
+
+function mostrarTotales(datos) {
+  document.getElementById('tablero-ventas').textContent = datos.ventas ?? 0;
+  document.getElementById('tablero-monto').textContent = formatCLP(datos.monto);
+
+  const canales = document.getElementById('tablero-canales');
+  canales.replaceChildren(...Object.entries(datos.por_canal || {}).map(([canal, t]) => {
+    const li = document.createElement('li');
+    li.textContent = `${canal}: ${t.ventas} (${formatCLP(t.monto)})`;
+    return li;
+  }));
+
+  llenarTabla('tablero-top', (datos.top_productos || []).map(p => [
+    celda(p.nombre), celda(p.unidades, 'text-end'), celda(formatCLP(p.monto), 'text-end'),
+  ]));
+  llenarTabla('tablero-stock', (datos.stock_bajo || []).map(l => [
+    celda(l.producto), celda(l.numero_lote || l.id), celda(l.stock_actual, 'text-end'), celda(l.fecha_caducidad),
+  ]));
+}
+
+const estado = document.getElementById('tablero-estado');
+const fuente = new EventSource(TABLERO_EVENTOS);
+fuente.addEventListener('totales', e => {
+  estado.textContent = '';
+  mostrarTotales(JSON.parse(e.data));
+});
+// EventSource reconecta solo; solo se avisa mientras tanto
+fuente.onerror = () => { estado.textContent = 'Reconectando…'; };